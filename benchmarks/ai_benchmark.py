@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Load test the AI endpoints against the mock Anthropic API.
+
+Exercises three views that wait on the Anthropic API:
+
+- blog_conversation: ai_blog_conversation_view (follow-up edit on an existing post)
+- blog_generate: generate_ai_post_view
+- site_config: ai_config_view
+
+For each server mode the script starts gunicorn on a local port, pointed at a
+mock API (benchmarks/mock_anthropic.py, started in-process unless --mock-url is
+given), then runs concurrent clients against each endpoint and reports
+latency percentiles, throughput and errors:
+
+- sync: gunicorn sync workers (one request per worker at a time)
+- threads: gunicorn gthread workers (--threads per worker)
+- asgi: gunicorn with uvicorn workers, if uvicorn is installed
+
+Requests are authenticated as a staff user with a session created directly in
+the database, so the server must use the same database as this script.
+
+Usage:
+    export DB_NAME=/tmp/bench.sqlite3
+    python manage.py migrate
+    python benchmarks/ai_benchmark.py --modes sync threads --workers 2 --threads 8 \\
+        --concurrency 16 --duration 15 --mock-latency 1000 --json ai-results.json
+    python benchmarks/ai_benchmark.py --url http://127.0.0.1:8000 --mock-url http://127.0.0.1:8099/v1/messages
+"""
+import argparse
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mickblog.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.contrib.sessions.backends.db import SessionStore  # noqa: E402
+
+from mock_anthropic import start_server  # noqa: E402
+from site_benchmark import summarize  # noqa: E402
+
+BENCHMARK_USERNAME = 'bench-ai-staff'
+
+SAMPLE_POST = "\n\n".join(
+    ["# Benchmarking Django", "An introduction to measuring performance."]
+    + [f"## Section {i}\n\n" + "Some text about caching and queries. " * 30 for i in range(1, 8)]
+)
+
+ENDPOINTS = {
+    'blog_conversation': ('/blog/ai_blog_conversation/', {
+        'message': 'Add a section about connection pooling',
+        'title': 'Benchmarking Django',
+        'content': SAMPLE_POST,
+    }),
+    'blog_generate': ('/blog/generate_ai_post/', {
+        'topic': 'Profiling Django views',
+        'length': 'medium',
+        'tone': 'informative',
+    }),
+    'site_config': ('/ai_config/', {
+        'message': 'Change the site title to Benchmark Blog',
+    }),
+}
+
+
+def staff_session_cookie():
+    """Create a logged-in session for a staff user and return the cookie header value."""
+    user, created = User.objects.get_or_create(
+        username=BENCHMARK_USERNAME, defaults={'is_staff': True, 'is_superuser': True},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save()
+
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode, port, workers, threads):
+    """Build the gunicorn command line for a server mode."""
+    command = [sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{port}', '-w', str(workers),
+               '--timeout', '300', '--log-level', 'warning']
+    if mode == 'sync':
+        return command + ['-k', 'sync', 'mickblog.wsgi:application']
+    if mode == 'threads':
+        return command + ['-k', 'gthread', '--threads', str(threads), 'mickblog.wsgi:application']
+    if mode == 'asgi':
+        return command + ['-k', 'uvicorn.workers.UvicornWorker', 'mickblog.asgi:application']
+    raise ValueError(f"Unknown server mode: {mode}")
+
+
+def wait_for_server(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2)
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.25)
+    return False
+
+
+def post_json(url, payload, cookie):
+    """POST a JSON payload; returns (latency_seconds, status_code)."""
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode('utf-8'), method='POST',
+        headers={'Content-Type': 'application/json', 'Cookie': cookie},
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return time.perf_counter() - started, status
+
+
+def run_endpoint(base_url, path, payload, cookie, concurrency, duration):
+    """Run concurrent clients against one endpoint for a fixed duration."""
+    url = base_url.rstrip('/') + path
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            latency, status = post_json(url, payload, cookie)
+            with lock:
+                latencies.append(latency)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    result = summarize(latencies, elapsed, errors=errors)
+    result['status_codes'] = {str(status): count for status, count in sorted(statuses.items())}
+    return result
+
+
+def run_mode(base_url, endpoints, cookie, args):
+    results = {}
+    for name in endpoints:
+        path, payload = ENDPOINTS[name]
+        result = run_endpoint(base_url, path, payload, cookie, args.concurrency, args.duration)
+        results[name] = result
+        print(
+            f"  {name:<18} {result['requests']:>5} req  {result['throughput_rps']:>7} req/s  "
+            f"p50 {result.get('p50_ms', '-'):>9} ms  p99 {result.get('p99_ms', '-'):>9} ms  "
+            f"status {result['status_codes']}"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--modes', nargs='+', default=['sync', 'threads', 'asgi'],
+                        choices=['sync', 'threads', 'asgi'], help='Server modes to benchmark')
+    parser.add_argument('--url', help='Benchmark an already running server instead of starting gunicorn')
+    parser.add_argument('--endpoints', nargs='+', default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='Threads per worker in threads mode')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per endpoint')
+    parser.add_argument('--mock-url', help='Use a mock API that is already running at this URL')
+    parser.add_argument('--mock-latency', type=float, default=500, help='Mock API latency in ms')
+    parser.add_argument('--mock-jitter', type=float, default=100, help='Mock API latency jitter in ms')
+    parser.add_argument('--mock-rate-429', type=float, default=0.0, help='Fraction of 429 responses')
+    parser.add_argument('--mock-rate-500', type=float, default=0.0, help='Fraction of 500 responses')
+    parser.add_argument('--json', dest='json_path', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    mock_url = args.mock_url
+    if not mock_url:
+        mock_port = free_port()
+        start_server(port=mock_port, latency=args.mock_latency, jitter=args.mock_jitter,
+                     rate_429=args.mock_rate_429, rate_500=args.mock_rate_500)
+        mock_url = f"http://127.0.0.1:{mock_port}/v1/messages"
+    print(f"Mock Anthropic API: {mock_url}")
+
+    cookie = staff_session_cookie()
+    output = {
+        'benchmark': 'ai',
+        'mock_url': mock_url,
+        'mock_latency_ms': args.mock_latency,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'modes': {},
+    }
+
+    if args.url:
+        print(f"Server: {args.url}")
+        output['modes']['external'] = run_mode(args.url, args.endpoints, cookie, args)
+    else:
+        env = dict(os.environ, ANTHROPIC_API_URL=mock_url, ANTHROPIC_API_KEY='mock-key')
+        for mode in args.modes:
+            if mode == 'asgi' and importlib.util.find_spec('uvicorn') is None:
+                print("Skipping asgi: uvicorn is not installed")
+                continue
+            port = free_port()
+            command = server_command(mode, port, args.workers, args.threads)
+            print(f"Server mode {mode}: {' '.join(command[2:])}")
+            server = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                if not wait_for_server(base_url + '/'):
+                    print(f"  Server did not start for mode {mode}")
+                    continue
+                output['modes'][mode] = {
+                    'workers': args.workers,
+                    'threads': args.threads if mode == 'threads' else 1,
+                    'results': run_mode(base_url, args.endpoints, cookie, args),
+                }
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+Benchmark the cost of database connections per request.
+
+Runs the same page through Django's WSGI handler in a fresh process for each
+connection mode, configured through the same environment variables as the
+site (see DATABASES in mickblog/settings.py):
+
+- per_request: DB_CONN_MAX_AGE=0, a new connection for every request (the
+  old behaviour)
+- persistent: DB_CONN_MAX_AGE=60 with DB_CONN_HEALTH_CHECKS, one connection
+  per process reused across requests
+- pool: DB_POOL=True, a psycopg 3 connection pool per process (PostgreSQL
+  with psycopg_pool only; skipped otherwise)
+
+Unlike Django's test client, the WSGI handler sends the request_started and
+request_finished signals that close connections, so this measures what a
+gunicorn worker does. For each mode it reports request latency, the number of
+connections opened per request and the mean time to open one (for the pool,
+to check one out).
+
+Usage:
+    DB_NAME=/tmp/bench.sqlite3 python benchmarks/db_connection_benchmark.py
+    DB_ENGINE=django.db.backends.postgresql DB_NAME=mickblog DB_USER=... DB_HOST=127.0.0.1 \\
+        python benchmarks/db_connection_benchmark.py --path /blog/ --requests 500 --json db-results.json
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Allow running from the repository root without installing anything
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mickblog.settings')
+
+# Marks the child process's result among any log output
+RESULT_PREFIX = 'RESULT '
+
+MODES = {
+    'per_request': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'False'},
+    'persistent': {'DB_CONN_MAX_AGE': '60', 'DB_CONN_HEALTH_CHECKS': 'True', 'DB_POOL': 'False'},
+    'pool': {'DB_POOL': 'True'},
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    index = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def run_mode(path, requests, warmup):
+    """Benchmark one mode in this process, as configured by the environment."""
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    database = settings.DATABASES['default']
+    if os.environ.get('BENCHMARK_MODE') == 'pool' and 'pool' not in database.get('OPTIONS', {}):
+        return {'skipped': 'DB_POOL needs PostgreSQL'}
+
+    # Time every connection the handler opens
+    connects = []
+    original_connect = connection.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        original_connect()
+        connects.append(time.perf_counter() - started)
+    connection.connect = timed_connect
+
+    opened = []
+    connection_created.connect(lambda sender, **kwargs: opened.append(1), weak=False)
+
+    handler = WSGIHandler()
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    def request():
+        environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}
+        setup_testing_defaults(environ)
+        response = handler(environ, start_response)
+        try:
+            b''.join(response)
+        finally:
+            # Sends request_finished, which closes the connection unless it's persistent
+            response.close()
+
+    for _ in range(warmup):
+        request()
+    del connects[:], opened[:], statuses[:]
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        request()
+        latencies.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'errors': sum(1 for status in statuses if status != 200),
+        'throughput_rps': round(requests / elapsed, 1),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 0.90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'connections_per_request': round(len(opened) / requests, 3),
+        'connect_ms': round(statistics.mean(connects) * 1000, 3) if connects else 0.0,
+        'conn_max_age': database['CONN_MAX_AGE'],
+    }
+
+
+def print_result(name, result):
+    if 'skipped' in result:
+        print(f"{name:<12} skipped: {result['skipped']}")
+        return
+    print(
+        f"{name:<12} {result['requests']:>6} req  {result['throughput_rps']:>8} req/s  "
+        f"p50 {result['p50_ms']:>8} ms  p90 {result['p90_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+        f"connects/req {result['connections_per_request']:>6}  connect {result['connect_ms']:>7} ms  "
+        f"errors {result['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES),
+                        help='Connection modes to compare (default: all)')
+    parser.add_argument('--path', default='/blog/', help='Page to request (default: /blog/)')
+    parser.add_argument('--requests', type=int, default=300, help='Requests per mode')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per mode before measuring')
+    parser.add_argument('--json', dest='json_path', help='Write results as JSON to this file')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_PREFIX + json.dumps(run_mode(args.path, args.requests, args.warmup)))
+        return
+
+    results = {}
+    for mode in args.modes:
+        # A fresh process per mode, so settings are read from the environment
+        # exactly as a gunicorn worker would read them
+        env = {**os.environ, **MODES[mode], 'BENCHMARK_MODE': mode}
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', mode, '--path', args.path,
+             '--requests', str(args.requests), '--warmup', str(args.warmup)],
+            env=env, capture_output=True, text=True,
+        )
+        lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+        if completed.returncode != 0 or not lines:
+            errors = completed.stderr.strip().splitlines() or ['no result']
+            results[mode] = {'skipped': errors[-1]}
+        else:
+            results[mode] = json.loads(lines[-1][len(RESULT_PREFIX):])
+        print_result(mode, results[mode])
+
+    if args.json_path:
+        output = {
+            'benchmark': 'db_connections',
+            'database': os.environ.get('DB_ENGINE', 'django.db.backends.sqlite3'),
+            'path': args.path,
+            'results': results,
+        }
+        with open(args.json_path, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
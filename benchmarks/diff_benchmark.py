@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Benchmark the blog diff engine against difflib.SequenceMatcher.
+
+Generates synthetic markdown posts of 5k to 50k words, applies a set of edits
+similar to what the AI "Suggest Improvements" workflow produces, and times:
+
+- blog.diff.diff_texts (patience + linear-space Myers, line then word)
+- SequenceMatcher line then word, the same two-pass strategy with difflib
+- SequenceMatcher over the word tokens of the whole document
+
+Usage:
+    python benchmarks/diff_benchmark.py
+    python benchmarks/diff_benchmark.py --sizes 5000 20000 --repeat 5 --json results.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from difflib import SequenceMatcher
+
+# Allow running from the repository root without installing anything
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blog.diff import WORD_TOKEN_RE, diff_texts  # noqa: E402
+
+VOCABULARY = (
+    "the a an of to in and for with on that this is are was be as by from it at "
+    "django python blog post project code model view template cache query server "
+    "performance latency request response user editor content markdown section "
+    "deploy docker nginx database index test build release feature change update"
+).split()
+
+
+def make_document(words, rng):
+    """Build a markdown document with headings and paragraphs of roughly `words` words."""
+    lines = []
+    count = 0
+    section = 0
+    while count < words:
+        if count % 400 == 0:
+            section += 1
+            lines.append(f"## Section {section}")
+            lines.append("")
+        sentence_count = rng.randint(3, 7)
+        paragraph = []
+        for _ in range(sentence_count):
+            sentence = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))]
+            paragraph.append(" ".join(sentence).capitalize() + ".")
+            count += len(sentence)
+        lines.append(" ".join(paragraph))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def edit_document(text, rng, word_edit_rate=0.01, paragraph_edit_rate=0.05):
+    """Apply word substitutions and paragraph insertions/deletions to a document."""
+    lines = text.split("\n")
+    edited = []
+    for line in lines:
+        if line and not line.startswith("#") and rng.random() < paragraph_edit_rate:
+            if rng.random() < 0.5:
+                continue  # delete the paragraph
+            edited.append(line)
+            edited.append("")
+            edited.append("An additional paragraph about " + " ".join(rng.choice(VOCABULARY) for _ in range(30)) + ".")
+            continue
+        words = line.split(" ")
+        for index in range(len(words)):
+            if rng.random() < word_edit_rate:
+                words[index] = rng.choice(VOCABULARY)
+        edited.append(" ".join(words))
+    return "\n".join(edited)
+
+
+def difflib_line_then_word(original, improved):
+    """The same two-pass comparison as diff_texts, implemented with SequenceMatcher."""
+    old_lines = original.splitlines()
+    new_lines = improved.splitlines()
+    hunks = 0
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines).get_opcodes():
+        if tag == 'replace':
+            old_tokens = WORD_TOKEN_RE.findall("\n".join(old_lines[i1:i2]))
+            new_tokens = WORD_TOKEN_RE.findall("\n".join(new_lines[j1:j2]))
+            SequenceMatcher(None, old_tokens, new_tokens).get_opcodes()
+        if tag != 'equal':
+            hunks += 1
+    return hunks
+
+
+def difflib_whole_document(original, improved):
+    """Compare the word tokens of both documents in a single SequenceMatcher pass."""
+    old_tokens = WORD_TOKEN_RE.findall(original)
+    new_tokens = WORD_TOKEN_RE.findall(improved)
+    return len(SequenceMatcher(None, old_tokens, new_tokens).get_opcodes())
+
+
+def time_call(function, repeat, *args):
+    """Return timings of `repeat` calls in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarize(timings):
+    return {
+        'median_ms': round(statistics.median(timings), 2),
+        'min_ms': round(min(timings), 2),
+        'max_ms': round(max(timings), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 10000, 20000, 50000],
+                        help='Document sizes in words')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per engine and size')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for document generation')
+    parser.add_argument('--skip-whole-document', action='store_true',
+                        help='Skip the (slow) whole-document SequenceMatcher comparison')
+    parser.add_argument('--json', dest='json_path', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engines = [
+        ('diff_texts', lambda a, b: diff_texts(a, b)),
+        ('difflib_line_then_word', difflib_line_then_word),
+    ]
+    if not args.skip_whole_document:
+        engines.append(('difflib_whole_document', difflib_whole_document))
+
+    results = []
+    print(f"{'words':>8}  {'engine':<24} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for size in args.sizes:
+        original = make_document(size, rng)
+        improved = edit_document(original, rng)
+        for name, function in engines:
+            stats = summarize(time_call(function, args.repeat, original, improved))
+            results.append({'words': size, 'engine': name, **stats})
+            print(f"{size:>8}  {name:<24} {stats['median_ms']:>10} {stats['min_ms']:>10} {stats['max_ms']:>10}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'benchmark': 'diff', 'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+"""
+Local mock of the Anthropic Messages API for load testing the AI features.
+
+Point the site at it with ANTHROPIC_API_URL=http://127.0.0.1:8099/v1/messages
+and any ANTHROPIC_API_KEY. The mock answers POST /v1/messages with canned
+responses in the structured formats the AI views parse:
+
+- blog editor follow-ups: ```conversation and ```edits sections
+- blog editor first drafts: ```conversation and ```blogpost sections
+- post generator: ```title, ```slug and ```content sections
+- content improvement: suggestions followed by the improved post
+- site configuration editor: ```explanation and ```json sections
+- conversation summaries: plain text
+
+Responses include a usage block, with cache reads and writes simulated for
+system prompts sent with cache_control. Requests with "stream": true get a
+server-sent event stream in the API's format.
+
+Usage:
+    python benchmarks/mock_anthropic.py --port 8099 --latency 800 --jitter 200
+    python benchmarks/mock_anthropic.py --rate-429 0.05 --rate-500 0.01 --output-words 600
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "django python blog post project code model view template cache query server "
+    "performance latency request response user editor content markdown section"
+).split()
+
+
+class MockOptions:
+    """Behaviour of the mock server, shared by all request handler threads."""
+    def __init__(self, latency=500, jitter=0, rate_429=0.0, rate_500=0.0, output_words=300, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.output_words = output_words
+        self.random = random.Random(seed)
+        self.cached_prefixes = set()
+        self.lock = threading.Lock()
+
+
+def _words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count)).capitalize() + '.'
+
+
+def _markdown(rng, words):
+    """Generate a markdown post of roughly the given number of words."""
+    parts = ['# Mock Post Title']
+    while words > 0:
+        parts.append(f"## {_words(rng, 3)[:-1]}")
+        parts.append(_words(rng, min(words, 80)))
+        words -= 80
+    return '\n\n'.join(parts)
+
+
+def _system_text(system):
+    if isinstance(system, list):
+        return '\n\n'.join(block.get('text', '') for block in system)
+    return system or ''
+
+
+def canned_response(system, rng, output_words):
+    """Pick a response in the format the calling view expects from its system prompt."""
+    if 'configuration assistant' in system:
+        return (
+            "```explanation\nI've updated the site title as requested.\n```\n\n"
+            "```json\n" + json.dumps({'site_info': {'title': 'Mock Site Title'}}, indent=2) + "\n```"
+        )
+    if '```edits' in system:
+        edits = [{'op': 'append', 'content': f"## Mock Section\n\n{_words(rng, output_words)}"}]
+        return (
+            "```conversation\nI've added a new section at the end of your post.\n```\n\n"
+            "```edits\n" + json.dumps(edits) + "\n```"
+        )
+    if '```blogpost' in system:
+        return (
+            "```conversation\nHere's a first draft of your post.\n```\n\n"
+            f"```blogpost\n{_markdown(rng, output_words)}\n```"
+        )
+    if '```title' in system:
+        return (
+            "```title\nMock Post Title\n```\n\n```slug\nmock-post-title\n```\n\n"
+            f"```content\n{_markdown(rng, output_words)}\n```"
+        )
+    if 'SECTION 1' in system:
+        return (
+            f"SECTION 1: Improvement suggestions\n\n- {_words(rng, 12)}\n- {_words(rng, 12)}\n\n"
+            f"SECTION 2: Improved content\n\n{_markdown(rng, output_words)}"
+        )
+    if 'running summary' in system:
+        return _words(rng, 60)
+    return _words(rng, output_words)
+
+
+def usage_for(options, request):
+    """Estimate token usage, simulating prompt cache writes and reads."""
+    system = request.get('system')
+    text = _system_text(system) + json.dumps(request.get('messages', []))
+    input_tokens = len(text) // 4 + 1
+    usage = {'input_tokens': input_tokens, 'output_tokens': options.output_words * 4 // 3,
+             'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+
+    if isinstance(system, list) and any('cache_control' in block for block in system):
+        prefix = hashlib.sha1(_system_text(system).encode('utf-8')).hexdigest()
+        cached_tokens = len(_system_text(system)) // 4 + 1
+        with options.lock:
+            seen = prefix in options.cached_prefixes
+            options.cached_prefixes.add(prefix)
+        usage['cache_read_input_tokens' if seen else 'cache_creation_input_tokens'] = cached_tokens
+        usage['input_tokens'] = max(input_tokens - cached_tokens, 1)
+    return usage
+
+
+class MockAnthropicHandler(BaseHTTPRequestHandler):
+    options = MockOptions()
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Keep the console quiet under load
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, error_type, message, headers=None):
+        self._send_json(status, {'type': 'error', 'error': {'type': error_type, 'message': message}}, headers)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/messages':
+            self._error(404, 'not_found_error', f'Unknown path {self.path}')
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            self._error(400, 'invalid_request_error', 'Request body is not valid JSON')
+            return
+        if not (self.headers.get('x-api-key') or self.headers.get('Authorization')):
+            self._error(401, 'authentication_error', 'Missing API key')
+            return
+
+        options = self.options
+        with options.lock:
+            roll = options.random.random()
+            delay = max(options.latency + options.random.uniform(-options.jitter, options.jitter), 0) / 1000
+            rng = random.Random(options.random.random())
+
+        # Injected errors come back quickly, like the real API's
+        if roll < options.rate_429:
+            self._error(429, 'rate_limit_error', 'Mock rate limit exceeded', {'retry-after': '1'})
+            return
+        if roll < options.rate_429 + options.rate_500:
+            self._error(500, 'api_error', 'Mock internal server error')
+            return
+
+        text = canned_response(_system_text(request.get('system')), rng, options.output_words)
+        message = {
+            'id': f"msg_mock_{uuid.uuid4().hex[:24]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model', 'mock-model'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': usage_for(options, request),
+        }
+
+        if request.get('stream'):
+            self._stream(message, delay)
+        else:
+            time.sleep(delay)
+            self._send_json(200, message)
+
+    def _stream(self, message, delay):
+        """Send the message as server-sent events, spreading the delay over the chunks."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def event(name, data):
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        text = message['content'][0]['text']
+        chunks = [text[i:i + 200] for i in range(0, len(text), 200)] or ['']
+        start = dict(message, content=[], stop_reason=None)
+        event('message_start', {'type': 'message_start', 'message': start})
+        event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                      'content_block': {'type': 'text', 'text': ''}})
+        for chunk in chunks:
+            time.sleep(delay / len(chunks))
+            event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                          'delta': {'type': 'text_delta', 'text': chunk}})
+        event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        event('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                                'usage': {'output_tokens': message['usage']['output_tokens']}})
+        event('message_stop', {'type': 'message_stop'})
+
+
+def start_server(host='127.0.0.1', port=8099, **options):
+    """
+    Start the mock server in a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it
+    """
+    handler = type('ConfiguredMockHandler', (MockAnthropicHandler,), {'options': MockOptions(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=500, help='Response time in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0, help='Random +/- variation of the latency in ms')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Fraction of requests rejected with 429')
+    parser.add_argument('--rate-500', type=float, default=0.0, help='Fraction of requests failing with 500')
+    parser.add_argument('--output-words', type=int, default=300, help='Approximate words in generated text')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible responses')
+    args = parser.parse_args()
+
+    server = start_server(
+        args.host, args.port, latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+        rate_500=args.rate_500, output_words=args.output_words, seed=args.seed,
+    )
+    print(f"Mock Anthropic API listening on http://{args.host}:{args.port}/v1/messages")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+Benchmark the public pages of the site.
+
+Measures latency percentiles, throughput and database queries per request for:
+
+- home: the home page
+- post_list: the first page of the blog
+- post_list_deep: the last page of the blog
+- post_detail: a single published blog post
+- project_list: the projects page
+- resume: the resume page
+
+By default requests go through Django's test client in this process, which
+needs no running server and also counts the database queries of each request.
+With --url, a simple threaded HTTP load generator runs against a running
+server instead (e.g. gunicorn behind nginx), reporting latency and throughput.
+
+Seed a benchmark database first, for example:
+
+    DB_NAME=/tmp/bench.sqlite3 python manage.py migrate
+    DB_NAME=/tmp/bench.sqlite3 python manage.py seed_benchmark_data --posts 1000
+
+Usage:
+    DB_NAME=/tmp/bench.sqlite3 python benchmarks/site_benchmark.py --requests 200
+    python benchmarks/site_benchmark.py --url http://127.0.0.1:8000 --concurrency 8 --duration 20
+    python benchmarks/site_benchmark.py --json results.json
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Allow running from the repository root without installing anything
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mickblog.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from blog.models import Post  # noqa: E402
+
+# Posts per page in blog.views.post_list
+POSTS_PER_PAGE = 5
+
+
+def benchmark_paths():
+    """Resolve the path of each benchmarked page from the current database."""
+    published = Post.objects.filter(status='published')
+    pages = max(math.ceil(published.count() / POSTS_PER_PAGE), 1)
+    latest = published.order_by('-publish').first()
+
+    paths = {
+        'home': reverse('core:home'),
+        'post_list': reverse('blog:post_list'),
+        'post_list_deep': f"{reverse('blog:post_list')}?page={pages}",
+        'post_detail': latest.get_absolute_url() if latest else None,
+        'project_list': reverse('projects:project_list'),
+        'resume': reverse('resume:resume'),
+    }
+    return {name: path for name, path in paths.items() if path}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    index = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, queries=None, errors=0):
+    """Build the result dictionary for one page, with times in milliseconds."""
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+    if latencies:
+        result.update({
+            'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p90_ms': round(percentile(latencies, 0.90) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2),
+        })
+    if queries:
+        result['queries_per_request'] = round(statistics.mean(queries), 1)
+    return result
+
+
+def run_test_client(paths, requests, warmup):
+    """Benchmark each path in-process with Django's test client."""
+    # The test client sends Host: testserver
+    settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + ['testserver']
+    client = Client()
+    results = {}
+    for name, path in paths.items():
+        for _ in range(warmup):
+            client.get(path)
+
+        latencies = []
+        queries = []
+        errors = 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = client.get(path)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+            if response.status_code != 200:
+                errors += 1
+        results[name] = {'path': path, **summarize(latencies, time.perf_counter() - started, queries, errors)}
+        print_result(name, results[name])
+    return results
+
+
+def run_http(base_url, paths, concurrency, duration, warmup):
+    """Benchmark each path against a running server with concurrent HTTP requests."""
+    def fetch(url):
+        request_started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+                ok = response.status == 200
+        except (urllib.error.URLError, OSError):
+            ok = False
+        return time.perf_counter() - request_started, ok
+
+    results = {}
+    for name, path in paths.items():
+        url = base_url.rstrip('/') + path
+        for _ in range(warmup):
+            fetch(url)
+
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                latency, ok = fetch(url)
+                with lock:
+                    latencies.append(latency)
+                    errors += 0 if ok else 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        results[name] = {'path': path, **summarize(latencies, time.perf_counter() - started, errors=errors)}
+        print_result(name, results[name])
+    return results
+
+
+def print_result(name, result):
+    queries = result.get('queries_per_request', '-')
+    print(
+        f"{name:<16} {result['requests']:>6} req  {result.get('throughput_rps', 0):>8} req/s  "
+        f"p50 {result.get('p50_ms', '-'):>8} ms  p90 {result.get('p90_ms', '-'):>8} ms  "
+        f"p99 {result.get('p99_ms', '-'):>8} ms  queries {queries:>5}  errors {result['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--pages', nargs='+', help='Only benchmark these pages (e.g. home post_list)')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per page with the test client')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per page before measuring')
+    parser.add_argument('--url', help='Base URL of a running server to load test over HTTP')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent HTTP clients (with --url)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per page (with --url)')
+    parser.add_argument('--json', dest='json_path', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    paths = benchmark_paths()
+    if args.pages:
+        paths = {name: path for name, path in paths.items() if name in args.pages}
+
+    if args.url:
+        mode = 'http'
+        results = run_http(args.url, paths, args.concurrency, args.duration, args.warmup)
+    else:
+        mode = 'test_client'
+        results = run_test_client(paths, args.requests, args.warmup)
+
+    if args.json_path:
+        output = {
+            'benchmark': 'site',
+            'mode': mode,
+            'database': settings.DATABASES['default']['ENGINE'],
+            'published_posts': Post.objects.filter(status='published').count(),
+            'results': results,
+        }
+        if mode == 'http':
+            output.update({'url': args.url, 'concurrency': args.concurrency, 'duration': args.duration})
+        with open(args.json_path, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
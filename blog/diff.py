@@ -0,0 +1,404 @@
+"""
+Text diff engine for the AI blog editor's improve/compare workflow.
+
+Documents are compared line by line first, and changed line ranges are then
+compared word by word, so a one-word edit in a long paragraph shows up as a
+one-word change rather than a replaced line.
+
+Both passes use patience diff to anchor the comparison on tokens that occur
+exactly once on each side, and Myers' O(ND) algorithm with the linear-space
+"middle snake" refinement for the gaps between anchors. Unlike
+difflib.SequenceMatcher, the cost grows with the size of the edit rather than
+quadratically with the size of the document, so comparing two versions of a
+long post stays fast.
+"""
+import re
+from bisect import bisect_left
+
+# Word-level tokens: runs of word characters, runs of whitespace, or single
+# punctuation characters. Whitespace is kept so tokens join back to the text.
+WORD_TOKEN_RE = re.compile(r'\w+|[^\S\n]+|\n|[^\w\s]')
+
+# Changed line ranges larger than this (in characters, both sides combined)
+# are shown as whole-line changes instead of being compared word by word
+MAX_WORD_DIFF_CHARS = 10000
+
+# Word-level comparisons that need more than this many token insertions and
+# deletions are abandoned in favour of whole-line changes. Myers' cost grows
+# with the size of the edit times the size of the range, so a heavily
+# rewritten region would otherwise take seconds to compare word by word.
+MAX_WORD_EDIT_COST = 1000
+
+# Ranges with fewer tokens than this (both sides combined) skip the search for
+# patience anchors and go straight to Myers
+PATIENCE_MIN_TOKENS = 64
+
+# Number of unchanged lines shown around each change
+DEFAULT_CONTEXT_LINES = 3
+
+
+class EditTooLarge(Exception):
+    """Raised by get_opcodes() when the edit script exceeds max_cost."""
+
+
+def _intern(a, b):
+    """Map tokens of both sequences to small integers so comparisons are cheap."""
+    ids = {}
+    return (
+        [ids.setdefault(token, len(ids)) for token in a],
+        [ids.setdefault(token, len(ids)) for token in b],
+    )
+
+
+def _middle_snake(a, b, alo, ahi, blo, bhi, max_d=None):
+    """
+    Find the middle snake of the shortest edit script for a[alo:ahi] and b[blo:bhi].
+
+    Runs Myers' search forwards from the start and backwards from the end at the
+    same time, keeping only one row of furthest-reaching points per direction,
+    until the two searches overlap.
+
+    Raises:
+        EditTooLarge: If the searches haven't met after max_d steps each, i.e.
+                      the edit script is longer than about 2 * max_d
+
+    Returns:
+        tuple: (x, y, u, v) where a[x:u] == b[y:v] is the snake in the middle
+               of an optimal edit script
+    """
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta & 1
+    limit = (n + m + 1) // 2
+    offset = limit + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+
+    for d in range(limit + 1):
+        if max_d is not None and d > max_d:
+            raise EditTooLarge()
+        # Forward search along diagonals k = x - y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and delta - (d - 1) <= k <= delta + (d - 1):
+                if x + backward[offset + delta - k] >= n:
+                    return alo + start_x, blo + start_y, alo + x, blo + y
+
+        # Backward search, with x and y counted from the end of each sequence
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d:
+                if x + forward[offset + delta - k] >= n:
+                    return ahi - x, bhi - y, ahi - start_x, bhi - start_y
+
+    # Unreachable for non-empty inputs: the searches always meet by the limit
+    raise AssertionError("Myers search did not converge")
+
+
+def _myers_blocks(a, b, alo, ahi, blo, bhi, blocks, max_d=None):
+    """Append the matching blocks of a[alo:ahi] and b[blo:bhi] using linear-space Myers."""
+    # Common prefix and suffix are matched directly without searching
+    start_a, start_b = alo, blo
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        alo += 1
+        blo += 1
+    if alo > start_a:
+        blocks.append((start_a, start_b, alo - start_a))
+
+    suffix = 0
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1
+        bhi -= 1
+        suffix += 1
+
+    if alo < ahi and blo < bhi:
+        x, y, u, v = _middle_snake(a, b, alo, ahi, blo, bhi, max_d)
+        _myers_blocks(a, b, alo, x, blo, y, blocks, max_d)
+        if u > x:
+            blocks.append((x, y, u - x))
+        _myers_blocks(a, b, u, ahi, v, bhi, blocks, max_d)
+
+    if suffix:
+        blocks.append((ahi, bhi, suffix))
+
+
+def _unique_anchors(a, b, alo, ahi, blo, bhi):
+    """
+    Find patience diff anchors: tokens occurring exactly once in both ranges,
+    in the longest order that is increasing on both sides.
+    """
+    counts = {}
+    for i in range(alo, ahi):
+        entry = counts.get(a[i])
+        counts[a[i]] = [i, None, 1] if entry is None else [entry[0], None, entry[2] + 1]
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is not None and entry[2] == 1:
+            # Mark tokens seen twice in b so they are rejected below
+            entry[1] = j if entry[1] is None else -1
+
+    pairs = sorted(
+        (entry[0], entry[1]) for entry in counts.values()
+        if entry[2] == 1 and entry[1] is not None and entry[1] >= 0
+    )
+    if not pairs:
+        return []
+
+    # Longest increasing subsequence of b positions (patience sorting)
+    tails = []
+    tail_index = []
+    previous = [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pile] = j
+            tail_index[pile] = index
+        previous[index] = tail_index[pile - 1] if pile else None
+
+    anchors = []
+    index = tail_index[-1]
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _patience_blocks(a, b, alo, ahi, blo, bhi, blocks, max_d=None):
+    """Append the matching blocks of a[alo:ahi] and b[blo:bhi] using patience diff."""
+    # Gaps between adjacent anchors are usually empty or tiny, and Myers
+    # handles those without the cost of counting tokens
+    if alo == ahi or blo == bhi:
+        return
+    if ahi - alo + bhi - blo <= PATIENCE_MIN_TOKENS:
+        _myers_blocks(a, b, alo, ahi, blo, bhi, blocks, max_d)
+        return
+
+    anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+    if not anchors:
+        _myers_blocks(a, b, alo, ahi, blo, bhi, blocks, max_d)
+        return
+
+    for i, j in anchors:
+        _patience_blocks(a, b, alo, i, blo, j, blocks, max_d)
+        blocks.append((i, j, 1))
+        alo, blo = i + 1, j + 1
+    _patience_blocks(a, b, alo, ahi, blo, bhi, blocks, max_d)
+
+
+def get_opcodes(a, b, max_cost=None):
+    """
+    Compare two token sequences and describe how to turn a into b.
+
+    Args:
+        a: The original sequence of hashable tokens
+        b: The new sequence of hashable tokens
+        max_cost: Give up when a gap between patience anchors needs more than
+                  about this many insertions and deletions (None for no limit)
+
+    Returns:
+        list: (tag, i1, i2, j1, j2) tuples in the same format as
+              difflib.SequenceMatcher.get_opcodes(), with tag one of
+              'equal', 'replace', 'delete' or 'insert'
+
+    Raises:
+        EditTooLarge: If max_cost is exceeded
+    """
+    a_ids, b_ids = _intern(a, b)
+    blocks = []
+    max_d = None if max_cost is None else max(max_cost // 2, 1)
+    _patience_blocks(a_ids, b_ids, 0, len(a_ids), 0, len(b_ids), blocks, max_d)
+
+    opcodes = []
+    i = j = 0
+    for block_a, block_b, size in blocks + [(len(a), len(b), 0)]:
+        if i < block_a and j < block_b:
+            tag = 'replace'
+        elif i < block_a:
+            tag = 'delete'
+        elif j < block_b:
+            tag = 'insert'
+        else:
+            tag = None
+        if tag:
+            opcodes.append((tag, i, block_a, j, block_b))
+        if size:
+            # Adjacent matching blocks are merged into a single 'equal' opcode
+            if opcodes and opcodes[-1][0] == 'equal':
+                _, i1, _, j1, _ = opcodes.pop()
+                opcodes.append(('equal', i1, block_a + size, j1, block_b + size))
+            else:
+                opcodes.append(('equal', block_a, block_a + size, block_b, block_b + size))
+        i, j = block_a + size, block_b + size
+    return opcodes
+
+
+def _word_segments(old_lines, new_lines):
+    """
+    Compare changed lines word by word.
+
+    Returns:
+        tuple: (old_segments, new_segments), one list per line of
+               [tag, text] pairs where tag is '=' for unchanged text and
+               '-' or '+' for removed or added text
+
+    Raises:
+        EditTooLarge: If the lines differ in more than MAX_WORD_EDIT_COST tokens
+    """
+    old_tokens = WORD_TOKEN_RE.findall('\n'.join(old_lines))
+    new_tokens = WORD_TOKEN_RE.findall('\n'.join(new_lines))
+
+    old_segments = [[]]
+    new_segments = [[]]
+
+    def add(segments, tag, tokens):
+        for token in tokens:
+            if token == '\n':
+                segments.append([])
+            elif segments[-1] and segments[-1][-1][0] == tag:
+                segments[-1][-1][1] += token
+            else:
+                segments[-1].append([tag, token])
+
+    for tag, i1, i2, j1, j2 in get_opcodes(old_tokens, new_tokens, max_cost=MAX_WORD_EDIT_COST):
+        if tag == 'equal':
+            add(old_segments, '=', old_tokens[i1:i2])
+            add(new_segments, '=', new_tokens[j1:j2])
+        else:
+            add(old_segments, '-', old_tokens[i1:i2])
+            add(new_segments, '+', new_tokens[j1:j2])
+
+    return old_segments, new_segments
+
+
+def _changed_lines(tag, text, segments):
+    """Use word segments only when part of the line is unchanged."""
+    if any(segment[0] == '=' and segment[1].strip() for segment in segments):
+        return [tag, segments]
+    return [tag, text]
+
+
+def diff_texts(original, improved, context=DEFAULT_CONTEXT_LINES):
+    """
+    Compare two versions of a document line by line and then word by word.
+
+    Args:
+        original: The original text
+        improved: The new text
+        context: Number of unchanged lines to include around each change,
+                 or None to return the whole document as a single hunk
+
+    Returns:
+        dict: Diff with the following keys:
+            - hunks: List of hunks, each with 1-based 'old_start'/'new_start',
+              'old_lines'/'new_lines' counts and 'lines'. Each line is a
+              [tag, content] pair with tag ' ', '-' or '+'. Content is the
+              line text, or for changed lines that share words with their
+              counterpart, a list of [tag, text] word segments
+            - stats: Counts of added, removed and unchanged lines
+    """
+    old_lines = original.splitlines()
+    new_lines = improved.splitlines()
+    opcodes = get_opcodes(old_lines, new_lines)
+    stats = {'added': 0, 'removed': 0, 'unchanged': 0}
+
+    if not any(tag != 'equal' for tag, *_ in opcodes):
+        stats['unchanged'] = len(old_lines)
+        if context is None and old_lines:
+            lines = [[' ', line] for line in old_lines]
+            return {'hunks': [_hunk(0, 0, lines)], 'stats': stats}
+        return {'hunks': [], 'stats': stats}
+
+    # Group opcodes into hunks separated by long unchanged stretches, the same
+    # way difflib.SequenceMatcher.get_grouped_opcodes() does
+    if context is None:
+        groups = [opcodes]
+    else:
+        if opcodes[0][0] == 'equal':
+            tag, i1, i2, j1, j2 = opcodes[0]
+            opcodes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+        if opcodes[-1][0] == 'equal':
+            tag, i1, i2, j1, j2 = opcodes[-1]
+            opcodes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+
+        groups = []
+        group = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal' and i2 - i1 > 2 * context:
+                group.append((tag, i1, i1 + context, j1, j1 + context))
+                groups.append(group)
+                group = []
+                i1, j1 = i2 - context, j2 - context
+            group.append((tag, i1, i2, j1, j2))
+        if group and not (len(group) == 1 and group[0][0] == 'equal'):
+            groups.append(group)
+
+    hunks = []
+    for group in groups:
+        lines = []
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                lines.extend([' ', line] for line in old_lines[i1:i2])
+                continue
+
+            removed = old_lines[i1:i2]
+            added = new_lines[j1:j2]
+            stats['removed'] += len(removed)
+            stats['added'] += len(added)
+
+            changed_chars = sum(len(line) for line in removed) + sum(len(line) for line in added)
+            word_segments = None
+            if tag == 'replace' and changed_chars <= MAX_WORD_DIFF_CHARS:
+                try:
+                    word_segments = _word_segments(removed, added)
+                except EditTooLarge:
+                    # Too heavily rewritten to be worth comparing word by word
+                    pass
+            if word_segments:
+                old_segments, new_segments = word_segments
+                lines.extend(_changed_lines('-', text, segments) for text, segments in zip(removed, old_segments))
+                lines.extend(_changed_lines('+', text, segments) for text, segments in zip(added, new_segments))
+            else:
+                lines.extend(['-', line] for line in removed)
+                lines.extend(['+', line] for line in added)
+
+        hunks.append(_hunk(group[0][1], group[0][3], lines))
+
+    # Unchanged lines outside of the hunks still count towards the stats
+    stats['unchanged'] = len(old_lines) - stats['removed']
+    return {'hunks': hunks, 'stats': stats}
+
+
+def _hunk(old_start, new_start, lines):
+    """Build a hunk dictionary with unified-diff style 1-based line numbers."""
+    old_count = sum(1 for tag, _ in lines if tag != '+')
+    new_count = sum(1 for tag, _ in lines if tag != '-')
+    return {
+        'old_start': old_start + 1 if old_count else old_start,
+        'old_lines': old_count,
+        'new_start': new_start + 1 if new_count else new_start,
+        'new_lines': new_count,
+        'lines': lines,
+    }
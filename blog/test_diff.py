@@ -0,0 +1,77 @@
+import random
+
+from django.test import SimpleTestCase
+
+from blog import diff
+from blog.diff import EditTooLarge, diff_texts, get_opcodes
+
+
+def apply_opcodes(a, b, opcodes):
+    """Rebuild b from a and the opcodes, as a check that they are complete."""
+    result = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        result.extend(a[i1:i2] if tag == 'equal' else b[j1:j2])
+    return result
+
+
+class GetOpcodesTests(SimpleTestCase):
+    def test_opcodes_rebuild_the_new_sequence(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            a = [rng.choice('abcde') for _ in range(rng.randint(0, 80))]
+            b = list(a)
+            for _ in range(rng.randint(0, 10)):
+                position = rng.randint(0, len(b))
+                if b and rng.random() < 0.5:
+                    del b[min(position, len(b) - 1)]
+                else:
+                    b.insert(position, rng.choice('abcdef'))
+            opcodes = get_opcodes(a, b)
+            self.assertEqual(apply_opcodes(a, b, opcodes), b)
+
+    def test_identical_sequences_are_one_equal_opcode(self):
+        self.assertEqual(get_opcodes(['x', 'y'], ['x', 'y']), [('equal', 0, 2, 0, 2)])
+
+    def test_max_cost_raises_when_exceeded(self):
+        a = [str(i) for i in range(200)]
+        b = [str(i) for i in range(200, 400)]
+        with self.assertRaises(EditTooLarge):
+            get_opcodes(a, b, max_cost=10)
+        self.assertEqual(apply_opcodes(a, b, get_opcodes(a, b)), b)
+
+
+class DiffTextsTests(SimpleTestCase):
+    def test_unchanged_text_has_no_hunks(self):
+        result = diff_texts("one\ntwo", "one\ntwo")
+        self.assertEqual(result['hunks'], [])
+        self.assertEqual(result['stats'], {'added': 0, 'removed': 0, 'unchanged': 2})
+
+    def test_changed_line_is_split_into_word_segments(self):
+        result = diff_texts("# Title\nThe quick brown fox\nEnd", "# Title\nThe quick red fox\nEnd")
+        self.assertEqual(result['stats'], {'added': 1, 'removed': 1, 'unchanged': 2})
+        lines = result['hunks'][0]['lines']
+        self.assertEqual(lines[0], [' ', '# Title'])
+        self.assertEqual(lines[1], ['-', [['=', 'The quick '], ['-', 'brown'], ['=', ' fox']]])
+        self.assertEqual(lines[2], ['+', [['=', 'The quick '], ['+', 'red'], ['=', ' fox']]])
+
+    def test_context_limits_unchanged_lines(self):
+        original = '\n'.join(f'line {i}' for i in range(20))
+        improved = original.replace('line 10', 'line ten')
+        hunk, = diff_texts(original, improved, context=2)['hunks']
+        self.assertEqual((hunk['old_start'], hunk['old_lines'], hunk['new_lines']), (9, 5, 5))
+
+    def test_heavily_rewritten_region_falls_back_to_whole_lines(self):
+        # Every third word is kept, so a word diff would find some shared text,
+        # but it would take 1200 insertions and deletions to get there
+        original = 'x y a ' * 300
+        improved = 'p q a ' * 300
+        self.assertLess(len(original) + len(improved), diff.MAX_WORD_DIFF_CHARS)
+        self.assertGreater(1200, diff.MAX_WORD_EDIT_COST)
+        lines = diff_texts(original, improved)['hunks'][0]['lines']
+        self.assertEqual(lines, [['-', original], ['+', improved]])
+
+    def test_large_region_is_not_compared_word_by_word(self):
+        original = 'word ' * (diff.MAX_WORD_DIFF_CHARS // 5)
+        improved = original + 'extra'
+        lines = diff_texts(original, improved)['hunks'][0]['lines']
+        self.assertEqual(lines, [['-', original], ['+', improved]])
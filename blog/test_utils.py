@@ -0,0 +1,93 @@
+import json
+
+from django.test import SimpleTestCase
+
+from blog.utils import (
+    EditOperationError, apply_edit_operations, extract_edits, parse_edit_operations, split_sections,
+)
+
+POST = """# My Post
+
+Intro paragraph.
+
+## Setup
+
+Install it.
+
+```bash
+# not a heading
+pip install thing
+```
+
+## Usage
+
+Use it."""
+
+
+class SplitSectionsTests(SimpleTestCase):
+    def test_sections_start_at_headings_outside_code_blocks(self):
+        sections = split_sections(POST)
+        self.assertEqual([section['heading'] for section in sections], ['# My Post', '## Setup', '## Usage'])
+        self.assertIn('# not a heading', sections[1]['text'])
+
+
+class ParseEditOperationsTests(SimpleTestCase):
+    def test_accepts_a_list_a_wrapper_or_a_single_operation(self):
+        operation = {'op': 'delete', 'section': 'S1'}
+        self.assertEqual(parse_edit_operations(json.dumps([operation])), [operation])
+        self.assertEqual(parse_edit_operations(json.dumps({'edits': [operation]})), [operation])
+        self.assertEqual(parse_edit_operations(json.dumps(operation)), [operation])
+
+    def test_rejects_malformed_operations(self):
+        for raw in ('not json', '[]', '[{"op": "rename"}]', '[{"op": "replace", "section": "S1"}]',
+                    '[{"op": "delete"}]', '[{"op": "set_title", "title": " "}]'):
+            with self.subTest(raw=raw), self.assertRaises(EditOperationError):
+                parse_edit_operations(raw)
+
+
+class ApplyEditOperationsTests(SimpleTestCase):
+    def test_operations_resolve_against_the_original_sections(self):
+        content, title = apply_edit_operations(POST, [
+            {'op': 'replace', 'section': 'S2', 'content': '## Usage\n\nUse it well.'},
+            {'op': 'insert_before', 'section': 'S2', 'content': '## Config\n\nConfigure it.'},
+            {'op': 'delete', 'section': 'S1'},
+            {'op': 'append', 'content': '## Summary\n\nDone.'},
+        ])
+        self.assertIsNone(title)
+        self.assertEqual(
+            [section['heading'] for section in split_sections(content)],
+            ['# My Post', '## Config', '## Usage', '## Summary'],
+        )
+        self.assertIn('Use it well.', content)
+        self.assertNotIn('pip install', content)
+
+    def test_sections_can_be_referenced_by_heading(self):
+        content, _ = apply_edit_operations(POST, [{'op': 'delete', 'section': 'usage'}])
+        self.assertNotIn('## Usage', content)
+
+    def test_set_title_updates_the_level_one_heading(self):
+        content, title = apply_edit_operations(POST, [{'op': 'set_title', 'title': 'Better Title'}])
+        self.assertEqual(title, 'Better Title')
+        self.assertTrue(content.startswith('# Better Title\n'))
+
+    def test_unknown_section_changes_nothing(self):
+        with self.assertRaises(EditOperationError):
+            apply_edit_operations(POST, [{'op': 'delete', 'section': 'S9'}])
+
+
+class ExtractEditsTests(SimpleTestCase):
+    def test_content_with_a_fenced_code_block(self):
+        edits = [{'op': 'replace', 'section': 'S1',
+                  'content': '## Setup\n\n```bash\npip install thing\n```\n\nDone.'}]
+        response = ("```conversation\nUpdated the setup.\n```\n\n"
+                    f"```edits\n{json.dumps(edits, indent=2)}\n```\n")
+        self.assertEqual(parse_edit_operations(extract_edits(response)), edits)
+
+    def test_no_edits_section(self):
+        self.assertIsNone(extract_edits("```conversation\nJust answering.\n```"))
+
+    def test_invalid_json_runs_to_the_last_fence(self):
+        raw = extract_edits("```edits\n[{\"op\": broken ```x``` }]\n```")
+        self.assertEqual(raw, '[{"op": broken ```x``` }]')
+        with self.assertRaises(EditOperationError):
+            parse_edit_operations(raw)
@@ -17,5 +17,6 @@ urlpatterns = [
     path('ai_blog_conversation/', views.ai_blog_conversation_view, name='ai_blog_conversation'),
     path('ai_blog_improve/', views.ai_blog_improve_view, name='ai_blog_improve'),
     path('markdown_preview/', views.markdown_preview_view, name='markdown_preview'),
+    path('content_diff/', views.content_diff_view, name='content_diff'),
     path('save_ai_blog/', views.save_ai_blog_view, name='save_ai_blog'),
 ]
\ No newline at end of file
@@ -0,0 +1,387 @@
+"""
+Utility functions for the blog app.
+
+This module provides helpers for the AI blog editor:
+- Edit-operations mode, where the AI returns small section-level patches
+  instead of re-sending the complete blog post on every follow-up request
+- Block-level incremental markdown rendering for the live preview, where
+  each top-level block is rendered once and cached by content hash
+"""
+import hashlib
+import json
+import re
+
+from django.core.cache import cache
+from core.metrics import markdownify
+
+# Markdown ATX headings (# to ######) start a new section
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+
+# Fenced code blocks must not be split, since '#' lines inside them are code
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+
+# List items keep a block together across blank lines (loose lists)
+LIST_ITEM_RE = re.compile(r'^\s{0,3}([*+-]|\d+[.)])\s+')
+
+# Reference-style link definitions, footnotes and abbreviations affect the whole
+# document, so documents that use them are rendered in one piece
+DOCUMENT_SCOPED_RE = re.compile(r'^\s{0,3}(\[[^\]]+\]:|\*\[[^\]]+\]:)', re.MULTILINE)
+
+# How long rendered blocks and preview revisions stay cached (seconds)
+PREVIEW_CACHE_TIMEOUT = 60 * 60
+
+# Opening fence of the edits section in an AI response
+EDITS_FENCE_RE = re.compile(r'```edits[^\S\n]*\n?')
+
+# Supported edit operations
+EDIT_OPERATIONS = ('replace', 'insert_before', 'insert_after', 'delete', 'append', 'set_title')
+
+
+class EditOperationError(ValueError):
+    """Raised when AI edit operations cannot be validated or applied."""
+
+
+def split_sections(content):
+    """
+    Split markdown content into sections at heading boundaries.
+
+    Each section starts with a heading line and runs until the next heading.
+    Any text before the first heading is returned as a preamble section with
+    an empty heading. Headings inside fenced code blocks are ignored.
+
+    Args:
+        content: Markdown content of the blog post
+
+    Returns:
+        list: Dictionaries with 'id', 'heading' and 'text' keys, where 'text'
+              is the full section markdown including its heading line
+    """
+    sections = []
+    current_heading = ''
+    current_lines = []
+    in_fence = False
+
+    for line in content.splitlines():
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        heading_match = None if in_fence else HEADING_RE.match(line)
+        if heading_match:
+            if current_lines or current_heading:
+                sections.append((current_heading, current_lines))
+            current_heading = line.strip()
+            current_lines = [line]
+        else:
+            current_lines.append(line)
+
+    if current_lines or current_heading:
+        sections.append((current_heading, current_lines))
+
+    return [
+        {'id': f"S{index}", 'heading': heading, 'text': '\n'.join(lines).strip('\n')}
+        for index, (heading, lines) in enumerate(sections)
+    ]
+
+
+def join_sections(sections):
+    """
+    Join sections produced by split_sections back into markdown content.
+
+    Args:
+        sections: List of section dictionaries
+
+    Returns:
+        str: Markdown content with sections separated by a blank line
+    """
+    return '\n\n'.join(section['text'] for section in sections if section['text'].strip())
+
+
+def build_section_outline(sections):
+    """
+    Build a compact outline of section IDs and headings for the AI prompt.
+
+    Args:
+        sections: List of section dictionaries
+
+    Returns:
+        str: One line per section, e.g. "S2: ## Getting Started"
+    """
+    return '\n'.join(
+        f"{section['id']}: {section['heading'] or '(text before the first heading)'}"
+        for section in sections
+    )
+
+
+def extract_edits(ai_response):
+    """
+    Find the JSON of the edits section in an AI response.
+
+    Replacement content can contain fenced code blocks, so the section can't
+    simply end at the next ```. The JSON value after the opening fence is
+    decoded to find where it ends; if it isn't valid JSON, everything up to
+    the last closing fence is returned so parse_edit_operations() can report
+    the error.
+
+    Args:
+        ai_response: The complete text of the AI response
+
+    Returns:
+        str: The raw JSON of the edits, or None if there is no edits section
+    """
+    match = EDITS_FENCE_RE.search(ai_response)
+    if not match:
+        return None
+    rest = ai_response[match.end():]
+    start = len(rest) - len(rest.lstrip())
+    try:
+        _, end = json.JSONDecoder().raw_decode(rest, start)
+        return rest[start:end]
+    except json.JSONDecodeError:
+        closing = rest.rfind('```')
+        return (rest[:closing] if closing != -1 else rest).strip()
+
+
+def parse_edit_operations(raw_edits):
+    """
+    Parse and validate the JSON list of edit operations returned by the AI.
+
+    Args:
+        raw_edits: JSON string containing a list of operation objects
+
+    Returns:
+        list: Validated operation dictionaries
+
+    Raises:
+        EditOperationError: If the JSON is invalid or an operation is malformed
+    """
+    try:
+        operations = json.loads(raw_edits)
+    except json.JSONDecodeError as e:
+        raise EditOperationError(f"Invalid JSON in edits section: {e}")
+
+    # Accept a single operation or a wrapper object for robustness
+    if isinstance(operations, dict):
+        operations = operations.get('edits', [operations])
+    if not isinstance(operations, list) or not operations:
+        raise EditOperationError("Edits section must contain a non-empty list of operations")
+
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise EditOperationError("Each edit operation must be a JSON object")
+        op = operation.get('op')
+        if op not in EDIT_OPERATIONS:
+            raise EditOperationError(f"Unsupported edit operation: {op}")
+        if op == 'set_title':
+            if not str(operation.get('title', '')).strip():
+                raise EditOperationError("set_title requires a non-empty 'title'")
+            continue
+        if op != 'append' and not operation.get('section'):
+            raise EditOperationError(f"{op} requires a 'section' reference")
+        if op != 'delete' and not isinstance(operation.get('content'), str):
+            raise EditOperationError(f"{op} requires a 'content' string")
+
+    return operations
+
+
+def _find_section(sections, reference):
+    """
+    Locate a section by its ID (e.g. "S3") or by its exact heading text.
+
+    Raises:
+        EditOperationError: If the reference is unknown or ambiguous
+    """
+    reference = str(reference).strip()
+    for index, section in enumerate(sections):
+        if section['id'] == reference:
+            return index
+
+    # Fall back to matching the heading text, ignoring the leading #'s
+    normalized = reference.lstrip('#').strip().lower()
+    matches = [
+        index for index, section in enumerate(sections)
+        if section['heading'] and section['heading'].lstrip('#').strip().lower() == normalized
+    ]
+    if len(matches) == 1:
+        return matches[0]
+    if matches:
+        raise EditOperationError(f"Section reference is ambiguous: {reference}")
+    raise EditOperationError(f"Section not found: {reference}")
+
+
+def apply_edit_operations(content, operations):
+    """
+    Apply validated edit operations to the current blog post content.
+
+    Section references always resolve against the original content, so the
+    AI can describe all edits in terms of the outline it was given. Operations
+    are applied atomically: if any operation fails, nothing is changed.
+
+    Args:
+        content: Current markdown content of the blog post
+        operations: Validated operations from parse_edit_operations
+
+    Returns:
+        tuple: (updated_content, new_title) where new_title is None unless
+               a set_title operation was included
+
+    Raises:
+        EditOperationError: If a section reference cannot be resolved
+    """
+    sections = split_sections(content)
+
+    # Per-section slots: text to insert before, replacement text, text to insert after
+    slots = [{'before': [], 'text': section['text'], 'after': []} for section in sections]
+    appended = []
+    new_title = None
+
+    for operation in operations:
+        op = operation['op']
+        if op == 'set_title':
+            new_title = operation['title'].strip()
+            continue
+        if op == 'append':
+            appended.append(operation['content'].strip('\n'))
+            continue
+
+        slot = slots[_find_section(sections, operation['section'])]
+        if op == 'replace':
+            slot['text'] = operation['content'].strip('\n')
+        elif op == 'delete':
+            slot['text'] = ''
+        elif op == 'insert_before':
+            slot['before'].append(operation['content'].strip('\n'))
+        elif op == 'insert_after':
+            slot['after'].append(operation['content'].strip('\n'))
+
+    # Rebuild the document in original section order
+    parts = []
+    for slot in slots:
+        parts.extend(slot['before'])
+        parts.append(slot['text'])
+        parts.extend(slot['after'])
+    parts.extend(appended)
+    updated_content = join_sections([{'text': part} for part in parts])
+
+    # Keep the level 1 heading in sync with a retitled post
+    if new_title:
+        rebuilt = split_sections(updated_content)
+        for section in rebuilt:
+            heading_match = HEADING_RE.match(section['heading'])
+            if heading_match and heading_match.group(1) == '#':
+                body = section['text'].split('\n', 1)
+                section['text'] = f"# {new_title}" + (f"\n{body[1]}" if len(body) > 1 else '')
+                break
+        else:
+            rebuilt.insert(0, {'text': f"# {new_title}"})
+        updated_content = join_sections(rebuilt)
+
+    if not updated_content.strip():
+        raise EditOperationError("Edit operations would leave the blog post empty")
+
+    return updated_content, new_title
+
+
+def split_markdown_blocks(content):
+    """
+    Split markdown content into independently renderable top-level blocks.
+
+    Blocks are separated by blank lines, except inside fenced code blocks,
+    before indented continuation lines, and between items of the same list.
+
+    Args:
+        content: Markdown content
+
+    Returns:
+        list: Markdown source of each block, in document order
+    """
+    blocks = []
+    current = []
+    in_fence = False
+    pending_blank = False
+
+    for line in content.splitlines():
+        if not in_fence and not line.strip():
+            pending_blank = bool(current)
+            if current:
+                current.append(line)
+            continue
+
+        if pending_blank and not in_fence:
+            continues_block = line[:1] in (' ', '\t') or (
+                LIST_ITEM_RE.match(current[0]) and LIST_ITEM_RE.match(line)
+            )
+            if not continues_block:
+                blocks.append('\n'.join(current).rstrip('\n'))
+                current = []
+        pending_blank = False
+
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        current.append(line)
+
+    if current:
+        blocks.append('\n'.join(current).rstrip('\n'))
+    return blocks
+
+
+def _block_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def render_markdown_blocks(content):
+    """
+    Render markdown block by block, reusing cached HTML for unchanged blocks.
+
+    Each block's HTML is cached under the hash of its source, so editing one
+    paragraph of a long post only re-renders that paragraph. Documents with
+    document-scoped constructs (reference links, footnotes, abbreviations)
+    are rendered as a single block.
+
+    Args:
+        content: Markdown content
+
+    Returns:
+        tuple: (order, html_by_hash) where order is the list of block hashes in
+               document order and html_by_hash maps each hash to rendered HTML
+    """
+    if DOCUMENT_SCOPED_RE.search(content):
+        blocks = [content] if content.strip() else []
+    else:
+        blocks = split_markdown_blocks(content)
+
+    order = [_block_hash(block) for block in blocks]
+    cache_keys = {block_hash: f"markdown_block:{block_hash}" for block_hash in order}
+    cached = cache.get_many(list(cache_keys.values()))
+
+    html_by_hash = {}
+    rendered = {}
+    for block_hash, block in zip(order, blocks):
+        if block_hash in html_by_hash:
+            continue
+        html = cached.get(cache_keys[block_hash])
+        if html is None:
+            html = markdownify(block)
+            rendered[cache_keys[block_hash]] = html
+        html_by_hash[block_hash] = html
+
+    if rendered:
+        cache.set_many(rendered, PREVIEW_CACHE_TIMEOUT)
+    return order, html_by_hash
+
+
+def store_preview_revision(order):
+    """
+    Remember the block order of a rendered preview and return its revision ID.
+
+    Clients send the revision back as their base revision so the next preview
+    only needs to include blocks they don't already have.
+    """
+    revision = _block_hash('\n'.join(order))
+    cache.set(f"markdown_revision:{revision}", order, PREVIEW_CACHE_TIMEOUT)
+    return revision
+
+
+def get_preview_revision(revision):
+    """Return the block order stored for a preview revision, or None if unknown."""
+    if not revision:
+        return None
+    return cache.get(f"markdown_revision:{revision}")
@@ -8,15 +8,65 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.models import User
 import json
+import logging
 import re
-import requests
-import traceback
-from markdownx.utils import markdownify
-from difflib import SequenceMatcher
+from core.metrics import markdownify
+from .diff import DEFAULT_CONTEXT_LINES, diff_texts
 from .models import Post, Category
 from .forms import AIPostGeneratorForm
 from core.models import SiteConfig
 from core.utils import get_anthropic_api_key
+from core.ai import AIRequestError, send_message
+from core.conversations import build_messages, build_system_prompt, conversation_store, record_turn
+from .utils import (
+    EditOperationError, apply_edit_operations, build_section_outline, extract_edits,
+    get_preview_revision, parse_edit_operations, render_markdown_blocks,
+    split_sections, store_preview_revision,
+)
+
+logger = logging.getLogger(__name__)
+
+# System prompt for follow-up requests in edit-operations mode, where the AI returns
+# section-level patches instead of the complete post
+EDIT_OPERATIONS_SYSTEM_MESSAGE = """You are a professional blog content editor who helps users refine their blog posts.
+Your goal is to assist the user in improving their existing blog content through conversation.
+
+The user's post is provided together with a section outline. Each section starts at a markdown
+heading and is identified by an ID such as S0, S1, S2. S0 may be text before the first heading.
+
+EXTREMELY IMPORTANT: Format your responses in TWO distinct parts as follows:
+
+```conversation
+Your conversational response to the user goes here. Be friendly, helpful, and concise.
+Briefly explain the changes you've made to the blog post.
+```
+
+```edits
+[
+  {"op": "replace", "section": "S2", "content": "## Heading\\n\\nThe complete new text of section S2"},
+  {"op": "insert_after", "section": "S3", "content": "## New Section\\n\\nText of a new section"},
+  {"op": "delete", "section": "S4"}
+]
+```
+
+SUPPORTED OPERATIONS:
+- replace: Replace a whole section, including its heading line, with "content"
+- insert_before / insert_after: Insert new markdown "content" before or after a section
+- delete: Remove a section entirely
+- append: Add "content" to the end of the post (no section needed)
+- set_title: Change the post title, e.g. {"op": "set_title", "title": "New Title"}
+
+IMPORTANT GUIDELINES:
+1. The edits section MUST be a valid JSON array. Escape newlines in strings as \\n.
+2. Only include operations for the sections the user's request actually affects.
+3. Section references MUST use the IDs from the outline and refer to the ORIGINAL post.
+4. Replacement content must contain the complete new text of the section, including its heading.
+5. Use proper markdown formatting with headings (##, ###), lists, emphasis, etc.
+6. Keep the user's style and voice consistent.
+7. If the request is a question that needs no changes, ONLY include the conversation section.
+8. If the request requires rewriting most of the post, you may instead return a ```blogpost section
+   containing the COMPLETE updated post, starting with the title as a level 1 heading.
+"""
 
 def post_list(request, slug=None):
     """
@@ -128,6 +178,43 @@ def post_detail(request, year, month, day, slug):
 def is_staff(user):
     return user.is_staff
 
+def _request_ai_completion(api_key, system_message, messages, purpose='', max_tokens=4096, timeout=180):
+    """
+    Send a request to the Anthropic API for the AI blog tools.
+    
+    Args:
+        api_key: The Anthropic API key
+        system_message: The system prompt (a string or list of parts)
+        messages: List of role/content message dictionaries
+        purpose: Label stored with the usage record, e.g. 'blog_improve'
+        max_tokens: Maximum number of tokens to generate
+        timeout: Request timeout in seconds
+        
+    Returns:
+        tuple: (ai_response, error_response) where exactly one is None.
+               error_response is a JsonResponse ready to return from the view.
+    """
+    try:
+        # Defaults use an extended timeout for large documents, and the maximum
+        # number of output tokens allowed for this model to handle longer responses
+        ai_response, _ = send_message(
+            system_message,
+            messages,
+            api_key=api_key,
+            max_tokens=max_tokens,
+            temperature=0.7,  # Balanced creativity vs determinism
+            timeout=timeout,
+            purpose=purpose,
+        )
+    except AIRequestError as e:
+        return None, JsonResponse({
+            'error': f"API Error: {e}",
+            'status_code': e.status_code,
+            'detail': "The Anthropic API returned an error. Please check the API key and try again."
+        }, status=500)
+    
+    return ai_response, None
+
 @login_required
 @user_passes_test(is_staff)
 def ai_blog_editor_view(request):
@@ -184,10 +271,18 @@ def ai_blog_conversation_view(request):
     1. `conversation` - A natural language response to the user's message
     2. `blogpost` - The full blog post content in markdown format
     
+    For follow-up requests the view uses edit-operations mode by default: the AI
+    returns an `edits` section with section-level patches (replace, insert, delete)
+    instead of the full post. The patches are validated and applied to the current
+    content on the server. If they cannot be applied, the request is retried once
+    in full-rewrite mode, so the editor always receives a complete post.
+    
     This structured approach allows the system to:
     - Maintain a natural conversation with the user
     - Automatically extract and update the blog content in the editor
     - Keep the full post context across multiple interactions
+    - Keep AI responses small for long posts
+    - Remember earlier turns server-side, summarizing them as the conversation grows
     
     Args:
         request: The HTTP request with JSON data containing:
@@ -195,6 +290,8 @@ def ai_blog_conversation_view(request):
             - title: Current blog post title (optional)
             - content: Current blog post content (optional)
             - category: Current blog post category (optional)
+            - mode: 'auto' (default, edit operations for follow-ups) or 'full' (optional)
+            - conversation_id: Key returned by a previous response (optional)
         
     Returns:
         JsonResponse with:
@@ -202,6 +299,9 @@ def ai_blog_conversation_view(request):
             - content: The updated blog post content (if provided)
             - title: A suggested title (if provided)
             - overwrite_title: Whether to overwrite an existing title
+            - edit_mode: 'full', 'edits', 'full_fallback' or 'none'
+            - applied_edits: Number of edit operations applied (if content provided)
+            - conversation_id: Key to send with the next message
     """
     # Get API key and verify it's configured
     api_key = get_anthropic_api_key()
@@ -219,6 +319,7 @@ def ai_blog_conversation_view(request):
         title = data.get('title', '')
         content = data.get('content', '')
         category = data.get('category', '')
+        mode = data.get('mode', 'auto')
         
         # Validate message
         if not message:
@@ -230,6 +331,9 @@ def ai_blog_conversation_view(request):
         # Determine if this is an initial request or a follow-up
         is_initial = not content
         
+        # Follow-ups use edit operations unless the client asks for a full rewrite
+        use_edits = not is_initial and mode != 'full'
+        
         # Craft system prompt based on whether this is initial or follow-up
         if is_initial:
             system_message = """You are a professional blog content creator who helps users write engaging blog posts.
@@ -313,54 +417,40 @@ My request: {message}
 
 Please help with this specific request about the blog post. If you suggest substantial edits, please explain your reasoning."""
 
-        # Prepare API request
-        clean_api_key = api_key.strip().strip('"\'')
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {clean_api_key}",
-            "anthropic-version": "2023-06-01",
-            "x-api-key": clean_api_key
-        }
-        
-        # Configure API request with optimized parameters
-        request_body = {
-            "model": "claude-3-sonnet-20240229",
-            "max_tokens": 4096,  # Set to maximum allowed for this model to handle longer responses
-            "temperature": 0.7,  # Balanced creativity vs determinism
-            "messages": [{"role": "user", "content": user_prompt}],
-            "system": system_message
-        }
+        # In edit-operations mode the AI returns section-level patches instead of the full post,
+        # keeping the full-rewrite prompts as a fallback if the patches cannot be applied
+        if use_edits:
+            rewrite_system_message, rewrite_prompt = system_message, user_prompt
+            sections = split_sections(content)
+            system_message = EDIT_OPERATIONS_SYSTEM_MESSAGE
+            user_prompt = f"""Current blog post title: {title or "Untitled"}
+{f"Category: {category}" if category else ""}
+
+Section outline:
+{build_section_outline(sections)}
+
+Current content:
+```
+{content}
+```
+
+My request: {message}
+
+Reply with a conversation section and an edits section that only touches the sections this request affects."""
+
+        # Load the server-side conversation; earlier turns are sent from the stored
+        # history (with older turns summarized) rather than by the client
+        conversation = conversation_store.get(data.get('conversation_id'), request.user, 'blog')
         
-        # Make the API request with extended timeout for large documents
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers=headers,
-            json=request_body,
-            timeout=180  # Increased timeout to 3 minutes to accommodate larger responses
+        # Send the request to the AI
+        ai_response, error_response = _request_ai_completion(
+            api_key,
+            build_system_prompt(system_message, conversation),
+            build_messages(conversation, user_prompt),
+            purpose='blog_conversation',
         )
-        
-        # Handle API response errors
-        if response.status_code != 200:
-            error_message = "Unknown error"
-            try:
-                error_data = response.json()
-                if 'error' in error_data:
-                    if isinstance(error_data['error'], dict):
-                        error_message = error_data['error'].get('message', 'Unknown error')
-                    else:
-                        error_message = str(error_data['error'])
-            except Exception:
-                error_message = f"API error: {response.status_code}"
-                
-            return JsonResponse({
-                'error': f"API Error: {error_message}",
-                'status_code': response.status_code,
-                'detail': "The Anthropic API returned an error. Please check the API key and try again."
-            }, status=500)
-        
-        # Process the successful response
-        response_data = response.json()
-        ai_response = response_data['content'][0]['text']
+        if error_response:
+            return error_response
         
         # Extract conversation and blogpost parts
         conversation_match = re.search(r'```conversation\s*([\s\S]*?)\s*```', ai_response)
@@ -371,24 +461,68 @@ Please help with this specific request about the blog post. If you suggest subst
         
         # Extract the blogpost part (for the editor)
         blogpost_content = blogpost_match.group(1).strip() if blogpost_match else None
+        edit_mode = 'full'
+        applied_edits = 0
+        suggested_title = None
+        
+        # Apply section-level edits to the current content when no full rewrite was sent
+        if use_edits and not blogpost_content:
+            raw_edits = extract_edits(ai_response)
+            if raw_edits is not None:
+                try:
+                    operations = parse_edit_operations(raw_edits)
+                    blogpost_content, suggested_title = apply_edit_operations(content, operations)
+                    edit_mode = 'edits'
+                    applied_edits = len(operations)
+                except EditOperationError as e:
+                    logger.info("Edit operations rejected, falling back to full rewrite: %s", e)
+                    edit_mode = 'full_fallback'
+            else:
+                # A conversational answer without edits leaves the post unchanged
+                edit_mode = 'none'
+            
+            # Fall back to the full-document prompt when the edits could not be applied
+            if edit_mode == 'full_fallback':
+                ai_response, error_response = _request_ai_completion(
+                    api_key,
+                    build_system_prompt(rewrite_system_message, conversation),
+                    build_messages(conversation, rewrite_prompt),
+                    purpose='blog_conversation',
+                )
+                if error_response:
+                    return error_response
+                conversation_match = re.search(r'```conversation\s*([\s\S]*?)\s*```', ai_response)
+                blogpost_match = re.search(r'```blogpost\s*([\s\S]*?)\s*```', ai_response)
+                conversation_part = conversation_match.group(1).strip() if conversation_match else ai_response
+                blogpost_content = blogpost_match.group(1).strip() if blogpost_match else None
         
         # Extract the title from the blogpost content
-        title_match = re.search(r'^\s*#\s+([^\n]+)', blogpost_content) if blogpost_content else None
-        suggested_title = title_match.group(1).strip() if title_match else None
+        if not suggested_title:
+            title_match = re.search(r'^\s*#\s+([^\n]+)', blogpost_content) if blogpost_content else None
+            suggested_title = title_match.group(1).strip() if title_match else None
+        
+        logger.info(
+            "Blog conversation turn: edit_mode=%s applied_edits=%d title=%s",
+            edit_mode, applied_edits, suggested_title or 'None',
+            extra={'conversation_id': str(conversation.key), 'edit_mode': edit_mode},
+        )
+        logger.debug("Extracted conversation: %.100s", conversation_part)
+        logger.debug("Extracted blogpost: %.100s", blogpost_content or 'None')
         
-        # For debugging
-        print(f"Extracted conversation: {conversation_part[:100]}...")
-        print(f"Extracted blogpost: {blogpost_content[:100] if blogpost_content else 'None'}...")
-        print(f"Extracted title: {suggested_title or 'None'}")
+        # Store the exchange without the post content, which is re-sent fresh each turn
+        record_turn(conversation, message, conversation_part, api_key=api_key)
         
         # Prepare response data
         result = {
             'reply': conversation_part,
+            'edit_mode': edit_mode,
+            'conversation_id': str(conversation.key),
         }
         
         # Add content and title if available
         if blogpost_content:
             result['content'] = blogpost_content
+            result['applied_edits'] = applied_edits
         
         if suggested_title:
             result['title'] = suggested_title
@@ -402,8 +536,7 @@ Please help with this specific request about the blog post. If you suggest subst
             'detail': 'The request must include a valid JSON object.'
         }, status=400)
     except Exception as e:
-        print(f"Error in ai_blog_conversation_view: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error in ai_blog_conversation_view")
         return JsonResponse({
             'error': f"Error: {str(e)}",
             'detail': "An unexpected error occurred during the conversation."
@@ -498,54 +631,15 @@ Content:
 Please provide both improvement suggestions and the revised content with your suggested changes.
 """
 
-        # Prepare API request
-        clean_api_key = api_key.strip().strip('"\'')
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {clean_api_key}",
-            "anthropic-version": "2023-06-01",
-            "x-api-key": clean_api_key
-        }
-        
-        # Configure API request with optimized parameters
-        request_body = {
-            "model": "claude-3-sonnet-20240229",
-            "max_tokens": 4096,  # Set to maximum allowed for this model to handle longer responses
-            "temperature": 0.7,  # Balanced creativity vs determinism
-            "messages": [{"role": "user", "content": user_prompt}],
-            "system": system_message
-        }
-        
-        # Make the API request with extended timeout for large documents
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers=headers,
-            json=request_body,
-            timeout=180  # Increased timeout to 3 minutes to accommodate larger responses
+        # Send the request to the AI
+        ai_response, error_response = _request_ai_completion(
+            api_key,
+            system_message,
+            [{"role": "user", "content": user_prompt}],
+            purpose='blog_improve',
         )
-        
-        # Handle API response errors
-        if response.status_code != 200:
-            error_message = "Unknown error"
-            try:
-                error_data = response.json()
-                if 'error' in error_data:
-                    if isinstance(error_data['error'], dict):
-                        error_message = error_data['error'].get('message', 'Unknown error')
-                    else:
-                        error_message = str(error_data['error'])
-            except Exception:
-                error_message = f"API error: {response.status_code}"
-                
-            return JsonResponse({
-                'error': f"API Error: {error_message}",
-                'status_code': response.status_code,
-                'detail': "The Anthropic API returned an error. Please check the API key and try again."
-            }, status=500)
-        
-        # Process the successful response
-        response_data = response.json()
-        ai_response = response_data['content'][0]['text']
+        if error_response:
+            return error_response
         
         # Extract suggestions and improved content
         suggestions_match = re.search(r'SECTION 1:(?:\s*Improvement suggestions)?\s*([\s\S]*?)(?:SECTION 2:|$)', ai_response)
@@ -582,8 +676,7 @@ Please provide both improvement suggestions and the revised content with your su
             'detail': 'The request must include a valid JSON object.'
         }, status=400)
     except Exception as e:
-        print(f"Error in ai_blog_improve_view: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error in ai_blog_improve_view")
         return JsonResponse({
             'error': f"Error: {str(e)}",
             'detail': "An unexpected error occurred while analyzing your content."
@@ -599,29 +692,59 @@ def markdown_preview_view(request):
     
     This view powers the real-time preview feature in the AI blog editor by:
     1. Accepting markdown content from the editor
-    2. Converting it to HTML using the markdownify utility
+    2. Splitting it into top-level blocks and rendering each with markdownify
     3. Returning the rendered HTML for display in the preview pane
     4. Supporting the scroll position preservation system
     
-    The endpoint is designed for fast, frequent updates as the user types,
-    with minimal processing to ensure responsive previews.
+    The endpoint is designed for fast, frequent updates as the user types.
+    Rendered blocks are cached by content hash, so only blocks that changed since
+    any earlier preview are rendered again and latency stays flat for long posts.
+    
+    Clients that send a `base_revision` (the `revision` of their previous preview,
+    or null for the first one) get an incremental response containing only the
+    blocks they don't already have. If the base revision is unknown, for example
+    after it expired from the cache, all blocks are returned and `base_revision`
+    is null in the response.
     
     Args:
-        request: The HTTP request with JSON data containing 'content' field
+        request: The HTTP request with JSON data containing:
+            - content: The markdown content
+            - base_revision: Revision of the client's current preview (optional)
         
     Returns:
-        JsonResponse with the rendered HTML in the 'html' field
+        JsonResponse with the rendered HTML in the 'html' field, or for
+        incremental requests:
+            - revision: ID of this preview, to send as the next base_revision
+            - base_revision: The base revision the blocks are relative to (or null)
+            - order: Block hashes in document order
+            - blocks: Rendered HTML for each block hash not in the base revision
     """
     try:
         # Parse the request body
         data = json.loads(request.body)
         content = data.get('content', '')
         
-        # Render markdown to HTML
-        html = markdownify(content)
+        # Render markdown to HTML block by block, reusing cached blocks
+        order, html_by_hash = render_markdown_blocks(content)
+        
+        # Clients without revision tracking get the complete HTML
+        if 'base_revision' not in data:
+            return JsonResponse({
+                'html': '\n'.join(html_by_hash[block_hash] for block_hash in order)
+            })
+        
+        # Only send blocks the client doesn't already have from its base revision
+        base_order = get_preview_revision(data.get('base_revision'))
+        known_blocks = set(base_order) if base_order is not None else set()
         
         return JsonResponse({
-            'html': html
+            'revision': store_preview_revision(order),
+            'base_revision': data.get('base_revision') if base_order is not None else None,
+            'order': order,
+            'blocks': {
+                block_hash: html for block_hash, html in html_by_hash.items()
+                if block_hash not in known_blocks
+            },
         })
             
     except json.JSONDecodeError:
@@ -630,13 +753,65 @@ def markdown_preview_view(request):
             'detail': 'The request must include a valid JSON object.'
         }, status=400)
     except Exception as e:
-        print(f"Error in markdown_preview_view: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error in markdown_preview_view")
         return JsonResponse({
             'error': f"Error: {str(e)}",
             'detail': "An unexpected error occurred while rendering the preview."
         }, status=500)
 
+@csrf_exempt
+@login_required
+@user_passes_test(is_staff)
+@require_http_methods(["POST"])
+def content_diff_view(request):
+    """
+    API endpoint for comparing two versions of a blog post.
+    
+    Powers the Diff View in the AI blog editor. The comparison runs on the
+    server with the line-then-word diff engine in blog.diff, which stays fast
+    on long posts, and only the changed regions are returned as compact hunks.
+    
+    Args:
+        request: The HTTP request with JSON data containing:
+            - original: The original content
+            - improved: The new content
+            - context: Unchanged lines to show around each change (optional,
+              default 3, or null for the whole document)
+        
+    Returns:
+        JsonResponse with 'hunks' and 'stats' as described in blog.diff.diff_texts
+    """
+    try:
+        data = json.loads(request.body)
+        original = data.get('original', '')
+        improved = data.get('improved', '')
+        context = data.get('context', DEFAULT_CONTEXT_LINES)
+        
+        if not isinstance(original, str) or not isinstance(improved, str):
+            return JsonResponse({
+                'error': 'Invalid content',
+                'detail': 'Both original and improved must be strings.'
+            }, status=400)
+        if context is not None:
+            try:
+                context = max(int(context), 0)
+            except (TypeError, ValueError):
+                context = DEFAULT_CONTEXT_LINES
+        
+        return JsonResponse(diff_texts(original, improved, context=context))
+            
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON in request body',
+            'detail': 'The request must include a valid JSON object.'
+        }, status=400)
+    except Exception as e:
+        logger.exception("Error in content_diff_view")
+        return JsonResponse({
+            'error': f"Error: {str(e)}",
+            'detail': "An unexpected error occurred while comparing the content."
+        }, status=500)
+
 @login_required
 @user_passes_test(is_staff)
 def save_ai_blog_view(request):
@@ -866,53 +1041,17 @@ Important guidelines:
 The post should be {length} in length with a {tone} tone.
 """
 
-        # Prepare API request
-        clean_api_key = api_key.strip().strip('"\'')
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {clean_api_key}",
-            "anthropic-version": "2023-06-01",
-            "x-api-key": clean_api_key
-        }
-        
-        request_body = {
-            "model": "claude-3-sonnet-20240229",
-            "max_tokens": 4000,
-            "temperature": 0.7,
-            "messages": [{"role": "user", "content": user_message}],
-            "system": system_message
-        }
-        
-        # Make the API request
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers=headers,
-            json=request_body,
-            timeout=120  # Longer timeout for longer content generation
+        # Send the request to the AI with a longer timeout for longer content generation
+        ai_response, error_response = _request_ai_completion(
+            api_key,
+            system_message,
+            [{"role": "user", "content": user_message}],
+            purpose='blog_generate',
+            max_tokens=4000,
+            timeout=120,
         )
-        
-        # Handle API response errors
-        if response.status_code != 200:
-            error_message = "Unknown error"
-            try:
-                error_data = response.json()
-                if 'error' in error_data:
-                    if isinstance(error_data['error'], dict):
-                        error_message = error_data['error'].get('message', 'Unknown error')
-                    else:
-                        error_message = str(error_data['error'])
-            except Exception:
-                error_message = f"API error: {response.status_code}"
-                
-            return JsonResponse({
-                'error': f"API Error: {error_message}",
-                'status_code': response.status_code,
-                'detail': "The Anthropic API returned an error. Please check the API key and try again."
-            }, status=500)
-        
-        # Process the successful response
-        response_data = response.json()
-        ai_response = response_data['content'][0]['text']
+        if error_response:
+            return error_response
         
         # Extract title, slug, and content sections
         title_match = re.search(r'```title\s*([\s\S]*?)\s*```', ai_response)
@@ -953,8 +1092,7 @@ The post should be {length} in length with a {tone} tone.
             'detail': 'The request must include a valid JSON object.'
         }, status=400)
     except Exception as e:
-        print(f"Error in generate_ai_post_view: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error in generate_ai_post_view")
         return JsonResponse({
             'error': f"Error: {str(e)}",
             'detail': "An unexpected error occurred while generating the post."
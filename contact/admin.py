@@ -1,15 +1,111 @@
-from django.contrib import admin
-from .models import Contact
+import json
+
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.template.defaultfilters import linebreaksbr
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from .models import Contact, ContactArchive
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the query planner's row estimate instead of COUNT(*)
+    on PostgreSQL when the result is large.
+
+    Counting a large table means scanning all of it, on every changelist
+    page. Above `estimate_threshold` rows the exact total hardly matters for
+    paging, so the planner's estimate is used instead; below it (and on
+    other databases) the count is exact.
+    """
+    estimate_threshold = 10000
+
+    def _estimate(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate()
+        if estimate is not None and estimate > self.estimate_threshold:
+            return estimate
+        return super().count
+
 
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'subject', 'sent_at', 'read')
-    list_filter = ('sent_at', 'read')
+    list_display = ('name', 'email', 'subject', 'sent_at', 'status', 'read')
+    list_filter = ('status', 'sent_at', 'read')
     search_fields = ('name', 'email', 'subject', 'message')
     date_hierarchy = 'sent_at'
     ordering = ('-sent_at',)
-    readonly_fields = ('name', 'email', 'subject', 'message', 'sent_at', 'ip_address', 'user_agent')
-    
+    readonly_fields = ('name', 'email', 'subject', 'message', 'sent_at', 'ip_address', 'user_agent',
+                       'spam_score', 'fingerprint', 'notified_at')
+    paginator = EstimatedCountPaginator
+    # Don't count the whole table again for the "N total" link
+    show_full_result_count = False
+    actions = ('mark_read', 'mark_unread', 'delete_messages')
+
     def has_add_permission(self, request):
         # Prevent adding contacts manually
-        return False
\ No newline at end of file
+        return False
+
+    def get_actions(self, request):
+        # The built-in delete loads every selected message to confirm and log
+        # it; delete_messages is a single DELETE instead
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    # The actions below are one UPDATE or DELETE statement each, however many
+    # messages are selected (including "select all")
+
+    @admin.action(description="Mark selected messages as read", permissions=['change'])
+    def mark_read(self, request, queryset):
+        updated = queryset.update(read=True)
+        self.message_user(request, f"Marked {updated} messages as read.", messages.SUCCESS)
+
+    @admin.action(description="Mark selected messages as unread", permissions=['change'])
+    def mark_unread(self, request, queryset):
+        updated = queryset.update(read=False)
+        self.message_user(request, f"Marked {updated} messages as unread.", messages.SUCCESS)
+
+    @admin.action(description="Delete selected messages", permissions=['delete'])
+    def delete_messages(self, request, queryset):
+        deleted, _ = queryset.order_by().delete()
+        self.message_user(request, f"Deleted {deleted} messages.", messages.SUCCESS)
+
+
+@admin.register(ContactArchive)
+class ContactArchiveAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'email', 'sent_at', 'archived_at')
+    search_fields = ('email', 'subject')
+    date_hierarchy = 'sent_at'
+    fields = ('id', 'email', 'subject', 'sent_at', 'archived_at', 'archived_fields')
+    readonly_fields = fields
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description="Message")
+    def archived_fields(self, obj):
+        fields = obj.fields
+        return format_html(
+            "<strong>From:</strong> {} &lt;{}&gt;<br><strong>Status:</strong> {}<br><br>{}",
+            fields['name'], fields['email'], fields.get('status', ''), linebreaksbr(fields['message']),
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_notified(apps, schema_editor):
+    # Messages received before the pipeline existed were already seen; don't
+    # send them all in the first digest
+    Contact = apps.get_model('contact', 'Contact')
+    Contact.objects.update(notified_at=F('sent_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0001_initial'),
+    ]
+
+    operations = [
+        # Existing rows are accepted; new ones start out pending
+        migrations.AddField(
+            model_name='contact',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('spam', 'Spam'), ('duplicate', 'Duplicate')], default='accepted', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('spam', 'Spam'), ('duplicate', 'Duplicate')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='spam_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Hash of the normalized sender and message, for deduplication', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When a digest email included this message', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['status', 'id'], name='contact_status_idx'),
+        ),
+        migrations.RunPython(mark_existing_notified, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-19 03:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0002_contact_pipeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactArchive',
+            fields=[
+                ('id', models.BigIntegerField(help_text='ID of the original Contact', primary_key=True, serialize=False)),
+                ('sent_at', models.DateTimeField(db_index=True)),
+                ('email', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=200)),
+                ('data', models.BinaryField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'archived contact',
+                'ordering': ['-sent_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['sent_at'], name='contact_sent_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['read', 'sent_at'], name='contact_read_sent_at_idx'),
+        ),
+    ]
@@ -1,8 +1,18 @@
+import json
+import zlib
+
 from django.db import models
 from django.utils import timezone
 
 
 class Contact(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('accepted', 'Accepted'),
+        ('spam', 'Spam'),
+        ('duplicate', 'Duplicate'),
+    )
+    
     name = models.CharField(max_length=200)
     email = models.EmailField()
     subject = models.CharField(max_length=200)
@@ -12,8 +22,58 @@ class Contact(models.Model):
     user_agent = models.CharField(max_length=500, blank=True)
     read = models.BooleanField(default=False)
     
+    # Filled in by the background pipeline (see contact.pipeline)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    spam_score = models.FloatField(null=True, blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True,
+                                   help_text="Hash of the normalized sender and message, for deduplication")
+    notified_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                       help_text="When a digest email included this message")
+    
     class Meta:
         ordering = ['-sent_at']
+        indexes = [
+            # The pipeline's work queue
+            models.Index(fields=['status', 'id'], name='contact_status_idx'),
+            # The admin's default ordering, and its read/unread filter
+            models.Index(fields=['sent_at'], name='contact_sent_at_idx'),
+            models.Index(fields=['read', 'sent_at'], name='contact_read_sent_at_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.subject} from {self.name}"
\ No newline at end of file
+        return f"{self.subject} from {self.name}"
+
+
+class ContactArchive(models.Model):
+    """
+    An old contact message moved out of the Contact table by the
+    archive_contacts command.
+
+    Only what's needed to find a message is kept in columns; all of its
+    fields are stored as zlib-compressed JSON in `data`.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="ID of the original Contact")
+    sent_at = models.DateTimeField(db_index=True)
+    email = models.EmailField()
+    subject = models.CharField(max_length=200)
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-sent_at']
+        verbose_name = 'archived contact'
+    
+    def __str__(self):
+        return f"{self.subject} ({self.email})"
+    
+    @classmethod
+    def from_contact(cls, contact):
+        """An archive entry holding all of a Contact's fields."""
+        fields = {field.attname: getattr(contact, field.attname) for field in Contact._meta.concrete_fields}
+        data = zlib.compress(json.dumps(fields, default=str).encode('utf-8'), 9)
+        return cls(id=contact.pk, sent_at=contact.sent_at, email=contact.email, subject=contact.subject, data=data)
+    
+    @property
+    def fields(self):
+        """The original Contact's fields, as a dict."""
+        return json.loads(zlib.decompress(bytes(self.data)))
@@ -0,0 +1,236 @@
+"""
+Background processing of contact form submissions.
+
+The contact view only inserts the message, with status 'pending'. The
+process_contacts management command, running next to gunicorn, then works
+through pending messages in batches:
+
+- Each message gets a spam score from cheap heuristics (links, link markup,
+  common spam phrases, shouting). Messages scoring CONTACT_SPAM_THRESHOLD or
+  more are marked 'spam'.
+- Each message gets a fingerprint, a hash of the sender's address and the
+  normalized message text. A message whose fingerprint matches one accepted
+  in the last CONTACT_DEDUP_HOURS (someone pressing Send twice, or a bot
+  replaying a form) is marked 'duplicate'.
+- Everything else is 'accepted'.
+
+Accepted messages are not emailed one by one. Every CONTACT_DIGEST_MINUTES,
+if any have arrived, one digest listing them is sent to CONTACT_NOTIFY_EMAILS
+(or the site's public email address). A message is marked notified only once
+the digest has been handed to the mail server, so a failed send is retried in
+the next digest.
+"""
+import hashlib
+import logging
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import SiteConfig
+from .models import Contact
+
+logger = logging.getLogger(__name__)
+
+# Messages listed in full in one digest; any more are only counted
+DIGEST_MAX_MESSAGES = 50
+
+# Characters of each message shown in the digest
+DIGEST_EXCERPT_LENGTH = 500
+
+LINK_RE = re.compile(r'https?://|www\.', re.IGNORECASE)
+MARKUP_LINK_RE = re.compile(r'\[url[=\]]|<a\s+href', re.IGNORECASE)
+WORD_RE = re.compile(r'\w+')
+
+SPAM_PHRASES = (
+    'backlinks', 'bitcoin', 'casino', 'crypto', 'viagra', 'cialis', 'loan', 'seo services',
+    'rank your website', 'first page of google', 'guest post', 'click here', 'unsubscribe',
+    'limited time', 'free money', 'earn $', 'work from home', 'investment opportunity',
+)
+
+
+def spam_score(contact):
+    """
+    Score how likely a message is to be spam.
+
+    Each heuristic adds to the score; around 5 means several independent
+    signs of spam. The weights are rough and meant to be tuned with
+    CONTACT_SPAM_THRESHOLD rather than to be exact.
+
+    Returns:
+        float: 0 for a message with no signs of spam
+    """
+    text = f"{contact.subject}\n{contact.message}"
+    lowered = text.lower()
+    score = 0.0
+
+    links = len(LINK_RE.findall(text))
+    # One link is normal ("here's my repo"); each one after that is suspicious
+    score += max(0, links - 1) * 1.5
+    if MARKUP_LINK_RE.search(text):
+        # BBCode or HTML links only make sense to forum spam bots
+        score += 3.0
+    if LINK_RE.search(contact.name):
+        score += 3.0
+
+    score += sum(2.0 for phrase in SPAM_PHRASES if phrase in lowered)
+
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) >= 20 and sum(char.isupper() for char in letters) / len(letters) > 0.6:
+        score += 1.5
+
+    if len(WORD_RE.findall(contact.message)) < 3:
+        score += 1.0
+
+    return score
+
+
+def fingerprint(contact):
+    """
+    Hash of the sender's address and the message text, ignoring case,
+    punctuation and whitespace, for spotting repeated submissions.
+    """
+    words = ' '.join(WORD_RE.findall(contact.message.lower()))
+    key = f"{contact.email.strip().lower()}\n{words}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def process_pending(batch_size=100):
+    """
+    Score, deduplicate and accept one batch of pending messages.
+
+    The batch is locked with SELECT ... FOR UPDATE SKIP LOCKED where the
+    database supports it, so several workers never process the same message.
+
+    Args:
+        batch_size (int): Most messages to process
+
+    Returns:
+        dict: Number of messages given each status
+    """
+    counts = {'accepted': 0, 'spam': 0, 'duplicate': 0}
+    with transaction.atomic():
+        batch = list(Contact.objects.select_for_update(skip_locked=True)
+                     .filter(status='pending').order_by('id')[:batch_size])
+        if not batch:
+            return counts
+
+        for contact in batch:
+            contact.fingerprint = fingerprint(contact)
+            contact.spam_score = spam_score(contact)
+
+        # One query for every earlier copy of the messages in this batch
+        since = timezone.now() - timedelta(hours=settings.CONTACT_DEDUP_HOURS)
+        seen = set(
+            Contact.objects.filter(status='accepted', sent_at__gte=since,
+                                   fingerprint__in={contact.fingerprint for contact in batch})
+            .values_list('fingerprint', flat=True)
+        )
+
+        for contact in batch:
+            if contact.spam_score >= settings.CONTACT_SPAM_THRESHOLD:
+                contact.status = 'spam'
+            elif contact.fingerprint in seen:
+                contact.status = 'duplicate'
+            else:
+                contact.status = 'accepted'
+                seen.add(contact.fingerprint)
+            counts[contact.status] += 1
+
+        Contact.objects.bulk_update(batch, ['status', 'spam_score', 'fingerprint'])
+
+    logger.info("Processed %d contact messages: %d accepted, %d spam, %d duplicate",
+                len(batch), counts['accepted'], counts['spam'], counts['duplicate'])
+    return counts
+
+
+def notify_recipients():
+    """Addresses the digest goes to: CONTACT_NOTIFY_EMAILS, or the site's public email."""
+    if settings.CONTACT_NOTIFY_EMAILS:
+        return list(settings.CONTACT_NOTIFY_EMAILS)
+    site_email = SiteConfig.get().email
+    return [site_email] if site_email else []
+
+
+def digest_due(now=None):
+    """
+    Whether CONTACT_DIGEST_MINUTES have passed since the last digest.
+
+    The last digest time is read from the messages themselves, so it
+    survives restarts of the worker.
+    """
+    now = now or timezone.now()
+    last_sent = Contact.objects.aggregate(last=Max('notified_at'))['last']
+    return last_sent is None or now - last_sent >= timedelta(minutes=settings.CONTACT_DIGEST_MINUTES)
+
+
+def _excerpt(text):
+    text = text.strip()
+    if len(text) > DIGEST_EXCERPT_LENGTH:
+        text = text[:DIGEST_EXCERPT_LENGTH].rstrip() + '…'
+    return text
+
+
+def build_digest(contacts, total):
+    """
+    Subject and body of a digest email.
+
+    Args:
+        contacts (list): Contact objects to list, oldest first
+        total (int): Number of messages waiting, which may be more than listed
+    """
+    site = SiteConfig.get()
+    title = site.title or settings.SITE_TITLE
+    noun = 'message' if total == 1 else 'messages'
+    subject = f"[{title}] {total} new contact {noun}"
+
+    sections = []
+    for contact in contacts:
+        sections.append(
+            f"From: {contact.name} <{contact.email}>\n"
+            f"Sent: {timezone.localtime(contact.sent_at):%Y-%m-%d %H:%M}\n"
+            f"Subject: {contact.subject}\n\n"
+            f"{_excerpt(contact.message)}"
+        )
+    if total > len(contacts):
+        sections.append(f"…and {total - len(contacts)} more. Read them all in the admin.")
+    return subject, ('\n\n' + '-' * 40 + '\n\n').join(sections) + '\n'
+
+
+def send_digest():
+    """
+    Email the accepted messages that haven't been notified yet.
+
+    Returns:
+        int: Number of messages the digest covered; 0 if there was nothing
+             to send, no recipient, or the send failed
+    """
+    pending = Contact.objects.filter(status='accepted', notified_at__isnull=True)
+    last_id = pending.aggregate(last=Max('id'))['last']
+    if last_id is None:
+        return 0
+    # Messages accepted while the digest is being sent wait for the next one
+    pending = pending.filter(id__lte=last_id)
+    total = pending.count()
+    recipients = notify_recipients()
+    if not recipients:
+        logger.warning("%d contact messages waiting but no CONTACT_NOTIFY_EMAILS or site email set", total)
+        return 0
+
+    contacts = list(pending.order_by('sent_at')[:DIGEST_MAX_MESSAGES])
+    subject, body = build_digest(contacts, total)
+    # Replies go to the sender when there's only one message
+    reply_to = [contacts[0].email] if total == 1 else None
+    try:
+        EmailMessage(subject, body, to=recipients, reply_to=reply_to).send()
+    except Exception:
+        logger.exception("Could not send the contact digest; will retry with the next one")
+        return 0
+
+    pending.update(notified_at=timezone.now())
+    logger.info("Sent contact digest of %d messages to %s", total, ', '.join(recipients))
+    return total
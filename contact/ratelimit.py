@@ -0,0 +1,164 @@
+"""
+Rate limiting of contact form submissions.
+
+Every POST to the contact form takes a token from two token buckets: one for
+the client's IP address and one shared by all clients. A bucket holds up to
+`capacity` tokens and refills at a steady rate, so short bursts are allowed
+while a sustained flood is cut down to the refill rate. When either bucket is
+empty the view answers 429 straight away, before validating the form or
+touching the database.
+
+Buckets live in the default cache, so all gunicorn workers share them when
+CACHE_URL points at a shared cache. Reading and writing a bucket isn't atomic,
+so concurrent requests can occasionally get one token too many, which is fine
+for this purpose. If the cache can't be reached, each process falls back to
+its own in-memory buckets rather than letting everything through.
+
+Rates are written as "<tokens>/<period>", e.g. "5/10m" for a burst of five
+that refills completely in ten minutes. Periods are s, m, h or d, with an
+optional count.
+"""
+import ipaddress
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+RATE_RE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\s*$')
+
+PERIOD_SECONDS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+CACHE_KEY_PREFIX = 'contact:ratelimit:'
+
+# Buckets used while the cache is unavailable
+_local_buckets = {}
+_local_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """
+    Parse a rate such as "5/10m".
+
+    Returns:
+        tuple: (capacity in tokens, tokens refilled per second), or None if
+               the rate is empty (no limit)
+
+    Raises:
+        ValueError: If the rate isn't in the expected format
+    """
+    if not rate:
+        return None
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '5/10m'")
+    tokens, count, unit = match.groups()
+    period = int(count or 1) * PERIOD_SECONDS[unit]
+    return int(tokens), int(tokens) / period
+
+
+def client_ip(request):
+    """
+    The client's IP address.
+
+    Behind a reverse proxy REMOTE_ADDR is the proxy, and the client is in
+    X-Forwarded-For. Clients can send that header themselves, and each proxy
+    appends the address it received the request from, so only the last
+    NUM_PROXIES entries can be trusted; the client is the first of those.
+    With NUM_PROXIES = 0 the header is ignored.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    num_proxies = settings.NUM_PROXIES
+    if num_proxies:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+                     if part.strip()]
+        if forwarded:
+            candidate = forwarded[-min(num_proxies, len(forwarded))]
+            try:
+                return str(ipaddress.ip_address(candidate))
+            except ValueError:
+                logger.warning("Ignoring invalid X-Forwarded-For address %r", candidate)
+    return remote_addr
+
+
+def _take(state, capacity, refill_rate, now):
+    # Refill for the time since the last request, then take a token if there is one
+    tokens, updated = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * refill_rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / refill_rate
+
+
+class TokenBucket:
+    """
+    A named family of token buckets, e.g. one per IP address.
+
+    Args:
+        name (str): Prefix of the cache keys
+        rate (str): Capacity and refill rate, e.g. "5/10m"; empty for no limit
+    """
+
+    def __init__(self, name, rate):
+        self.name = name
+        parsed = parse_rate(rate)
+        self.capacity, self.refill_rate = parsed if parsed else (None, None)
+
+    def take(self, key=''):
+        """
+        Take a token from the bucket for the given key.
+
+        Returns:
+            float: 0 if a token was available, otherwise the seconds until
+                   one will be
+        """
+        if self.capacity is None:
+            return 0.0
+        cache_key = f'{CACHE_KEY_PREFIX}{self.name}:{key}'
+        now = time.time()
+        # Long enough for an untouched bucket to refill completely
+        timeout = int(self.capacity / self.refill_rate) + 1
+        try:
+            state, wait = _take(cache.get(cache_key), self.capacity, self.refill_rate, now)
+            cache.set(cache_key, state, timeout)
+        except Exception as e:
+            logger.warning("Rate limit cache unavailable, using local buckets: %s", e)
+            with _local_lock:
+                state, wait = _take(_local_buckets.get(cache_key), self.capacity, self.refill_rate, now)
+                _local_buckets[cache_key] = state
+        return wait
+
+
+_buckets = None
+
+
+def _get_buckets():
+    global _buckets
+    if _buckets is None:
+        _buckets = (
+            TokenBucket('ip', settings.CONTACT_RATE_LIMIT_IP),
+            TokenBucket('global', settings.CONTACT_RATE_LIMIT_GLOBAL),
+        )
+    return _buckets
+
+
+def check_rate_limit(request):
+    """
+    Take a token for a contact form submission.
+
+    The per-IP bucket is checked first, so a single flooding client doesn't
+    use up the global bucket for everyone else.
+
+    Returns:
+        float: 0 if the submission may proceed, otherwise the seconds the
+               client should wait before retrying
+    """
+    ip_bucket, global_bucket = _get_buckets()
+    wait = ip_bucket.take(client_ip(request))
+    if wait:
+        return wait
+    return global_bucket.take()
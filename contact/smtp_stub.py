@@ -0,0 +1,133 @@
+"""
+A minimal local SMTP server for development and tests.
+
+It accepts every message and keeps it in memory instead of delivering it, so
+the contact digest can be exercised end to end through Django's real SMTP
+backend without a mail server:
+
+    with SMTPStub() as stub:
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                               EMAIL_HOST=stub.host, EMAIL_PORT=stub.port):
+            send_digest()
+        assert stub.messages[0]['Subject'].startswith('[')
+
+`manage.py smtp_stub` runs it in the foreground and prints what arrives.
+Only the commands Django's backend uses are implemented (no TLS or AUTH).
+"""
+import email
+import email.policy
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """One SMTP session: HELO/EHLO, then any number of MAIL/RCPT/DATA transactions."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+    def handle(self):
+        self.reply(f'220 {self.server.server_address[0]} SMTP stub ready')
+        sender, recipients = None, []
+        for raw in self.rfile:
+            command, _, argument = raw.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+            command = command.upper()
+            if command == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif command == 'HELO':
+                self.reply('250 localhost')
+            elif command == 'MAIL':
+                sender, recipients = argument.partition(':')[2].strip(), []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                recipients.append(argument.partition(':')[2].strip())
+                self.reply('250 OK')
+            elif command == 'DATA':
+                if sender is None or not recipients:
+                    self.reply('503 Need MAIL and RCPT first')
+                    continue
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for data_line in self.rfile:
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    # Undo dot-stuffing
+                    lines.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                message = email.message_from_bytes(b''.join(lines), policy=email.policy.default)
+                self.server.deliver(sender, recipients, message)
+                sender, recipients = None, []
+                self.reply('250 OK: queued')
+            elif command in ('RSET', 'NOOP'):
+                if command == 'RSET':
+                    sender, recipients = None, []
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class _SMTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, on_message):
+        super().__init__(address, _SMTPHandler)
+        self.on_message = on_message
+
+    def deliver(self, sender, recipients, message):
+        self.on_message(sender, recipients, message)
+
+
+class SMTPStub:
+    """
+    An SMTP server on a background thread that records the messages it receives.
+
+    Args:
+        host (str): Address to listen on
+        port (int): Port to listen on; 0 picks a free one (see `port`)
+        on_message (callable): Called with (sender, recipients, message) for
+                               each message, in addition to recording it
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, on_message=None):
+        self.messages = []
+        self.envelopes = []
+        self._on_message = on_message
+        self._lock = threading.Lock()
+        self._server = _SMTPServer((host, port), self._record)
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def _record(self, sender, recipients, message):
+        with self._lock:
+            self.messages.append(message)
+            self.envelopes.append((sender, recipients))
+        if self._on_message:
+            self._on_message(sender, recipients, message)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def serve_forever(self):
+        """Run in the current thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
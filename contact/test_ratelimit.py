@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from contact import ratelimit
+from contact.ratelimit import TokenBucket, _take, check_rate_limit, client_ip, parse_rate
+
+
+class ParseRateTests(SimpleTestCase):
+    def test_rates(self):
+        self.assertEqual(parse_rate('5/10m'), (5, 5 / 600))
+        self.assertEqual(parse_rate('60/h'), (60, 60 / 3600))
+        self.assertEqual(parse_rate(' 2 / 1 s '), (2, 2.0))
+        self.assertIsNone(parse_rate(''))
+
+    def test_invalid_rates(self):
+        for rate in ('5', '5/10x', 'five/m', '/m'):
+            with self.subTest(rate=rate), self.assertRaises(ValueError):
+                parse_rate(rate)
+
+
+class TakeTests(SimpleTestCase):
+    def test_burst_up_to_capacity_then_refill(self):
+        state = None
+        for _ in range(3):
+            state, wait = _take(state, 3, 0.5, now=100.0)
+            self.assertEqual(wait, 0.0)
+        state, wait = _take(state, 3, 0.5, now=100.0)
+        self.assertEqual(wait, 2.0)
+
+        # Half a token after one second, a whole one after two
+        state, wait = _take(state, 3, 0.5, now=101.0)
+        self.assertEqual(wait, 1.0)
+        state, wait = _take(state, 3, 0.5, now=102.0)
+        self.assertEqual(wait, 0.0)
+
+    def test_refill_stops_at_capacity(self):
+        state, _ = _take(None, 2, 1.0, now=0.0)
+        state, _ = _take(state, 2, 1.0, now=1000.0)
+        self.assertEqual(state, (1.0, 1000.0))
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_keys_have_separate_buckets(self):
+        bucket = TokenBucket('test', '1/m')
+        with mock.patch('contact.ratelimit.time.time', return_value=1000.0):
+            self.assertEqual(bucket.take('a'), 0.0)
+            self.assertEqual(bucket.take('a'), 60.0)
+            self.assertEqual(bucket.take('b'), 0.0)
+        with mock.patch('contact.ratelimit.time.time', return_value=1060.0):
+            self.assertEqual(bucket.take('a'), 0.0)
+
+    def test_empty_rate_is_unlimited(self):
+        bucket = TokenBucket('test', '')
+        self.assertEqual([bucket.take() for _ in range(100)], [0.0] * 100)
+
+    def test_local_buckets_when_the_cache_fails(self):
+        bucket = TokenBucket('test', '1/m')
+        with mock.patch.object(ratelimit.cache, 'get', side_effect=ConnectionError('down')), \
+                mock.patch.dict(ratelimit._local_buckets, clear=True), \
+                self.assertLogs('contact.ratelimit', 'WARNING'):
+            self.assertEqual(bucket.take('a'), 0.0)
+            self.assertGreater(bucket.take('a'), 0.0)
+
+
+class ClientIPTests(SimpleTestCase):
+    def request(self, forwarded):
+        return RequestFactory().post('/contact/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded)
+
+    @override_settings(NUM_PROXIES=0)
+    def test_header_ignored_without_proxies(self):
+        self.assertEqual(client_ip(self.request('203.0.113.9')), '10.0.0.1')
+
+    @override_settings(NUM_PROXIES=1)
+    def test_only_trusted_entries_are_used(self):
+        # The first entry was sent by the client and can't be trusted
+        self.assertEqual(client_ip(self.request('1.2.3.4, 203.0.113.9')), '203.0.113.9')
+
+    @override_settings(NUM_PROXIES=2)
+    def test_fewer_entries_than_proxies(self):
+        self.assertEqual(client_ip(self.request('203.0.113.9')), '203.0.113.9')
+
+    @override_settings(NUM_PROXIES=1)
+    def test_invalid_address_falls_back_to_remote_addr(self):
+        with self.assertLogs('contact.ratelimit', 'WARNING'):
+            self.assertEqual(client_ip(self.request('not-an-ip')), '10.0.0.1')
+
+
+@override_settings(NUM_PROXIES=0, CONTACT_RATE_LIMIT_IP='2/m', CONTACT_RATE_LIMIT_GLOBAL='3/m')
+class CheckRateLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # Buckets are built from the settings on first use
+        self.addCleanup(setattr, ratelimit, '_buckets', None)
+        ratelimit._buckets = None
+
+    def request(self, ip):
+        return RequestFactory().post('/contact/', REMOTE_ADDR=ip)
+
+    def test_per_ip_then_global_limit(self):
+        with mock.patch('contact.ratelimit.time.time', return_value=1000.0):
+            self.assertEqual(check_rate_limit(self.request('10.0.0.1')), 0.0)
+            self.assertEqual(check_rate_limit(self.request('10.0.0.1')), 0.0)
+            self.assertEqual(check_rate_limit(self.request('10.0.0.1')), 30.0)
+            # A flooding client doesn't use up the global bucket
+            self.assertEqual(check_rate_limit(self.request('10.0.0.2')), 0.0)
+            self.assertEqual(check_rate_limit(self.request('10.0.0.3')), 20.0)
@@ -0,0 +1,125 @@
+import socket
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import SiteConfig
+from .models import Contact
+from .pipeline import process_pending, send_digest
+from .smtp_stub import SMTPStub
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+def make_contact(**fields):
+    values = {
+        'name': 'Ada',
+        'email': 'ada@example.com',
+        'subject': 'Hello',
+        'message': 'I enjoyed your post about caching, thanks for writing it.',
+    }
+    values.update(fields)
+    return Contact.objects.create(**values)
+
+
+def closed_port():
+    """A local port nothing is listening on."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@override_settings(CONTACT_SPAM_THRESHOLD=5.0, CONTACT_DEDUP_HOURS=24)
+class ProcessPendingTests(TestCase):
+    def test_spam_is_scored_and_marked(self):
+        spam = make_contact(
+            subject='SEO SERVICES',
+            message='Rank your website on the first page of google: http://a.example http://b.example '
+                    '[url=http://c.example]backlinks[/url]',
+        )
+        ham = make_contact(email='bob@example.com')
+        self.assertEqual(process_pending(), {'accepted': 1, 'spam': 1, 'duplicate': 0})
+        spam.refresh_from_db()
+        ham.refresh_from_db()
+        self.assertEqual(spam.status, 'spam')
+        self.assertGreaterEqual(spam.spam_score, 5.0)
+        self.assertEqual(ham.status, 'accepted')
+        self.assertLess(ham.spam_score, 5.0)
+
+    def test_repeat_within_dedup_window_is_a_duplicate(self):
+        first = make_contact()
+        # Case, punctuation and whitespace don't make a message different
+        second = make_contact(email='ADA@example.com ',
+                              message='i enjoyed your post about caching -- thanks for writing it!')
+        self.assertEqual(process_pending(), {'accepted': 1, 'spam': 0, 'duplicate': 1})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('accepted', 'duplicate'))
+        self.assertEqual(first.fingerprint, second.fingerprint)
+
+        third = make_contact()
+        process_pending()
+        third.refresh_from_db()
+        self.assertEqual(third.status, 'duplicate')
+
+    def test_repeat_outside_dedup_window_is_accepted(self):
+        make_contact(sent_at=timezone.now() - timedelta(hours=25))
+        process_pending()
+        repeat = make_contact()
+        process_pending()
+        repeat.refresh_from_db()
+        self.assertEqual(repeat.status, 'accepted')
+
+
+@override_settings(EMAIL_BACKEND=SMTP_BACKEND, CONTACT_NOTIFY_EMAILS=['owner@example.com'])
+class SendDigestTests(TestCase):
+    def setUp(self):
+        self.contacts = [make_contact(email=f'sender{i}@example.com') for i in range(3)]
+        process_pending()
+
+    def test_digest_is_sent_once(self):
+        with SMTPStub() as stub, override_settings(EMAIL_HOST=stub.host, EMAIL_PORT=stub.port):
+            self.assertEqual(send_digest(), 3)
+            self.assertEqual(send_digest(), 0)
+        self.assertEqual(len(stub.messages), 1)
+        self.assertEqual(stub.envelopes[0][1], ['<owner@example.com>'])
+        self.assertIn('3 new contact messages', stub.messages[0]['Subject'])
+        body = stub.messages[0].get_content()
+        for contact in self.contacts:
+            self.assertIn(contact.email, body)
+        self.assertFalse(Contact.objects.filter(notified_at__isnull=True).exists())
+
+    def test_single_message_replies_to_the_sender(self):
+        Contact.objects.exclude(pk=self.contacts[0].pk).delete()
+        with SMTPStub() as stub, override_settings(EMAIL_HOST=stub.host, EMAIL_PORT=stub.port):
+            self.assertEqual(send_digest(), 1)
+        self.assertEqual(stub.messages[0]['Reply-To'], self.contacts[0].email)
+
+    def test_failed_send_leaves_messages_unnotified(self):
+        with override_settings(EMAIL_HOST='127.0.0.1', EMAIL_PORT=closed_port(), EMAIL_TIMEOUT=2), \
+                self.assertLogs('contact.pipeline', 'ERROR'):
+            self.assertEqual(send_digest(), 0)
+        self.assertEqual(Contact.objects.filter(notified_at__isnull=True).count(), 3)
+
+        # The next digest picks them up
+        with SMTPStub() as stub, override_settings(EMAIL_HOST=stub.host, EMAIL_PORT=stub.port):
+            self.assertEqual(send_digest(), 3)
+        self.assertEqual(len(stub.messages), 1)
+
+    @override_settings(CONTACT_NOTIFY_EMAILS=[])
+    def test_no_recipient_sends_nothing(self):
+        config = SiteConfig.get()
+        config.email = ''
+        config.save()
+        with SMTPStub() as stub, override_settings(EMAIL_HOST=stub.host, EMAIL_PORT=stub.port), \
+                self.assertLogs('contact.pipeline', 'WARNING'):
+            self.assertEqual(send_digest(), 0)
+        self.assertEqual(stub.messages, [])
+        self.assertEqual(Contact.objects.filter(notified_at__isnull=True).count(), 3)
+
+    def test_nothing_accepted_sends_nothing(self):
+        Contact.objects.update(status='spam')
+        with SMTPStub() as stub, override_settings(EMAIL_HOST=stub.host, EMAIL_PORT=stub.port):
+            self.assertEqual(send_digest(), 0)
+        self.assertEqual(stub.messages, [])
@@ -1,10 +1,22 @@
+import math
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.http import HttpResponse
 from .forms import ContactForm
+from .ratelimit import check_rate_limit, client_ip
 from core.models import SiteConfig
 
 def contact(request):
     """Contact form view"""
+    if request.method == 'POST':
+        # Turn floods away before any form or database work (see contact.ratelimit)
+        wait = check_rate_limit(request)
+        if wait:
+            response = HttpResponse("Too many messages. Please try again later.",
+                                    status=429, content_type="text/plain")
+            response['Retry-After'] = str(math.ceil(wait))
+            return response
+    
     site = SiteConfig.get()
     
     if request.method == 'POST':
@@ -14,16 +26,11 @@ def contact(request):
             contact = form.save(commit=False)
             
             # Save IP and user agent for security
-            x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-            if x_forwarded_for:
-                ip = x_forwarded_for.split(',')[0]
-            else:
-                ip = request.META.get('REMOTE_ADDR')
-            
-            contact.ip_address = ip
+            contact.ip_address = client_ip(request) or None
             contact.user_agent = request.META.get('HTTP_USER_AGENT', '')
             
-            # Save the contact message
+            # Save the contact message; spam checks and the notification
+            # email happen later in the background (see contact.pipeline)
             contact.save()
             
             # Add success message and redirect
@@ -3,9 +3,8 @@ Custom admin views for AI-powered site configuration editor.
 """
 import os
 import json
+import logging
 import re
-import requests
-import traceback
 import reversion
 from django.shortcuts import render
 from django.http import JsonResponse
@@ -15,7 +14,11 @@ from django.views.decorators.http import require_http_methods
 from django.conf import settings
 from django.core.management import call_command
 from core.models import SiteConfig
-from core.utils import reload_env_settings, get_anthropic_api_key
+from core.utils import get_anthropic_api_key
+from core.ai import AIRequestError, send_message
+from core.conversations import build_messages, build_system_prompt, conversation_store, record_turn
+
+logger = logging.getLogger(__name__)
 
 @staff_member_required
 def ai_editor_view(request):
@@ -31,10 +34,7 @@ def ai_editor_view(request):
     api_key = get_anthropic_api_key()
     api_key_configured = bool(api_key)
     
-    # Debug output
-    print(f"AI Editor View: API key configured: {api_key_configured}")
-    if api_key_configured:
-        print(f"AI Editor View: API key starts with: {api_key[:5]}")
+    logger.debug("AI Editor View: API key configured: %s", api_key_configured)
     
     context = {
         'title': 'AI Site Configuration Editor',
@@ -44,7 +44,7 @@ def ai_editor_view(request):
         'debug_info': {
             'settings_key_present': api_key_configured,
             'model_key_present': False,
-            'api_key_first_chars': settings.ANTHROPIC_API_KEY[:5] if settings.ANTHROPIC_API_KEY else 'None'
+            'api_key_first_chars': api_key[:5] if api_key else 'None'
         }
     }
     return render(request, 'admin/core/ai_editor.html', context)
@@ -53,29 +53,29 @@ def ai_editor_view(request):
 @staff_member_required
 def test_json_view(request):
     """Simple test endpoint that just returns JSON"""
-    print("TEST_JSON_VIEW called successfully")
+    logger.debug("test_json_view called")
     return JsonResponse({'success': True, 'message': 'Test JSON response'})
 
 @csrf_exempt
 @staff_member_required
 def mock_ai_config_view(request):
     """A simplified version of the config endpoint that doesn't use the AI API"""
-    print("MOCK_AI_CONFIG_VIEW called - Beginning processing")
+    logger.debug("mock_ai_config_view called")
     
     try:
         # Try to parse request body
         try:
             data = json.loads(request.body)
             user_message = data.get('message', '')
-            print(f"Received message: {user_message}")
+            logger.debug("Received message: %s", user_message)
         except json.JSONDecodeError:
-            print("Failed to parse JSON request body")
+            logger.warning("Failed to parse JSON request body")
             return JsonResponse({'error': 'Invalid JSON in request body'}, status=400)
         
         # Get the current config
         config = SiteConfig.get()
         current_config = config.export_to_markdown()
-        print(f"Got current config: {len(current_config)} chars")
+        logger.debug("Got current config: %d chars", len(current_config))
         
         # Create a modified config based on the user message
         modified_config = current_config
@@ -106,13 +106,13 @@ def mock_ai_config_view(request):
                 
             # Apply the change if we found both current and new titles
             if current_title and new_title:
-                print(f"Changing title from '{current_title}' to '{new_title}'")
+                logger.debug("Changing title from '%s' to '%s'", current_title, new_title)
                 modified_config = modified_config.replace(f"title: {current_title}", f"title: {new_title}")
                 
         # Handle tagline changes
         if 'tagline' in user_message_lower:
             if 'awesome' in user_message_lower:
-                print("Detected request to change tagline")
+                logger.debug("Detected request to change tagline")
                 modified_config = modified_config.replace(
                     "tagline: Projects, Posts, Resume, and Contact Info", 
                     "tagline: Awesome Projects, Cool Posts, and More!"
@@ -121,26 +121,25 @@ def mock_ai_config_view(request):
         # Handle color changes
         if 'color' in user_message_lower:
             if 'primary' in user_message_lower and 'red' in user_message_lower:
-                print("Detected request to change primary color to red")
+                logger.debug("Detected request to change primary color to red")
                 modified_config = modified_config.replace(
                     "primary_color: '#007bff'", 
                     "primary_color: '#ff0000'"
                 )
             elif 'primary' in user_message_lower and 'green' in user_message_lower:
-                print("Detected request to change primary color to green")
+                logger.debug("Detected request to change primary color to green")
                 modified_config = modified_config.replace(
                     "primary_color: '#007bff'", 
                     "primary_color: '#00ff00'"
                 )
         
-        print(f"Modified config created: {len(modified_config)} chars")
-        print(f"First 100 chars: {modified_config[:100]}")
+        logger.debug("Modified config created: %d chars", len(modified_config))
         
         # Return the modified config
         return JsonResponse({'config': modified_config})
             
     except Exception as e:
-        print(f"Error in mock_ai_config_view: {str(e)}")
+        logger.exception("Error in mock_ai_config_view")
         return JsonResponse({'error': f"Error: {str(e)}"}, status=500)
 
 @csrf_exempt
@@ -160,19 +159,21 @@ def ai_config_view(request):
     - Multiple fallback mechanisms for API key retrieval
     - Comprehensive error handling at every step of the process
     - Special handling for "no changes needed" cases
-    - Support for message history to maintain context
+    - Server-side conversation history with rolling summarization, so the client
+      only sends the new message and prompts stay a constant size
     
     Endpoint: /ai_config/
     Method: POST
     Request Format:
         {
             "message": "The user request message (e.g., 'Change the title to Mick Blog')",
-            "history": Optional array of previous message history
+            "conversation_id": Optional key returned by a previous response
         }
     Response Format:
         {
             "reply": "Natural language response explaining the changes",
-            "config": "JSON configuration string with the changes applied"
+            "config": "JSON configuration string with the changes applied",
+            "conversation_id": "Key to send with the next message"
         }
     Or for errors:
         {
@@ -194,10 +195,10 @@ def ai_config_view(request):
         }, status=500)
     
     try:
-        # Step 2: Parse the request body to get the user message and optional history
+        # Step 2: Parse the request body to get the user message and optional conversation key
         data = json.loads(request.body)
         user_message = data.get('message', '')
-        message_history = data.get('history', [])
+        conversation_id = data.get('conversation_id')
         
         # Get the current site configuration as a dictionary
         config = SiteConfig.get()
@@ -205,16 +206,11 @@ def ai_config_view(request):
         current_config = json.dumps(config_dict, indent=2)
         
         # Step 3: Craft a specialized system prompt that requests BOTH a natural language response
-        # and a JSON configuration in a structured format
+        # and a JSON configuration in a structured format. The static instructions come first
+        # and the current configuration last, so the prompt prefix is identical on every turn
         system_message = f"""You are a configuration assistant for a Django website.
 Your task is to help users update their site configuration using both natural language and JSON.
 
-The current site configuration is provided as a JSON object:
-
-```json
-{current_config}
-```
-
 EXTREMELY IMPORTANT INSTRUCTIONS:
 1. First, determine if the user's request is asking for a specific configuration change.
    - If they are asking for a change (e.g., "Change the title to X", "Make the colors more vibrant"), provide BOTH explanation and JSON sections
@@ -274,132 +270,60 @@ Hello! I'm here to help you update your site configuration. If you'd like to mak
 ```
 """
 
-        # Step 4: Prepare the message array with conversation history
-        api_messages = []
-        
-        # Add previous conversation history if available
-        for msg in message_history:
-            # Skip system messages as they're not supported in this format
-            if msg["role"] == "system":
-                continue
-                
-            api_messages.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
-            
-        # Add the current user message
-        api_messages.append({"role": "user", "content": user_message})
-        
-        # Step 5: Set up API request headers
-        # Make sure there are no trailing whitespaces or quotes in the API key
-        clean_api_key = api_key.strip().strip('"\'')
-        
-        # Current documentation recommends using both Authorization and x-api-key headers
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {clean_api_key}",
-            "anthropic-version": "2023-06-01",
-            "x-api-key": clean_api_key  # Add this for compatibility with different API versions
-        }
-        
-        # Debug information about headers
-        print(f"COMBINED_AI: Authorization header length: {len(f'Bearer {clean_api_key}')}")
-        print(f"COMBINED_AI: Header starts with: Bearer {clean_api_key[:7]}...")
-        
-        # Step 6: Prepare the request body with parameters optimized for configuration generation
-        request_body = {
-            "model": "claude-3-sonnet-20240229",
-            "max_tokens": 4000,
-            "temperature": 0.2,  # Lower temperature for more deterministic output
-            "messages": api_messages,
-            "system": system_message
-        }
+        # The configuration is a separate system prompt part so the static instructions
+        # above stay cacheable even when the configuration changes
+        config_context = f"""The current site configuration is provided as a JSON object:
+
+```json
+{current_config}
+```
+"""
+
+        # Step 4: Load the server-side conversation and build the message array from
+        # the stored turns (with older turns folded into a summary) plus the new message
+        conversation = conversation_store.get(conversation_id, request.user, 'site_config')
+        system_message = build_system_prompt([system_message, config_context], conversation)
+        api_messages = build_messages(conversation, user_message)
         
         # Log the request details for debugging
-        print(f"COMBINED_AI: Processing request: {user_message}")
+        logger.debug(
+            "Processing site config request: %.200s", user_message,
+            extra={'conversation_id': str(conversation.key), 'stored_messages': len(conversation.messages)},
+        )
         
-        # Step 7: Make the API request with comprehensive error handling
+        # Step 5: Send the request with parameters optimized for configuration generation
+        # (lower temperature for more deterministic output)
         try:
-            # Log essential request information
-            print(f"COMBINED_AI: Sending request to Anthropic API")
-            print(f"COMBINED_AI: Using model: {request_body['model']}")
-            print(f"COMBINED_AI: User message: {user_message}")
-            
-            # Log the API key being used (first 5 chars only for security)
-            print(f"COMBINED_AI: Using API key starting with: {api_key[:5]}")
-            
-            # Send the API request to the most current endpoint
-            response = requests.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=request_body,
-                timeout=60
+            ai_response, _ = send_message(
+                system_message,
+                api_messages,
+                api_key=api_key,
+                max_tokens=4000,
+                temperature=0.2,
+                timeout=60,
+                purpose='site_config',
             )
+        except AIRequestError as e:
+            logger.warning("Site config API error: %s", e, extra={"status_code": e.status_code})
             
-            # Log response status immediately
-            print(f"COMBINED_AI: Received response with status code: {response.status_code}")
-            
-            # Log the response text if there's an error
-            if response.status_code != 200:
-                print(f"COMBINED_AI: Error response: {response.text[:200]}...")
-            
-        except requests.exceptions.RequestException as e:
-            # Handle network-related errors
-            error_detail = str(e)
-            print(f"COMBINED_AI: Request exception: {error_detail}")
-            
-            return JsonResponse({
-                'error': f"API connection error: {error_detail}",
-                'detail': "Failed to connect to the Anthropic API. Please check your network connection and try again."
-            }, status=500)
-        
-        # Step 8: Process API response with detailed error handling
-        if response.status_code != 200:
-            # If not a successful response, extract and format error information
-            error_message = "Unknown error"
-            error_type = "api_error"
-            
-            try:
-                # Get the full response text for logging
-                response_text = response.text
-                print(f"COMBINED_AI: Full error response: {response_text}")
-                
-                # Try to parse the response as JSON
-                error_data = response.json()
-                print(f"COMBINED_AI: JSON error data: {error_data}")
-                
-                # Extract structured error information if available
-                if 'error' in error_data:
-                    if isinstance(error_data['error'], dict):
-                        error_message = error_data['error'].get('message', 'Unknown error')
-                        error_type = error_data['error'].get('type', 'api_error')
-                    else:
-                        error_message = str(error_data['error'])
-                elif 'type' in error_data and 'message' in error_data:
-                    error_message = f"{error_data.get('type')}: {error_data.get('message')}"
-                    error_type = error_data.get('type', 'api_error')
-            except Exception as e:
-                # Catch-all for any error handling issues
-                error_message = f"Failed to parse error response: {str(e)}"
-                print(f"COMBINED_AI: Exception while handling error: {str(e)}")
-                
-            print(f"COMBINED_AI: API Error: {error_message}")
+            # Connection errors have no status code from the API
+            if e.status_code is None:
+                return JsonResponse({
+                    'error': str(e),
+                    'detail': "Failed to connect to the Anthropic API. Please check your network connection and try again."
+                }, status=500)
             
             # Return a comprehensive error response with all available information
             return JsonResponse({
-                'error': f"API Error: {error_message}",
-                'status_code': response.status_code,
-                'error_type': error_type,
+                'error': f"API Error: {e}",
+                'status_code': e.status_code,
+                'error_type': e.error_type,
                 'detail': "The Anthropic API returned an error. Please check the API key and try again."
             }, status=500)
         
-        # Step 9: Extract and process the successful API response
-        response_data = response.json()
-        ai_response = response_data['content'][0]['text']
-        print(f"COMBINED_AI: Raw response: {ai_response[:100]}...")
+        logger.debug("Raw response: %.100s", ai_response)
         
-        # Step 10: Parse the structured response to extract explanation and configuration
+        # Step 6: Parse the structured response to extract explanation and configuration
         explanation = ""
         config_json = ""
         
@@ -407,28 +331,30 @@ Hello! I'm here to help you update your site configuration. If you'd like to mak
         explanation_match = re.search(r'```explanation\s*([\s\S]*?)\s*```', ai_response)
         if explanation_match:
             explanation = explanation_match.group(1).strip()
-            print(f"COMBINED_AI: Extracted explanation: {explanation[:50]}...")
+            logger.debug("Extracted explanation: %.50s", explanation)
         else:
-            print(f"COMBINED_AI: No explanation section found, using full response as explanation")
+            logger.debug("No explanation section found, using full response as explanation")
             explanation = ai_response
         
         # Use regex to extract the JSON section
         json_match = re.search(r'```json\s*([\s\S]*?)\s*```', ai_response)
         if json_match:
             config_json = json_match.group(1).strip()
-            print(f"COMBINED_AI: Extracted JSON: {config_json[:50]}...")
+            logger.debug("Extracted JSON: %.50s", config_json)
         else:
-            print(f"COMBINED_AI: No JSON section found - possibly no changes needed")
+            logger.info("No JSON section found - possibly no changes needed")
             
             # For cases where the AI doesn't understand what to change or no changes are needed,
             # return only the explanation without a 500 error
+            record_turn(conversation, user_message, explanation, api_key=api_key)
             return JsonResponse({
                 'reply': explanation,
                 'config': None,  # No config changes
-                'no_changes': True  # Flag to indicate no changes were made
+                'no_changes': True,  # Flag to indicate no changes were made
+                'conversation_id': str(conversation.key),
             })
         
-        # Step 11: Validate the extracted JSON
+        # Step 7: Validate the extracted JSON
         try:
             # Parse the JSON to ensure it's valid
             parsed_config = json.loads(config_json)
@@ -436,17 +362,22 @@ Hello! I'm here to help you update your site configuration. If you'd like to mak
             # For debugging, validate the configuration has the required structure
             # Every config should have a site_info section
             if not isinstance(parsed_config, dict) or 'site_info' not in parsed_config:
-                print(f"COMBINED_AI: Warning - JSON response missing site_info section")
+                logger.warning("JSON response missing site_info section")
+            
+            # Store only the explanation; the current configuration is always
+            # re-sent fresh in the system prompt
+            record_turn(conversation, user_message, explanation, api_key=api_key)
             
             # Return both the explanation and configuration
             return JsonResponse({
                 'reply': explanation,
-                'config': config_json
+                'config': config_json,
+                'conversation_id': str(conversation.key),
             })
             
         except json.JSONDecodeError as e:
             # If the response isn't valid JSON, return an error
-            print(f"COMBINED_AI: Invalid JSON in response: {e}")
+            logger.warning("Invalid JSON in site config response: %s", e)
             return JsonResponse({
                 'error': "Invalid JSON in API response",
                 'detail': f"The API returned a response with invalid JSON: {str(e)}"
@@ -454,8 +385,7 @@ Hello! I'm here to help you update your site configuration. If you'd like to mak
             
     except Exception as e:
         # Catch-all exception handler for any unhandled errors
-        print(f"Error in ai_config_view: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error in ai_config_view")
         return JsonResponse({
             'error': f"Error: {str(e)}",
             'detail': "An unexpected error occurred while processing your request."
@@ -466,36 +396,36 @@ Hello! I'm here to help you update your site configuration. If you'd like to mak
 @staff_member_required
 def mock_apply_changes_view(request):
     """Simple version of apply changes that doesn't require authentication"""
-    print("MOCK_APPLY_CHANGES_VIEW called")
+    logger.debug("mock_apply_changes_view called")
     
     try:
         try:
             data = json.loads(request.body)
             new_config = data.get('config', '')
-            print(f"Received config: {len(new_config)} chars")
+            logger.debug("Received config: %d chars", len(new_config))
         except json.JSONDecodeError:
-            print("Failed to parse JSON request body")
+            logger.warning("Failed to parse JSON request body")
             return JsonResponse({'error': 'Invalid JSON in request body'}, status=400)
         
         if not new_config:
-            print("No configuration provided")
+            logger.warning("No configuration provided")
             return JsonResponse({'error': 'No configuration provided'}, status=400)
             
         # Save the new configuration to site_config.md
         config_path = os.path.join(settings.BASE_DIR, 'site_config.md')
-        print(f"Saving to {config_path}")
+        logger.debug("Saving to %s", config_path)
         
         with open(config_path, 'w') as f:
             f.write(new_config)
             
         # Update the database from the file
-        print("Calling update_site_config")
+        logger.debug("Calling update_site_config")
         call_command('update_site_config')
         
-        print("Configuration applied successfully")
+        logger.info("Configuration applied successfully")
         return JsonResponse({'success': True, 'message': 'Configuration updated successfully'})
     except Exception as e:
-        print(f"Error in mock_apply_changes_view: {str(e)}")
+        logger.exception("Error in mock_apply_changes_view")
         return JsonResponse({'error': f"Error applying changes: {str(e)}"}, status=500)
 
 @csrf_exempt
@@ -523,7 +453,7 @@ def apply_changes_view(request):
             "detail": "Additional error details"  // Optional
         }
     """
-    print("APPLY_CHANGES_VIEW called")
+    logger.debug("apply_changes_view called")
         
     try:
         # Step 1: Parse and validate the request data
@@ -621,11 +551,10 @@ def apply_changes_view(request):
                 if config.custom_css:
                     config.save_custom_css()
                 
-                print("Configuration successfully updated in database")
+                logger.info("Configuration successfully updated in database")
                 
             except Exception as e:
-                print(f"Error updating configuration: {str(e)}")
-                traceback.print_exc()
+                logger.exception("Error updating configuration")
                 return JsonResponse({
                     'error': f"Error updating configuration: {str(e)}",
                     'detail': "Failed to update the site configuration in the database."
@@ -639,15 +568,14 @@ def apply_changes_view(request):
         
     except json.JSONDecodeError as e:
         # Handle JSON parsing errors
-        print(f"JSON parsing error: {str(e)}")
+        logger.warning("JSON parsing error: %s", e)
         return JsonResponse({
             'error': f"Invalid JSON in request: {str(e)}",
             'detail': "The request body must be valid JSON with a 'config' field."
         }, status=400)
     except Exception as e:
         # Catch-all exception handler
-        print(f"Error in apply_changes_view: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error in apply_changes_view")
         return JsonResponse({
             'error': f"Error applying changes: {str(e)}",
             'detail': "An unexpected error occurred while updating the configuration."
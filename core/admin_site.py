@@ -7,18 +7,25 @@ appears in the admin interface even if there's an issue with the decorator-based
 
 from django.contrib import admin
 from django.urls import path
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.core.exceptions import PermissionDenied
-from .models import SiteConfig
+from django.core.paginator import Paginator
+from .history import diff_field_dicts, ensure_version_diffs, site_config_versions
+from .models import SiteConfig, AIUsageRecord
 from .admin.views import ai_editor_view, ai_config_view, apply_changes_view, test_json_view
+import logging
 import reversion
 from reversion.admin import VersionAdmin
-import traceback
 import time
 import os
 from django.contrib import messages
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
+# Versions per page of the configuration history
+HISTORY_PAGE_SIZE = 25
+
 class SiteConfigAdmin(VersionAdmin):
     fieldsets = (
         ('Basic Info', {
@@ -76,54 +83,70 @@ class SiteConfigAdmin(VersionAdmin):
         
     def history_view(self, request, object_id):
         """Custom history view that overrides the default django-reversion history view"""
+        return self._history_page(request)
+    
+    def _history_page(self, request):
+        """
+        Render one page of the configuration history.
+        
+        Versions are listed without loading their snapshots, together with the
+        fields each one changed (stored once per version, see core.history).
+        With ?partial=1 only the table rows are returned, which the page uses
+        to load further pages in place.
+        """
         config = SiteConfig.get()
-        history = reversion.models.Version.objects.get_for_object(config)
+        history = site_config_versions()
+        paginator = Paginator(history, HISTORY_PAGE_SIZE)
+        page = paginator.get_page(request.GET.get('page'))
+        diffs = ensure_version_diffs(page.object_list)
         
         context = {
-            'history': history,
+            'history': [(version, diffs.get(version.pk)) for version in page.object_list],
+            'page': page,
+            'latest_version_id': history.values_list('pk', flat=True).first(),
             'config': config,
             'title': 'Configuration History',
         }
         
+        if request.GET.get('partial'):
+            return render(request, 'admin/core/siteconfig/history_rows.html', context)
         return render(request, 'admin/core/siteconfig/history.html', context)
         
     def revision_view(self, request, object_id, version_id):
-        """View to show a specific revision"""
+        """
+        View to show a specific revision.
+        
+        Shows the changes the revision made, from its stored diff. With
+        ?compare=current the version is compared with the live configuration
+        instead, which has to be computed on each request.
+        """
         from reversion.models import Version
         
         config = SiteConfig.get()
-        version = Version.objects.get(pk=version_id)
+        version = get_object_or_404(Version.objects.select_related('revision__user'), pk=version_id)
         
         # Get the old data
         version_data = version.field_dict
         
-        # Get the current data
-        current_data = {}
-        for field_name, value in version_data.items():
-            if hasattr(config, field_name):
-                current_data[field_name] = getattr(config, field_name)
-        
-        # Compare the two versions to find changes
-        changes = {}
-        for field, old_value in version_data.items():
-            if field in current_data:
-                new_value = current_data[field]
-                # Only include fields that have changed
-                if old_value != new_value:
-                    # For large text fields, show a preview
-                    if isinstance(old_value, str) and len(old_value) > 200:
-                        old_value = f"{old_value[:200]}..."
-                    if isinstance(new_value, str) and len(new_value) > 200:
-                        new_value = f"{new_value[:200]}..."
-                    changes[field] = (new_value, old_value)  # Note: current first, version second
+        compare_current = request.GET.get('compare') == 'current'
+        if compare_current:
+            # Compare the version with the live configuration
+            current_data = {
+                field_name: getattr(config, field_name)
+                for field_name in version_data if hasattr(config, field_name)
+            }
+            changes = diff_field_dicts(version_data, current_data)
+        else:
+            diff = ensure_version_diffs([version]).get(version.pk)
+            changes = diff.changes if diff else {}
         
         context = {
             'title': f'Version {version_id} of {config}',
             'config': config,
             'version': version,
             'data': version_data,
-            'current_data': current_data,
             'changes': changes,
+            'compare_current': compare_current,
             'can_revert': True,
         }
         
@@ -199,16 +222,7 @@ class SiteConfigAdmin(VersionAdmin):
     
     def config_history_view(self, request):
         """View to display configuration history and allow comparing versions"""
-        config = SiteConfig.get()
-        history = reversion.models.Version.objects.get_for_object(config)
-        
-        context = {
-            'history': history,
-            'config': config,
-            'title': 'Configuration History',
-        }
-        
-        return render(request, 'admin/core/siteconfig/history.html', context)
+        return self._history_page(request)
     
     def has_add_permission(self, request):
         # Limit to only one instance
@@ -223,7 +237,7 @@ class SiteConfigAdmin(VersionAdmin):
         Override save_model to ensure changes are correctly saved and CSS is exported.
         Using django-reversion's create_revision to automatically track changes.
         """
-        print(f"ADMIN SAVE: Saving site config with title={obj.title}")
+        logger.info("Saving site config from admin: title=%s", obj.title)
         
         try:
             with reversion.create_revision():
@@ -243,8 +257,7 @@ class SiteConfigAdmin(VersionAdmin):
                 
         except Exception as e:
             # Log any errors
-            print(f"ERROR in admin save_model: {e}")
-            traceback.print_exc()
+            logger.exception("Error in admin save_model")
             messages.error(request, f"Error updating site configuration: {e}")
             
     def response_change(self, request, obj):
@@ -271,4 +284,26 @@ class SiteConfigAdmin(VersionAdmin):
         return super().changelist_view(request, extra_context=extra_context)
 
 # Direct registration to ensure model is in admin
-admin.site.register(SiteConfig, SiteConfigAdmin)
\ No newline at end of file
+admin.site.register(SiteConfig, SiteConfigAdmin)
+
+
+class AIUsageRecordAdmin(admin.ModelAdmin):
+    """
+    Read-only list of Anthropic API calls with their token usage.
+    
+    Comparing cache read/write tokens against uncached input tokens and latency
+    shows how much the prompt cache saves for each AI feature.
+    """
+    list_display = ('created', 'purpose', 'model', 'input_tokens', 'cache_creation_input_tokens',
+                    'cache_read_input_tokens', 'output_tokens', 'latency_ms', 'cache_requested')
+    list_filter = ('purpose', 'cache_requested', 'model')
+    date_hierarchy = 'created'
+    
+    def has_add_permission(self, request):
+        # Records are only created by API calls
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(AIUsageRecord, AIUsageRecordAdmin)
@@ -0,0 +1,241 @@
+"""
+Anthropic API request helpers shared by the AI editors.
+
+This module builds and sends requests to the Anthropic Messages API so that
+the blog editor and the site configuration editor use the same headers,
+error handling and response parsing.
+
+System prompts can be passed as a list of parts ordered from most to least
+stable (static instructions, then context such as the site configuration,
+then the conversation summary). When prompt caching is enabled, each part and
+the stored conversation history are marked as cache breakpoints so repeated
+calls can reuse the cached prefix. The token usage of every call, including
+cache reads and writes, is recorded in AIUsageRecord.
+"""
+import logging
+import time
+
+import requests
+from django.conf import settings
+
+from core.metrics import record_timing
+from core.utils import get_anthropic_api_key
+
+logger = logging.getLogger(__name__)
+
+ANTHROPIC_MESSAGES_URL = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+DEFAULT_MODEL = "claude-3-sonnet-20240229"
+
+# The API accepts at most four cache breakpoints per request
+MAX_CACHE_BREAKPOINTS = 4
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+class AIRequestError(Exception):
+    """
+    Raised when the Anthropic API cannot be reached or returns an error.
+
+    Attributes:
+        status_code: HTTP status code returned by the API (None for connection errors)
+        error_type: The API error type, e.g. 'rate_limit_error'
+    """
+    def __init__(self, message, status_code=None, error_type='api_error'):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error_type = error_type
+
+
+def build_headers(api_key):
+    """
+    Build the request headers for the Anthropic API.
+
+    Args:
+        api_key: The Anthropic API key (surrounding whitespace and quotes are stripped)
+
+    Returns:
+        dict: HTTP headers for the Messages API
+    """
+    # Make sure there are no trailing whitespaces or quotes in the API key
+    clean_api_key = api_key.strip().strip('"\'')
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {clean_api_key}",
+        "anthropic-version": ANTHROPIC_VERSION,
+        "x-api-key": clean_api_key,
+    }
+
+
+def _system_parts(system):
+    """Normalize a system prompt (string or list of parts) to a list of non-empty parts."""
+    parts = [system] if isinstance(system, str) else list(system or [])
+    return [part for part in parts if part]
+
+
+def build_request_body(system, messages, max_tokens=4096, temperature=0.7, model=None, cache=None):
+    """
+    Build the JSON body for a Messages API request.
+
+    With caching enabled, the system prompt is sent as text blocks with a cache
+    breakpoint on each part (up to three), and the last stored message before the
+    new user message gets the final breakpoint so earlier turns are reused too.
+    Without caching the parts are joined into a single system string.
+
+    Args:
+        system: The system prompt, as a string or a list of parts ordered from
+                most to least stable
+        messages: List of {'role': ..., 'content': ...} message dictionaries
+        max_tokens: Maximum number of tokens to generate
+        temperature: Sampling temperature
+        model: Model name (defaults to DEFAULT_MODEL)
+        cache: Whether to mark cacheable prefixes (defaults to settings.AI_PROMPT_CACHING)
+
+    Returns:
+        dict: Request body ready to be sent as JSON
+    """
+    if cache is None:
+        cache = getattr(settings, 'AI_PROMPT_CACHING', True)
+    parts = _system_parts(system)
+
+    if not cache:
+        return {
+            "model": model or DEFAULT_MODEL,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": messages,
+            "system": "\n\n".join(parts),
+        }
+
+    # Reserve one breakpoint for the conversation history when there is any
+    has_history = len(messages) > 1
+    system_breakpoints = MAX_CACHE_BREAKPOINTS - (1 if has_history else 0)
+
+    # Mark the most stable parts first; extra parts beyond the limit are
+    # merged into the last marked block so the whole prompt is still cached
+    if len(parts) > system_breakpoints:
+        parts = parts[:system_breakpoints - 1] + ["\n\n".join(parts[system_breakpoints - 1:])]
+    system_blocks = [{"type": "text", "text": part, "cache_control": CACHE_CONTROL} for part in parts]
+
+    cached_messages = list(messages)
+    if has_history:
+        last_stored = cached_messages[-2]
+        cached_messages[-2] = {
+            "role": last_stored["role"],
+            "content": [{"type": "text", "text": last_stored["content"], "cache_control": CACHE_CONTROL}],
+        }
+
+    return {
+        "model": model or DEFAULT_MODEL,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "messages": cached_messages,
+        "system": system_blocks,
+    }
+
+
+def record_usage(purpose, model, response_data, latency_ms, cached):
+    """
+    Store the token usage reported by the API for a single call.
+
+    Failures are logged and swallowed so usage tracking can never break an
+    AI request.
+
+    Args:
+        purpose: Short label for the caller, e.g. 'blog_conversation'
+        model: The model that was requested
+        response_data: Decoded JSON response from the API
+        latency_ms: Wall-clock time of the HTTP request in milliseconds
+        cached: Whether cache breakpoints were sent with the request
+    """
+    from core.models import AIUsageRecord
+
+    usage = response_data.get('usage') or {}
+    try:
+        AIUsageRecord.objects.create(
+            purpose=purpose,
+            model=response_data.get('model') or model,
+            input_tokens=usage.get('input_tokens') or 0,
+            output_tokens=usage.get('output_tokens') or 0,
+            cache_creation_input_tokens=usage.get('cache_creation_input_tokens') or 0,
+            cache_read_input_tokens=usage.get('cache_read_input_tokens') or 0,
+            latency_ms=latency_ms,
+            cache_requested=cached,
+        )
+    except Exception as e:
+        logger.warning("Failed to record AI usage: %s", e)
+
+
+def _extract_error(response):
+    """Extract an error message and type from an unsuccessful API response."""
+    error_message = "Unknown error"
+    error_type = "api_error"
+    try:
+        error_data = response.json()
+        if 'error' in error_data:
+            if isinstance(error_data['error'], dict):
+                error_message = error_data['error'].get('message', 'Unknown error')
+                error_type = error_data['error'].get('type', 'api_error')
+            else:
+                error_message = str(error_data['error'])
+        elif 'type' in error_data and 'message' in error_data:
+            error_message = f"{error_data.get('type')}: {error_data.get('message')}"
+            error_type = error_data.get('type', 'api_error')
+    except Exception:
+        error_message = f"API error: {response.status_code}"
+    return error_message, error_type
+
+
+def send_message(system, messages, api_key=None, max_tokens=4096, temperature=0.7,
+                 model=None, timeout=180, purpose='', cache=None):
+    """
+    Send a request to the Anthropic Messages API and return the response text.
+
+    Args:
+        system: The system prompt, as a string or a list of parts ordered from
+                most to least stable
+        messages: List of {'role': ..., 'content': ...} message dictionaries
+        api_key: The Anthropic API key (looked up with get_anthropic_api_key if omitted)
+        max_tokens: Maximum number of tokens to generate
+        temperature: Sampling temperature
+        model: Model name (defaults to DEFAULT_MODEL)
+        timeout: Request timeout in seconds
+        purpose: Short label stored with the usage record, e.g. 'site_config'
+        cache: Whether to mark cacheable prefixes (defaults to settings.AI_PROMPT_CACHING)
+
+    Returns:
+        tuple: (text, response_data) with the first text block of the reply
+               and the full decoded JSON response
+
+    Raises:
+        AIRequestError: If the API key is missing, the request fails, or the
+                        API returns a non-200 status
+    """
+    api_key = api_key or get_anthropic_api_key()
+    if not api_key:
+        raise AIRequestError('Anthropic API key not configured')
+
+    if cache is None:
+        cache = getattr(settings, 'AI_PROMPT_CACHING', True)
+    request_body = build_request_body(system, messages, max_tokens, temperature, model, cache=cache)
+
+    started = time.monotonic()
+    try:
+        response = requests.post(
+            settings.ANTHROPIC_API_URL or ANTHROPIC_MESSAGES_URL,
+            headers=build_headers(api_key),
+            json=request_body,
+            timeout=timeout,
+        )
+    except requests.exceptions.RequestException as e:
+        raise AIRequestError(f"API connection error: {e}")
+    latency = time.monotonic() - started
+    latency_ms = int(latency * 1000)
+    record_timing('ai', latency)
+
+    if response.status_code != 200:
+        error_message, error_type = _extract_error(response)
+        raise AIRequestError(error_message, status_code=response.status_code, error_type=error_type)
+
+    response_data = response.json()
+    record_usage(purpose, request_body['model'], response_data, latency_ms, cache)
+    return response_data['content'][0]['text'], response_data
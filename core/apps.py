@@ -8,6 +8,9 @@ class CoreConfig(AppConfig):
     def ready(self):
         """
         Import admin_site module on startup to ensure
-        SiteConfig model is registered in the admin.
+        SiteConfig model is registered in the admin, and the history
+        and images modules to connect their signal receivers.
         """
         import core.admin_site
+        import core.history
+        import core.images
@@ -0,0 +1,378 @@
+"""
+Vendored front-end assets for base.html.
+
+By default base.html loads Bootstrap and Font Awesome from public CDNs. With
+ASSET_MODE=vendor it uses copies under static/vendor/ instead, built by the
+build_assets command:
+
+1. The pinned CDN files (VENDOR_ASSETS) are downloaded, or copied from a local
+   directory for offline builds, into static/vendor/.
+2. The stylesheets are tree-shaken: rules whose selectors need a class or id
+   that appears nowhere in the project's templates or JavaScript files are
+   dropped (classes that Bootstrap's JavaScript adds at runtime are
+   safelisted).
+3. The rules needed by the page shell (base.html, navbar and footer) are
+   written to critical.min.css, which base.html inlines ahead of the full
+   tree-shaken bundle, site.min.css.
+
+The CSS handling here is a small rule-level parser, not a full CSS engine: it
+understands style rules, nested @media/@supports/@layer blocks and keeps
+other at-rules (@font-face, @keyframes, ...) as they are.
+"""
+import os
+import re
+import shutil
+
+from django.conf import settings
+
+from core.assets import minify_css
+
+# Pinned CDN files and where they are stored under static/vendor/
+BOOTSTRAP_VERSION = '5.3.2'
+FONT_AWESOME_VERSION = '6.5.1'
+FONT_AWESOME_CDN = f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONT_AWESOME_VERSION}'
+
+VENDOR_ASSETS = {
+    'bootstrap/bootstrap.min.css': f'https://cdn.jsdelivr.net/npm/bootstrap@{BOOTSTRAP_VERSION}/dist/css/bootstrap.min.css',
+    'bootstrap/bootstrap.bundle.min.js': f'https://cdn.jsdelivr.net/npm/bootstrap@{BOOTSTRAP_VERSION}/dist/js/bootstrap.bundle.min.js',
+    'fontawesome/css/all.min.css': f'{FONT_AWESOME_CDN}/css/all.min.css',
+    **{
+        f'fontawesome/webfonts/{name}': f'{FONT_AWESOME_CDN}/webfonts/{name}'
+        for name in (
+            'fa-brands-400.woff2', 'fa-brands-400.ttf',
+            'fa-regular-400.woff2', 'fa-regular-400.ttf',
+            'fa-solid-900.woff2', 'fa-solid-900.ttf',
+            'fa-v4compatibility.woff2', 'fa-v4compatibility.ttf',
+        )
+    },
+}
+
+# Stylesheets combined into the bundle, in cascade order
+BUNDLE_STYLESHEETS = ('bootstrap/bootstrap.min.css', 'fontawesome/css/all.min.css')
+
+# Templates that make up the page shell rendered above the fold
+CRITICAL_TEMPLATES = ('base/base.html', 'base/navbar.html', 'base/footer.html')
+
+# Classes added by Bootstrap's JavaScript, which never appear in templates
+SAFELIST = frozenset((
+    'show', 'showing', 'hide', 'fade', 'collapse', 'collapsing', 'collapse-horizontal', 'active',
+    'disabled', 'dropdown-menu-end', 'dropdown-menu-start', 'modal-open', 'modal-backdrop',
+    'modal-static', 'offcanvas-backdrop', 'tooltip', 'tooltip-inner', 'tooltip-arrow', 'popover',
+    'popover-arrow', 'popover-header', 'popover-body', 'bs-tooltip-auto', 'bs-popover-auto',
+    'carousel-item-next', 'carousel-item-prev', 'carousel-item-start', 'carousel-item-end',
+    'was-validated', 'is-valid', 'is-invalid', 'pointer-event',
+))
+
+# Words that can name a class or id in templates and scripts
+TOKEN_RE = re.compile(r'[A-Za-z_][\w-]*')
+
+# Class names completed by a template variable or tag, e.g. alert-{{ message.tags }}
+DYNAMIC_PREFIX_RE = re.compile(r'([A-Za-z_][\w-]*-)\{[{%]')
+
+# Class and id selectors, allowing escaped characters such as .w-\[10\%\]
+SELECTOR_NAME_RE = re.compile(r'([.#])((?:\\.|[\w-])+)')
+
+# Pseudo-classes whose arguments are not matched against the page, e.g. :not(.x)
+FUNCTIONAL_PSEUDO_RE = re.compile(r':(?:not|is|where|has)\((?:[^()]|\([^()]*\))*\)')
+
+# At-rules whose blocks contain further rules
+NESTED_AT_RULES = ('@media', '@supports', '@layer', '@container', '@document')
+
+
+def vendor_dir():
+    """Directory of the vendored assets, inside the first STATICFILES_DIRS entry."""
+    return os.path.join(settings.STATICFILES_DIRS[0], 'vendor')
+
+
+def fetch_vendor_assets(source=None, refresh=False, stdout=None):
+    """
+    Put the pinned vendor files in place under static/vendor/.
+
+    Args:
+        source (str): Local directory laid out like static/vendor/ to copy from
+                      instead of downloading (for offline builds)
+        refresh (bool): Replace files that are already present
+        stdout: Optional stream for progress messages
+
+    Returns:
+        list: Relative paths of the files that were written
+    """
+    import requests
+
+    written = []
+    for relative_path, url in VENDOR_ASSETS.items():
+        target = os.path.join(vendor_dir(), relative_path)
+        if os.path.exists(target) and not refresh:
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if source:
+            shutil.copyfile(os.path.join(source, relative_path), target)
+        else:
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+            with open(target, 'wb') as f:
+                f.write(response.content)
+        written.append(relative_path)
+        if stdout:
+            stdout.write(f'  {relative_path}')
+    return written
+
+
+def template_files(names=None):
+    """
+    Paths of the project's templates.
+
+    Args:
+        names: Only these template names (e.g. 'base/base.html'); all templates
+               of every template directory when omitted
+    """
+    from django.template import engines
+
+    directories = []
+    for engine in engines.all():
+        directories.extend(str(directory) for directory in engine.template_dirs)
+
+    paths = []
+    for directory in directories:
+        if names is not None:
+            paths.extend(os.path.join(directory, name) for name in names
+                         if os.path.exists(os.path.join(directory, name)))
+            continue
+        for root, _, files in os.walk(directory):
+            # Django's own admin templates don't use the site's stylesheets
+            if f'{os.sep}django{os.sep}' in root:
+                continue
+            paths.extend(os.path.join(root, name) for name in files if name.endswith('.html'))
+    return paths
+
+
+def script_files():
+    """
+    Paths of the project's JavaScript files, from the static directories of
+    its apps and STATICFILES_DIRS.
+
+    Scripts can add classes and ids that no template mentions. Installed
+    packages' scripts (the admin's, jQuery, ...) and the vendored files are
+    left out: Bootstrap's own script names nearly every class.
+    """
+    from django.contrib.staticfiles import finders
+
+    project_dir = os.path.join(str(settings.BASE_DIR), '')
+    vendored_dir = os.path.join(vendor_dir(), '')
+    paths = []
+    for finder in finders.get_finders():
+        for path, storage in finder.list([]):
+            full_path = storage.path(path)
+            # A virtualenv may live inside the project directory too
+            if (path.endswith('.js') and full_path.startswith(project_dir)
+                    and not full_path.startswith(vendored_dir)
+                    and f'{os.sep}site-packages{os.sep}' not in full_path):
+                paths.append(full_path)
+    return paths
+
+
+def used_tokens(paths):
+    """
+    Collect every word that could be a class or id used by the given files.
+
+    A class whose end comes from the template context, such as
+    alert-{{ message.tags }}, can't be known in advance; its prefix is
+    recorded as 'alert-*' so that every alert-... class is kept.
+    """
+    tokens = set(SAFELIST)
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        tokens.update(TOKEN_RE.findall(text))
+        tokens.update(f'{prefix}*' for prefix in DYNAMIC_PREFIX_RE.findall(text))
+    return tokens
+
+
+def _name_is_used(name, tokens):
+    if name in tokens:
+        return True
+    # Any prefix ending in a hyphen may have been recorded as 'prefix-*'
+    index = name.find('-')
+    while index != -1:
+        if f'{name[:index + 1]}*' in tokens:
+            return True
+        index = name.find('-', index + 1)
+    return False
+
+
+def _skip_string(css, index):
+    """Return the index just past the quoted string starting at css[index]."""
+    quote = css[index]
+    index += 1
+    while index < len(css) and css[index] != quote:
+        index += 2 if css[index] == '\\' else 1
+    return index + 1
+
+
+def _find_block_end(css, start):
+    """Return the index of the '}' closing the block opened at css[start]."""
+    depth = 0
+    index = start
+    while index < len(css):
+        char = css[index]
+        if char in '"\'':
+            index = _skip_string(css, index)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+        index += 1
+    return len(css) - 1
+
+
+def parse_rules(css):
+    """
+    Split a stylesheet into top-level rules.
+
+    Returns:
+        list: (prelude, body) pairs; body is None for statements such as
+              @import or @charset that end with a semicolon
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    rules = []
+    index = 0
+    while index < len(css):
+        # Find the end of the prelude: an opening brace or a semicolon
+        start = index
+        while index < len(css) and css[index] not in '{;':
+            index = _skip_string(css, index) if css[index] in '"\'' else index + 1
+        prelude = css[start:index].strip()
+        if index >= len(css):
+            break
+        if css[index] == ';':
+            if prelude:
+                rules.append((prelude, None))
+            index += 1
+            continue
+        end = _find_block_end(css, index)
+        rules.append((prelude, css[index + 1:end]))
+        index = end + 1
+    return rules
+
+
+def selector_is_used(selector, tokens):
+    """True if every class and id in a selector appears among the used tokens."""
+    selector = FUNCTIONAL_PSEUDO_RE.sub('', selector)
+    for _, name in SELECTOR_NAME_RE.findall(selector):
+        if not _name_is_used(name.replace('\\', ''), tokens):
+            return False
+    return True
+
+
+def _split_selectors(prelude):
+    # Commas inside :is(...) or attribute values don't separate selectors
+    selectors, depth, current = [], 0, ''
+    for char in prelude:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        if char == ',' and depth == 0:
+            selectors.append(current.strip())
+            current = ''
+        else:
+            current += char
+    selectors.append(current.strip())
+    return [selector for selector in selectors if selector]
+
+
+def tree_shake(css, tokens):
+    """
+    Remove style rules whose selectors can't match anything in the templates.
+
+    Args:
+        css (str): The stylesheet
+        tokens (set): Words used by the templates, from used_tokens()
+
+    Returns:
+        str: The reduced stylesheet (not minified)
+    """
+    output = []
+    for prelude, body in parse_rules(css):
+        if body is None:
+            output.append(f'{prelude};')
+        elif prelude.startswith(NESTED_AT_RULES):
+            inner = tree_shake(body, tokens)
+            if inner:
+                output.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            output.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [selector for selector in _split_selectors(prelude) if selector_is_used(selector, tokens)]
+            if selectors:
+                output.append(f"{','.join(selectors)}{{{body}}}")
+    return '\n'.join(output)
+
+
+def drop_unused_keyframes(css):
+    """Remove @keyframes blocks whose animation name is not used by any rule."""
+    rules = parse_rules(css)
+    declarations = ' '.join(body for prelude, body in rules if body and not prelude.startswith('@keyframes'))
+    output = []
+    for prelude, body in rules:
+        if prelude.startswith(('@keyframes', '@-webkit-keyframes')):
+            name = prelude.split(None, 1)[1].strip() if ' ' in prelude else ''
+            if not re.search(rf'(?<![\w-]){re.escape(name)}(?![\w-])', declarations):
+                continue
+        output.append(f'{prelude};' if body is None else f'{prelude}{{{body}}}')
+    return '\n'.join(output)
+
+
+def drop_font_faces(css):
+    """Remove @font-face rules, which the full bundle loads anyway."""
+    return '\n'.join(
+        f'{prelude};' if body is None else f'{prelude}{{{body}}}'
+        for prelude, body in parse_rules(css) if not prelude.startswith('@font-face')
+    )
+
+
+def swap_font_display(css):
+    """Make icon fonts render with a fallback instead of blocking text while they load."""
+    return re.sub(r'font-display\s*:\s*block', 'font-display:swap', css)
+
+
+def _read_stylesheet(relative_path):
+    with open(os.path.join(vendor_dir(), relative_path), 'r', encoding='utf-8') as f:
+        css = f.read()
+    # Font Awesome refers to ../webfonts/ relative to its css/ directory
+    if relative_path.startswith('fontawesome/'):
+        css = css.replace('../webfonts/', 'fontawesome/webfonts/')
+    return css
+
+
+def build_bundles():
+    """
+    Build site.min.css and critical.min.css from the vendored stylesheets.
+
+    Returns:
+        dict: Sizes in bytes of the source stylesheets ('source') and of the
+              'site' and 'critical' outputs
+    """
+    source = '\n'.join(_read_stylesheet(path) for path in BUNDLE_STYLESHEETS)
+
+    site = drop_unused_keyframes(tree_shake(source, used_tokens(template_files() + script_files())))
+    site = minify_css(swap_font_display(site))
+
+    # The shell only needs its own rules; fonts arrive with the full bundle
+    critical = drop_unused_keyframes(tree_shake(drop_font_faces(source),
+                                                used_tokens(template_files(CRITICAL_TEMPLATES))))
+    # @charset is only allowed in stylesheet files, not in an inline <style>
+    critical = minify_css(re.sub(r'@charset[^;]*;', '', critical))
+
+    for name, css in (('site.min.css', site), ('critical.min.css', critical)):
+        with open(os.path.join(vendor_dir(), name), 'w', encoding='utf-8') as f:
+            f.write(css)
+
+    return {
+        'source': len(source.encode('utf-8')),
+        'site': len(site.encode('utf-8')),
+        'critical': len(critical.encode('utf-8')),
+    }
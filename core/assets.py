@@ -0,0 +1,203 @@
+"""
+Publishing of the site's custom CSS.
+
+The custom CSS from SiteConfig is minified and written to STATIC_ROOT/css under
+a content-hashed name (custom.<hash>.css), so browsers and nginx can cache it
+forever: changed CSS gets a new URL. Files are written to a temporary name and
+renamed into place, so a reader never sees a partially written file, and
+gzip (and, if the brotli package is installed, brotli) copies are written next
+to it for servers that serve precompressed files.
+
+Because the file name only depends on the CSS, every worker computes the same
+URL for the same configuration without sharing any state, and publishing the
+same CSS again is a no-op.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Directory under STATIC_ROOT (and STATIC_URL) holding the published CSS
+CUSTOM_CSS_DIR = 'css'
+
+# Hashed files to keep, so pages rendered just before a change can still load theirs
+CUSTOM_CSS_KEEP = 3
+
+CSS_HASHED_NAME_RE = re.compile(r'^custom\.[0-9a-f]{12}\.css$')
+
+# Comments and quoted strings, which minification must not touch
+CSS_COMMENT_OR_STRING_RE = re.compile(
+    r'(?P<comment>/\*.*?\*/)|(?P<string>"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', re.DOTALL
+)
+
+# Published URL for each CSS text seen by this process
+_url_cache = {}
+_url_lock = threading.Lock()
+
+
+def minify_css(css):
+    """
+    Minify CSS by removing comments and unnecessary whitespace.
+
+    Quoted strings are left untouched, and whitespace that can be significant
+    (around + and - in calc(), or before : in selectors) is kept.
+
+    Args:
+        css (str): The CSS source
+
+    Returns:
+        str: Minified CSS
+    """
+    strings = []
+
+    def protect(match):
+        if match.group('comment'):
+            return ' '
+        strings.append(match.group('string'))
+        return f'\x00{len(strings) - 1}\x00'
+
+    text = CSS_COMMENT_OR_STRING_RE.sub(protect, css)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    text = text.replace(';}', '}').strip()
+    return re.sub(r'\x00(\d+)\x00', lambda match: strings[int(match.group(1))], text)
+
+
+def atomic_write(path, data):
+    """Write bytes to a file through a temporary file renamed over it."""
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def write_precompressed(path, data):
+    """
+    Write .gz and, when brotli is available, .br copies of a static file.
+
+    Does nothing unless STATIC_PRECOMPRESS is enabled.
+    """
+    if not getattr(settings, 'STATIC_PRECOMPRESS', True):
+        return
+    atomic_write(f'{path}.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        atomic_write(f'{path}.br', brotli.compress(data))
+
+
+def _prune(css_dir, current):
+    """Remove all but the newest few hashed custom CSS files."""
+    names = sorted(
+        (name for name in os.listdir(css_dir) if CSS_HASHED_NAME_RE.match(name) and name != current),
+        key=lambda name: os.path.getmtime(os.path.join(css_dir, name)),
+        reverse=True,
+    )
+    for name in names[CUSTOM_CSS_KEEP - 1:]:
+        for suffix in ('', '.gz', '.br'):
+            try:
+                os.remove(os.path.join(css_dir, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def _hashed_css(css):
+    """The minified CSS as bytes and its content-hashed file name, or (None, None)."""
+    minified = minify_css(css or '')
+    if not minified:
+        return None, None
+    data = minified.encode('utf-8')
+    return data, f"custom.{hashlib.sha256(data).hexdigest()[:12]}.css"
+
+
+def custom_css_name(css):
+    """
+    Path relative to STATIC_ROOT that the given custom CSS is published
+    under, without publishing it.
+
+    Returns:
+        str: The path, or None if there is no CSS
+    """
+    _, name = _hashed_css(css)
+    return f'{CUSTOM_CSS_DIR}/{name}' if name else None
+
+
+def publish_custom_css(css):
+    """
+    Minify the custom CSS and publish it under its content-hashed name.
+
+    Also updates the unhashed custom.css, for anything still linking to it.
+
+    Args:
+        css (str): The custom CSS from SiteConfig
+
+    Returns:
+        str: Path of the published file relative to STATIC_ROOT, or None if
+             there is no CSS to publish
+    """
+    data, name = _hashed_css(css)
+    if not data:
+        return None
+
+    css_dir = os.path.join(settings.STATIC_ROOT, CUSTOM_CSS_DIR)
+    path = os.path.join(css_dir, name)
+
+    if not os.path.exists(path):
+        os.makedirs(css_dir, exist_ok=True)
+        # Compressed copies first, so they are in place when the file appears
+        write_precompressed(path, data)
+        atomic_write(path, data)
+        _prune(css_dir, name)
+        logger.info("Published custom CSS as %s (%d bytes)", name, len(data))
+
+    alias = os.path.join(css_dir, 'custom.css')
+    try:
+        with open(alias, 'rb') as f:
+            alias_current = f.read() == data
+    except FileNotFoundError:
+        alias_current = False
+    if not alias_current:
+        atomic_write(alias, data)
+
+    return f'{CUSTOM_CSS_DIR}/{name}'
+
+
+def custom_css_url(css):
+    """
+    URL of the published file for the given custom CSS.
+
+    The CSS is published when the configuration is saved. The result is
+    remembered per process, so templates can call this on every request;
+    only if the file is missing (e.g. a new container with an empty
+    STATIC_ROOT) is it published again, on the first call.
+
+    Returns:
+        str: The URL, or an empty string if there is no custom CSS
+    """
+    if not css:
+        return ''
+    url = _url_cache.get(css)
+    if url is None:
+        with _url_lock:
+            relative_path = custom_css_name(css)
+            if relative_path and not os.path.exists(os.path.join(settings.STATIC_ROOT, relative_path)):
+                try:
+                    publish_custom_css(css)
+                except OSError as e:
+                    logger.error("Could not publish custom CSS: %s", e)
+                    return ''
+            url = f"{settings.STATIC_URL}{relative_path}" if relative_path else ''
+            if len(_url_cache) >= 32:
+                _url_cache.clear()
+            _url_cache[css] = url
+    return url
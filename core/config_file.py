@@ -0,0 +1,377 @@
+"""
+Parsing and applying the site_config.md file.
+
+site_config.md describes the site configuration as markdown sections holding
+YAML, markdown or CSS code blocks. This module turns the file into SiteConfig
+field values and applies them to the singleton, and is shared by the
+update_site_config, migrate_config_from_file and watch_config commands so the
+file is parsed the same way everywhere and without starting a new process.
+
+Both sync directions are diff-based: the database only saves (and records a
+revision for) fields whose values differ, and export_site_config only writes
+the file when the rendered bytes differ from what is on disk.
+"""
+import hashlib
+import logging
+import os
+import re
+
+import reversion
+import yaml
+from django.conf import settings
+
+from core.models import SiteConfig
+
+logger = logging.getLogger(__name__)
+
+# YAML sections of the file and the SiteConfig fields each one may set
+YAML_SECTIONS = {
+    'Site Information': ('title', 'tagline', 'brand', 'footer_text', 'meta_description'),
+    'Colors and Styling': ('primary_color', 'secondary_color'),
+    'Contact Information': ('email', 'phone', 'address'),
+    'Social Media': ('github_url', 'linkedin_url', 'twitter_url', 'facebook_url', 'instagram_url', 'bluesky_url'),
+    'Google Analytics': ('google_analytics_id',),
+}
+
+# All fields stored in the file
+FILE_FIELDS = tuple(field for fields in YAML_SECTIONS.values() for field in fields) + ('about_text', 'custom_css')
+
+FILE_TEMPLATE = """# Site Configuration Template
+
+This markdown file allows you to easily customize the content, style, and configuration of your MickBlog site. Edit the sections below and migrate the database to apply changes.
+
+## Site Information
+
+```yaml
+{site_information}
+```
+
+## Colors and Styling
+
+```yaml
+{colors_and_styling}
+```
+
+## Custom CSS
+
+Add any custom CSS below. This will be applied to the entire site.
+
+```css
+{custom_css}
+```
+
+## About Me
+
+Write your about information in markdown format below.
+
+```markdown
+{about}
+```
+
+## Contact Information
+
+```yaml
+{contact_information}
+```
+
+## Social Media
+
+```yaml
+{social_media}
+```
+
+## Google Analytics
+
+```yaml
+{google_analytics}
+```
+
+---
+
+## How to Apply Changes
+
+After updating this file, run the following management command to apply the changes to your site:
+
+```bash
+python manage.py update_site_config
+```
+
+This will parse the markdown file and update the database with the new configuration."""
+
+
+def config_file_path():
+    """Path of the site_config.md file in the project root."""
+    return os.path.join(settings.BASE_DIR, 'site_config.md')
+
+
+def content_hash(content):
+    """SHA-256 hex digest of the file content (str or bytes)."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def parse_yaml_block(content, section_name):
+    """
+    Parse the YAML block following a section header.
+
+    Args:
+        content (str): Full markdown file content
+        section_name (str): Section header to look for (without ## prefix)
+
+    Returns:
+        dict: Parsed YAML content, or None if the section was not found
+
+    Raises:
+        yaml.YAMLError: If the block is not valid YAML
+    """
+    match = re.search(rf'## {section_name}\s*```yaml\s*(.*?)\s*```', content, re.DOTALL)
+    if match:
+        return yaml.safe_load(match.group(1))
+    return None
+
+
+def parse_markdown_block(content, section_name):
+    """
+    Parse the markdown block following a section header.
+
+    A block fenced as ```markdown is preferred, falling back to the first
+    unlabelled code block of the section.
+
+    Args:
+        content (str): Full markdown file content
+        section_name (str): Section header to look for (without ## prefix)
+
+    Returns:
+        str: Extracted markdown content, or None if the section was not found
+    """
+    for pattern in (rf'## {section_name}[^\#]*?```markdown\s*(.*?)\s*```',
+                    rf'## {section_name}[^\#]*?```(?:markdown)?\s*(.*?)\s*```'):
+        match = re.search(pattern, content, re.DOTALL)
+        if match:
+            return match.group(1)
+    logger.debug("No markdown block found for section '%s'", section_name)
+    return None
+
+
+def parse_code_block(content, section_name, language):
+    """
+    Parse the code block for a specific language from a section.
+
+    Args:
+        content (str): Full markdown file content
+        section_name (str): Section header to look for (without ## prefix)
+        language (str): Language identifier in the code fence (e.g., 'css', 'js')
+
+    Returns:
+        str: Extracted code content, or None if the section was not found
+    """
+    match = re.search(rf'## {section_name}\s*```{language}\s*(.*?)\s*```', content, re.DOTALL)
+    if match:
+        return match.group(1)
+    return None
+
+
+def _field_value(value):
+    # Text fields are NOT NULL; YAML gives None for empty keys and may parse
+    # values such as phone numbers as numbers
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else str(value)
+
+
+def parse_site_config(content):
+    """
+    Extract SiteConfig field values from the content of site_config.md.
+
+    Only fields that appear in the file are returned, so missing sections or
+    keys leave the current values alone.
+
+    Args:
+        content (str): Full markdown file content
+
+    Returns:
+        tuple: (values, errors) where values maps field names to new values and
+               errors lists messages for sections that could not be parsed
+    """
+    values = {}
+    errors = []
+
+    for section_name, fields in YAML_SECTIONS.items():
+        try:
+            data = parse_yaml_block(content, section_name)
+        except yaml.YAMLError as e:
+            errors.append(f'Error parsing YAML in section {section_name}: {e}')
+            continue
+        if not isinstance(data, dict):
+            continue
+        for field in fields:
+            if field in data:
+                values[field] = _field_value(data[field])
+
+    about_text = parse_markdown_block(content, 'About Me')
+    if about_text:
+        values['about_text'] = about_text
+
+    custom_css = parse_code_block(content, 'Custom CSS', 'css')
+    if custom_css:
+        values['custom_css'] = custom_css
+
+    return values, errors
+
+
+def diff_site_config(config, values):
+    """
+    Compare parsed values with a SiteConfig instance.
+
+    Args:
+        config: The SiteConfig instance to compare against
+        values (dict): Field values, e.g. from parse_site_config()
+
+    Returns:
+        dict: Maps each field whose value differs to an (old, new) tuple
+    """
+    return {
+        field: (getattr(config, field), value)
+        for field, value in values.items()
+        if getattr(config, field) != value
+    }
+
+
+def apply_site_config(config, values):
+    """
+    Set parsed values on a SiteConfig instance without saving it.
+
+    Args:
+        config: The SiteConfig instance to update
+        values (dict): Field values from parse_site_config()
+
+    Returns:
+        list: Names of the fields whose value changed
+    """
+    changed = list(diff_site_config(config, values))
+    for field in changed:
+        setattr(config, field, values[field])
+    return changed
+
+
+def save_site_config(config, changed, comment='Updated from site_config.md'):
+    """
+    Save the changed fields of the configuration and publish its custom CSS.
+
+    Nothing is written, and no revision is created, when no field changed.
+    Saving invalidates the cached SiteConfig (see core.models), so the next
+    request reads the new values.
+
+    Args:
+        config: The SiteConfig instance updated by apply_site_config()
+        changed (list): Names of the changed fields
+        comment (str): Revision comment; the changed fields are appended
+    """
+    if not changed:
+        return
+    with reversion.create_revision():
+        config.save(update_fields=changed + ['updated_at'])
+        reversion.set_comment(f"{comment} ({', '.join(changed)})")
+    if 'custom_css' in changed:
+        config.save_custom_css()
+
+
+def update_from_file(content, dry_run=False):
+    """
+    Parse site_config.md content and apply it to the SiteConfig singleton.
+
+    Args:
+        content (str): Full markdown file content
+        dry_run (bool): Only report the fields that would change
+
+    Returns:
+        tuple: (changed, errors) with the names of the changed fields and any
+               parse error messages
+    """
+    values, errors = parse_site_config(content)
+    config = SiteConfig.get()
+    if dry_run:
+        return list(diff_site_config(config, values)), errors
+    changed = apply_site_config(config, values)
+    save_site_config(config, changed)
+    return changed, errors
+
+
+def _yaml_section(config, section_name):
+    return yaml.dump({field: getattr(config, field) for field in YAML_SECTIONS[section_name]},
+                     default_flow_style=False)
+
+
+def render_site_config(config, custom_css=None):
+    """
+    Render the site_config.md content for a configuration.
+
+    The output only depends on the field values, so rendering an unchanged
+    configuration always gives the same bytes.
+
+    Args:
+        config: The SiteConfig instance to render
+        custom_css (str): CSS to use instead of config.custom_css
+
+    Returns:
+        str: The file content
+    """
+    return FILE_TEMPLATE.format(
+        site_information=_yaml_section(config, 'Site Information'),
+        colors_and_styling=_yaml_section(config, 'Colors and Styling'),
+        custom_css=config.custom_css if custom_css is None else custom_css,
+        about=config.about_text,
+        contact_information=_yaml_section(config, 'Contact Information'),
+        social_media=_yaml_section(config, 'Social Media'),
+        google_analytics=_yaml_section(config, 'Google Analytics'),
+    )
+
+
+def file_drift(expected, content):
+    """
+    List the fields whose value differs between two versions of site_config.md.
+
+    Both versions are parsed, so differences in whitespace around blocks or in
+    YAML formatting don't count as drift.
+
+    Args:
+        expected (str): Content rendered from the database
+        content (str): Content of the file on disk, or None if there is no file
+
+    Returns:
+        dict: Maps each differing field to an (expected, file) tuple; a field
+              missing from the file has None as its file value
+    """
+    expected_values = parse_site_config(expected)[0]
+    values = parse_site_config(content)[0] if content is not None else {}
+    return {
+        field: (expected_values.get(field), values.get(field))
+        for field in FILE_FIELDS
+        if expected_values.get(field) != values.get(field)
+    }
+
+
+def write_if_changed(path, content):
+    """
+    Write a text file only when its bytes would change.
+
+    The new content goes to a temporary file that is renamed over the
+    original, so readers such as watch_config never see a partial file.
+
+    Returns:
+        bool: True if the file was written
+    """
+    data = content.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    return True
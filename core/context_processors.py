@@ -1,6 +1,10 @@
 from django.conf import settings
 import datetime
+import logging
 import random
+from core.log import HOT_PATH_DEBUG
+
+logger = logging.getLogger(__name__)
 
 def site_settings(request):
     """
@@ -21,18 +25,24 @@ def site_settings(request):
             'PRIMARY_COLOR': site_config.primary_color or settings.PRIMARY_COLOR,
             'SECONDARY_COLOR': site_config.secondary_color or settings.SECONDARY_COLOR,
             'site': site_config,  # Add the entire site config object for easy access
+            'CUSTOM_CSS_URL': site_config.custom_css_url,  # Content-hashed, cacheable custom CSS
+            'ICON_LINKS': site_config.icon_links,  # Favicon set generated from the uploaded favicon
+            'ASSET_MODE': settings.ASSET_MODE,  # 'cdn' or 'vendor' (see core.asset_pipeline)
             'cache_buster': f"{timestamp}-{random_val}",  # Add timestamp to prevent caching
         }
         
-        print(f"Context processor using middleware title: {context['SITE_TITLE']}")
+        if HOT_PATH_DEBUG:
+            logger.debug("Context processor using middleware title: %s", context['SITE_TITLE'])
         return context
     else:
         # If middleware didn't attach site_config, fallback to settings
-        print("Context processor falling back to settings (no middleware data)")
+        if HOT_PATH_DEBUG:
+            logger.debug("Context processor falling back to settings (no middleware data)")
         return {
             'SITE_TITLE': settings.SITE_TITLE,
             'SITE_BRAND': settings.SITE_BRAND,
             'PRIMARY_COLOR': settings.PRIMARY_COLOR,
             'SECONDARY_COLOR': settings.SECONDARY_COLOR,
+            'ASSET_MODE': settings.ASSET_MODE,
             'cache_buster': f"{timestamp}-{random_val}",
         }
\ No newline at end of file
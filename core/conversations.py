@@ -0,0 +1,241 @@
+"""
+Server-side conversation state for the AI editors.
+
+Conversations are persisted in the AIConversation model and kept in a small
+in-process LRU cache so repeated turns don't hit the database for a lookup.
+Once the verbatim history exceeds the configured token budget, the oldest
+turns are folded into a rolling summary, keeping prompt sizes flat as a
+conversation grows.
+
+Prompts are assembled so that earlier parts never change between turns: the
+static instructions and context come first in the system prompt, followed by
+the summary, and the message list only ever grows at the end until the next
+summarization. This keeps the request prefix byte-identical from one turn to
+the next, so the API's prompt cache can reuse it (see core.ai).
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+
+from core.ai import AIRequestError, send_message
+from core.models import AIConversation
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_MESSAGE = """You maintain a running summary of a conversation between a user and an AI editing assistant.
+Combine the existing summary with the new messages into a single concise summary.
+Keep the user's goals, preferences, decisions already made, and any open requests.
+Leave out pleasantries and anything that no longer matters. Reply with the summary text only."""
+
+
+def estimate_tokens(text):
+    """
+    Cheaply estimate the number of tokens in a piece of text.
+
+    Uses the common rule of thumb of roughly four characters per token, which is
+    accurate enough for deciding when to summarize.
+    """
+    return len(text) // 4 + 1
+
+
+def estimate_message_tokens(messages):
+    """Estimate the combined token count of a list of role/content messages."""
+    return sum(estimate_tokens(message['content']) for message in messages)
+
+
+class ConversationStore:
+    """
+    Thread-safe LRU cache in front of the AIConversation table.
+
+    Each worker process has its own cache. The database remains the source of
+    truth, so a conversation can continue on any worker.
+    """
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _capacity(self):
+        return self.max_size or getattr(settings, 'AI_CONVERSATION_CACHE_SIZE', 256)
+
+    def _remember(self, conversation):
+        with self._lock:
+            self._cache[conversation.key] = conversation
+            self._cache.move_to_end(conversation.key)
+            while len(self._cache) > self._capacity():
+                self._cache.popitem(last=False)
+
+    def get(self, key, user, editor):
+        """
+        Get a conversation for the user, creating a new one if needed.
+
+        Unknown, malformed, or foreign keys (belonging to another user or editor)
+        silently start a new conversation rather than raising an error.
+
+        Args:
+            key: Conversation key sent by the client (may be empty)
+            user: The requesting user
+            editor: Editor identifier, 'site_config' or 'blog'
+
+        Returns:
+            AIConversation: The existing or newly created conversation
+        """
+        try:
+            key = uuid.UUID(str(key)) if key else None
+        except ValueError:
+            key = None
+
+        conversation = None
+        if key:
+            with self._lock:
+                conversation = self._cache.get(key)
+                if conversation is not None:
+                    self._cache.move_to_end(key)
+            # Another worker may have advanced the conversation; a cheap timestamp
+            # check avoids reloading and decoding the stored messages when it hasn't
+            if conversation is not None:
+                updated = AIConversation.objects.filter(pk=conversation.pk).values_list('updated', flat=True).first()
+                if updated != conversation.updated:
+                    conversation = None
+            if conversation is None:
+                conversation = AIConversation.objects.filter(key=key).first()
+
+        if conversation is None or conversation.user_id != user.pk or conversation.editor != editor:
+            conversation = AIConversation.objects.create(user=user, editor=editor)
+
+        self._remember(conversation)
+        return conversation
+
+    def save(self, conversation):
+        """Persist a conversation and refresh its cache entry."""
+        conversation.save()
+        self._remember(conversation)
+
+    def forget(self, key):
+        """Drop a conversation from the in-memory cache."""
+        with self._lock:
+            self._cache.pop(key, None)
+
+
+conversation_store = ConversationStore()
+
+
+def build_system_prompt(base_prompt, conversation):
+    """
+    Build the system prompt parts for a conversation turn.
+
+    The summary (if any) goes after the static instructions and context so
+    those stay an identical, cacheable prefix across every turn.
+
+    Args:
+        base_prompt: The system prompt as a string or a list of parts
+        conversation: The AIConversation
+
+    Returns:
+        list: System prompt parts ordered from most to least stable
+    """
+    parts = [base_prompt] if isinstance(base_prompt, str) else list(base_prompt)
+    if conversation.summary:
+        parts.append(f"Summary of the earlier conversation with this user:\n{conversation.summary}")
+    return parts
+
+
+def build_messages(conversation, user_content):
+    """
+    Build the message list for the API from stored turns plus the new user message.
+
+    Args:
+        conversation: The AIConversation
+        user_content: Content of the new user message (may include extra context
+                      such as the current blog post, which is not stored)
+
+    Returns:
+        list: Role/content dictionaries for the Messages API
+    """
+    return list(conversation.messages) + [{'role': 'user', 'content': user_content}]
+
+
+def _fallback_summary(summary, messages, max_chars=2000):
+    """Build a truncated plain-text summary when the AI summary request fails."""
+    lines = [summary] if summary else []
+    lines.extend(f"{message['role']}: {message['content'][:200]}" for message in messages)
+    return '\n'.join(lines)[-max_chars:]
+
+
+def compact_conversation(conversation, api_key=None):
+    """
+    Fold the oldest turns into the rolling summary when over the token budget.
+
+    The most recent AI_CONVERSATION_KEEP_MESSAGES messages are kept verbatim,
+    always starting at a user message so the API's role alternation holds.
+
+    Args:
+        conversation: The AIConversation to compact (modified in place, not saved)
+        api_key: Optional Anthropic API key for the summary request
+
+    Returns:
+        bool: True if the conversation was compacted
+    """
+    budget = getattr(settings, 'AI_CONVERSATION_TOKEN_BUDGET', 6000)
+    keep = getattr(settings, 'AI_CONVERSATION_KEEP_MESSAGES', 6)
+    messages = list(conversation.messages)
+
+    if estimate_message_tokens(messages) + estimate_tokens(conversation.summary) <= budget:
+        return False
+
+    # Keep an even number of recent messages so the tail starts with a user turn
+    keep = max(keep - keep % 2, 0)
+    old_messages, recent_messages = messages[:len(messages) - keep], messages[len(messages) - keep:]
+    if not old_messages:
+        return False
+
+    transcript = '\n\n'.join(f"{message['role'].upper()}: {message['content']}" for message in old_messages)
+    prompt = (
+        f"Existing summary:\n{conversation.summary or '(none)'}\n\n"
+        f"New messages:\n{transcript}"
+    )
+    try:
+        summary, _ = send_message(
+            SUMMARY_SYSTEM_MESSAGE,
+            [{'role': 'user', 'content': prompt}],
+            api_key=api_key,
+            max_tokens=512,
+            temperature=0,
+            timeout=60,
+            purpose='conversation_summary',
+            cache=False,
+        )
+        summary = summary.strip()
+    except AIRequestError as e:
+        logger.warning("Conversation summary failed, using truncated history: %s", e)
+        summary = _fallback_summary(conversation.summary, old_messages)
+
+    conversation.summary = summary
+    conversation.messages = recent_messages
+    conversation.summarized_messages += len(old_messages)
+    return True
+
+
+def record_turn(conversation, user_message, assistant_message, api_key=None):
+    """
+    Store a completed user/assistant exchange and compact the history if needed.
+
+    Only the user's own message and the assistant's conversational reply are
+    stored, not bulky context like the full blog post or site configuration,
+    which is always re-sent fresh with the latest user message.
+
+    Args:
+        conversation: The AIConversation
+        user_message: The user's message text
+        assistant_message: The assistant's conversational reply
+        api_key: Optional Anthropic API key for summarization
+    """
+    conversation.messages = list(conversation.messages) + [
+        {'role': 'user', 'content': user_message},
+        {'role': 'assistant', 'content': assistant_message},
+    ]
+    compact_conversation(conversation, api_key=api_key)
+    conversation_store.save(conversation)
@@ -0,0 +1,170 @@
+"""
+Version history of the site configuration.
+
+Every save through django-reversion stores a full snapshot of SiteConfig. The
+history pages used to load all of them and diff snapshots on every view; with
+thousands of AI editor revisions that gets slow. Instead:
+
+- The fields changed by each version are computed once, against the previous
+  version, and stored in SiteConfigVersionDiff. A post_revision_commit
+  receiver does this for new revisions; older ones are filled in the first
+  time a history page shows them.
+- History pages list versions a page at a time without loading snapshots.
+- compaction_plan() picks the versions to drop when thinning old history
+  down to daily and weekly checkpoints (see compact_config_history).
+"""
+import logging
+from datetime import timedelta
+
+from django.dispatch import receiver
+from django.utils import timezone
+from reversion.errors import RevertError
+from reversion.models import Version
+from reversion.signals import post_revision_commit
+
+from core.models import SiteConfig, SiteConfigVersionDiff
+
+logger = logging.getLogger(__name__)
+
+# Fields that change on every save and aren't worth showing
+IGNORED_FIELDS = ('id', 'updated_at')
+
+# Characters of each value kept in a stored diff
+PREVIEW_LENGTH = 200
+
+
+def site_config_versions():
+    """All versions of the SiteConfig singleton, newest first, without their snapshots."""
+    return (Version.objects.get_for_object_reference(SiteConfig, 1)
+            .select_related('revision__user', 'siteconfig_diff')
+            .defer('serialized_data'))
+
+
+def _preview(value):
+    # Keep JSON-friendly scalars; file fields, dates etc. become strings
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= PREVIEW_LENGTH else f"{text[:PREVIEW_LENGTH]}..."
+
+
+def diff_field_dicts(previous, current):
+    """
+    Compare two version snapshots.
+
+    Args:
+        previous (dict): Field values of the older version
+        current (dict): Field values of the newer version
+
+    Returns:
+        dict: Maps each changed field to a [previous, new] pair of previews
+    """
+    return {
+        field: [_preview(previous.get(field)), _preview(value)]
+        for field, value in current.items()
+        if field not in IGNORED_FIELDS and previous.get(field) != value
+    }
+
+
+def store_version_diff(version, previous=None):
+    """
+    Compute and store the changes a version made relative to the previous one.
+
+    Args:
+        version: The reversion Version of SiteConfig
+        previous: The version before it, or None if it is the first
+
+    Returns:
+        SiteConfigVersionDiff: The stored diff, or None if a snapshot could
+                               not be deserialized
+    """
+    try:
+        changes = diff_field_dicts(previous.field_dict, version.field_dict) if previous else {}
+    except RevertError as e:
+        logger.warning("Could not diff site config version %s: %s", version.pk, e)
+        return None
+
+    diff, _ = SiteConfigVersionDiff.objects.update_or_create(
+        version=version,
+        defaults={
+            'previous_version_id': previous.pk if previous else None,
+            'changed_fields': list(changes),
+            'changes': changes,
+        },
+    )
+    return diff
+
+
+def previous_version(version):
+    """The version of the same object stored just before this one, or None."""
+    return (Version.objects.get_for_object_reference(SiteConfig, version.object_id)
+            .filter(pk__lt=version.pk).first())
+
+
+def ensure_version_diffs(versions):
+    """
+    Fill in stored diffs for versions that don't have one yet.
+
+    Args:
+        versions: Versions about to be displayed, e.g. one history page
+
+    Returns:
+        dict: Maps version ids to their SiteConfigVersionDiff (or None)
+    """
+    diffs = {}
+    for version in versions:
+        try:
+            diffs[version.pk] = version.siteconfig_diff
+        except SiteConfigVersionDiff.DoesNotExist:
+            # Reload with the snapshot, which the listing query deferred
+            full = Version.objects.get(pk=version.pk)
+            diffs[version.pk] = store_version_diff(full, previous_version(full))
+    return diffs
+
+
+@receiver(post_revision_commit)
+def store_revision_diffs(sender, revision, versions, **kwargs):
+    """Store the diff of each SiteConfig version as soon as its revision is saved."""
+    for version in versions:
+        if version.content_type.model_class() is SiteConfig:
+            store_version_diff(version, previous_version(version))
+
+
+def compaction_plan(versions, now=None, keep_days=30, daily_days=365):
+    """
+    Decide which versions to keep when thinning the history.
+
+    All versions from the last `keep_days` days are kept. Older ones are thinned
+    to the newest version of each day until `daily_days`, and to the newest
+    version of each ISO week before that. The newest version is always kept.
+
+    Args:
+        versions: (version_id, date_created) pairs, newest first
+        now: Reference time (defaults to the current time)
+        keep_days (int): Days of history kept in full
+        daily_days (int): Days of history kept as daily checkpoints
+
+    Returns:
+        tuple: (keep, delete) lists of version ids
+    """
+    now = now or timezone.now()
+    keep_after = now - timedelta(days=keep_days)
+    daily_after = now - timedelta(days=daily_days)
+
+    keep, delete = [], []
+    seen_buckets = set()
+    for index, (version_id, created) in enumerate(versions):
+        if index == 0 or created >= keep_after:
+            keep.append(version_id)
+            continue
+        local = timezone.localtime(created) if timezone.is_aware(created) else created
+        if created >= daily_after:
+            bucket = ('day', local.date())
+        else:
+            bucket = ('week',) + tuple(local.isocalendar()[:2])
+        if bucket in seen_buckets:
+            delete.append(version_id)
+        else:
+            seen_buckets.add(bucket)
+            keep.append(version_id)
+    return keep, delete
@@ -0,0 +1,236 @@
+"""
+Favicon set generated from SiteConfig.favicon.
+
+The uploaded favicon is often a large PNG that every page load would fetch as
+is. Instead, when the configuration is saved, it is turned into the small
+files browsers actually ask for:
+
+- favicon.<hash>.ico with 16, 32 and 48 pixel images
+- apple-touch-icon.<hash>.png, 180 pixels on an opaque background (iOS shows
+  transparent areas as black)
+- icon-192.<hash>.png and icon-512.<hash>.png for the web manifest
+- site.<hash>.webmanifest naming the site and its icons
+
+They are written to STATIC_ROOT/icons under content-hashed names, like the
+custom CSS (see core.assets), so they can be cached forever; base.html links
+them. The published names are recorded in a small index file next to them,
+links.<hash>.json (one per favicon and site identity), which is all that
+page loads read: the set is never generated while rendering a page. A new
+container with an empty STATIC_ROOT publishes it with the publish_icons
+command.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+
+from django.conf import settings
+from PIL import Image, ImageColor, ImageOps
+
+from core.assets import atomic_write, write_precompressed
+
+logger = logging.getLogger(__name__)
+
+# Directory under STATIC_ROOT (and STATIC_URL) holding the published icons
+ICONS_DIR = 'icons'
+
+ICON_HASHED_NAME_RE = re.compile(r'^[\w-]+\.[0-9a-f]{12}\.(?:ico|png|webmanifest)$')
+
+ICO_SIZES = (16, 32, 48)
+APPLE_TOUCH_SIZE = 180
+MANIFEST_ICON_SIZES = (192, 512)
+
+# Published icon set for each favicon and site identity seen by this process
+_links_cache = {}
+_links_lock = threading.Lock()
+
+
+def _square(image, size, background=None):
+    # Fit the image into a square canvas without distorting it
+    image = ImageOps.contain(image, (size, size), Image.LANCZOS)
+    canvas = Image.new('RGBA', (size, size), background or (0, 0, 0, 0))
+    canvas.paste(image, ((size - image.width) // 2, (size - image.height) // 2), image)
+    return canvas if background is None else canvas.convert('RGB')
+
+
+def _png(image):
+    output = io.BytesIO()
+    image.save(output, 'PNG', optimize=True)
+    return output.getvalue()
+
+
+def _hashed(stem, data, extension):
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}.{extension}"
+
+
+def build_icon_set(source, name, short_name, theme_color):
+    """
+    Render the favicon set from an uploaded image.
+
+    Args:
+        source (bytes): The uploaded favicon
+        name (str): Site name for the web manifest
+        short_name (str): Short name shown under home screen icons
+        theme_color (str): CSS color of the browser UI and icon backgrounds
+
+    Returns:
+        dict: Maps 'ico', 'apple_touch' and 'manifest' to published file
+              names, and 'files' to a dict of every file name and its content
+    """
+    with Image.open(io.BytesIO(source)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGBA')
+
+    files = {}
+
+    largest = _square(image, max(ICO_SIZES))
+    output = io.BytesIO()
+    largest.save(output, 'ICO', sizes=[(size, size) for size in ICO_SIZES])
+    ico_name = _hashed('favicon', output.getvalue(), 'ico')
+    files[ico_name] = output.getvalue()
+
+    try:
+        background = ImageColor.getrgb(theme_color)
+    except ValueError:
+        # Not a color Pillow understands, e.g. a CSS variable
+        background = (255, 255, 255)
+    data = _png(_square(image, APPLE_TOUCH_SIZE, background=background))
+    apple_touch_name = _hashed('apple-touch-icon', data, 'png')
+    files[apple_touch_name] = data
+
+    manifest_icons = []
+    for size in MANIFEST_ICON_SIZES:
+        data = _png(_square(image, size))
+        icon_name = _hashed(f'icon-{size}', data, 'png')
+        files[icon_name] = data
+        manifest_icons.append({
+            'src': f"{settings.STATIC_URL}{ICONS_DIR}/{icon_name}",
+            'sizes': f'{size}x{size}',
+            'type': 'image/png',
+        })
+
+    manifest = json.dumps({
+        'name': name,
+        'short_name': short_name,
+        'icons': manifest_icons,
+        'theme_color': theme_color,
+        'background_color': '#ffffff',
+        'display': 'browser',
+        'start_url': '/',
+    }, indent=2).encode('utf-8')
+    manifest_name = _hashed('site', manifest, 'webmanifest')
+    files[manifest_name] = manifest
+
+    return {'ico': ico_name, 'apple_touch': apple_touch_name, 'manifest': manifest_name, 'files': files}
+
+
+def _identity(config):
+    return (config.favicon.name, config.title or settings.SITE_TITLE,
+            config.brand or settings.SITE_BRAND, config.primary_color or settings.PRIMARY_COLOR)
+
+
+def _index_path(identity):
+    digest = hashlib.md5(repr(identity).encode()).hexdigest()[:12]
+    return os.path.join(settings.STATIC_ROOT, ICONS_DIR, f'links.{digest}.json')
+
+
+def _read_index(identity):
+    # Links recorded by publish_icon_set(), or None if it hasn't run
+    try:
+        with open(_index_path(identity), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.error("Could not read the favicon set index: %s", e)
+        return None
+
+
+def publish_icon_set(config):
+    """
+    Generate the favicon set of a configuration and write any missing files.
+
+    Args:
+        config: The SiteConfig
+
+    Returns:
+        dict: URLs of the 'ico', 'apple_touch' and 'manifest' files, and the
+              'theme_color'; empty if there is no favicon
+    """
+    if not config.favicon:
+        return {}
+    identity = _identity(config)
+    _, title, brand, theme_color = identity
+
+    with config.favicon.open('rb') as f:
+        source = f.read()
+    icon_set = build_icon_set(source, title, brand, theme_color)
+
+    icons_dir = os.path.join(settings.STATIC_ROOT, ICONS_DIR)
+    os.makedirs(icons_dir, exist_ok=True)
+    for filename, data in icon_set['files'].items():
+        path = os.path.join(icons_dir, filename)
+        if not os.path.exists(path):
+            # PNG data is already compressed; only the manifest gains from it
+            if filename.endswith('.webmanifest'):
+                write_precompressed(path, data)
+            atomic_write(path, data)
+    logger.info("Published favicon set %s", icon_set['ico'])
+
+    links = {key: f"{settings.STATIC_URL}{ICONS_DIR}/{icon_set[key]}" for key in ('ico', 'apple_touch', 'manifest')}
+    links['theme_color'] = theme_color
+    # Written last, so the index only ever names files that exist
+    atomic_write(_index_path(identity), json.dumps(links).encode('utf-8'))
+    return links
+
+
+def ensure_icon_set(config):
+    """
+    Publish the favicon set of a configuration unless it already is.
+
+    Errors are logged rather than raised, so an unreadable upload doesn't
+    stop the configuration from being saved.
+
+    Returns:
+        bool: Whether the set is published (False if there is no favicon or
+              it couldn't be generated)
+    """
+    if not config.favicon:
+        return False
+    if _read_index(_identity(config)) is not None:
+        return True
+    try:
+        publish_icon_set(config)
+    except (OSError, ValueError) as e:
+        logger.error("Could not publish favicon set: %s", e)
+        return False
+    return True
+
+
+def icon_links(config):
+    """
+    URLs of the published favicon set, for base.html.
+
+    Read from the set's index file and remembered per process. Nothing is
+    generated here; until the set is published (see ensure_icon_set()) no
+    icons are linked, and the index is looked for again on the next call.
+
+    Returns:
+        dict: As returned by publish_icon_set(); empty if there is no favicon
+              or it hasn't been published
+    """
+    if not config.favicon:
+        return {}
+    identity = _identity(config)
+    links = _links_cache.get(identity)
+    if links is None:
+        links = _read_index(identity)
+        if links is None:
+            return {}
+        with _links_lock:
+            if len(_links_cache) >= 32:
+                _links_cache.clear()
+            _links_cache[identity] = links
+    return links
@@ -0,0 +1,384 @@
+"""
+Responsive derivatives of uploaded images.
+
+Project images and the site logo and favicon are uploaded at whatever size the
+author had. For each of them this module writes resized copies at the widths
+in IMAGE_DERIVATIVE_WIDTHS, in each format of IMAGE_DERIVATIVE_FORMATS that
+Pillow can encode, into a derivatives/ directory next to the original:
+
+    projects/robot.jpg
+    projects/derivatives/robot.640w.webp
+    projects/derivatives/robot.640w.jpg
+    projects/derivatives/robot.json        <- manifest of what was written
+
+The manifest records the hash of the source image, its size and the variants,
+so templates can build srcset attributes without opening the image. Images
+with transparency get PNG instead of JPEG as their fallback format.
+
+Derivatives are generated when an image is saved and, for images uploaded
+before this existed, the first time a page shows them. Generation runs in a
+process pool (IMAGE_WORKERS processes) so neither the upload nor the page
+waits for it; until it finishes, pages use the original image.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import ExifTags, Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Image fields that get derivatives, by model
+IMAGE_FIELDS = {
+    'projects.Project': ('image',),
+    'core.SiteConfig': ('logo', 'favicon'),
+}
+
+# Subdirectory, next to each original, holding its derivatives
+DERIVATIVES_DIR = 'derivatives'
+
+# Pillow format names, file extensions and MIME types of the supported formats
+FORMATS = {
+    'avif': ('AVIF', 'avif', 'image/avif'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+    'png': ('PNG', 'png', 'image/png'),
+}
+
+# Encoder options per format
+SAVE_OPTIONS = {
+    'avif': {'quality': 60},
+    'webp': {'quality': 80, 'method': 4},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'optimize': True},
+}
+
+# Formats that can't store transparency, replaced by PNG for such images
+OPAQUE_FORMATS = ('jpeg',)
+
+# Formats every browser can show, one of which is always generated
+FALLBACK_FORMATS = ('jpeg', 'png')
+
+MANIFEST_CACHE_TIMEOUT = 60 * 60
+
+# Seconds before generation is tried again for an image it failed for
+FAILURE_RETRY_TIMEOUT = 60 * 60
+
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def supported_formats(formats=None):
+    """
+    The configured derivative formats that this Pillow build can write, best
+    first. JPEG (or PNG) is added if neither is configured, so there is always
+    a fallback every browser understands.
+    """
+    Image.init()
+    formats = formats or settings.IMAGE_DERIVATIVE_FORMATS
+    supported = [name for name in formats if name in FORMATS and FORMATS[name][0] in Image.SAVE]
+    if not any(name in FALLBACK_FORMATS for name in supported):
+        supported.extend([name for name in FALLBACK_FORMATS if FORMATS[name][0] in Image.SAVE][:1])
+    return supported
+
+
+def derivative_paths(name):
+    """
+    Where the derivatives of an image live.
+
+    Args:
+        name (str): Name of the original relative to MEDIA_ROOT, e.g. 'projects/robot.jpg'
+
+    Returns:
+        tuple: (directory relative to MEDIA_ROOT, file name stem)
+    """
+    directory, filename = os.path.split(name)
+    return os.path.join(directory, DERIVATIVES_DIR), os.path.splitext(filename)[0]
+
+
+def manifest_name(name):
+    """Name, relative to MEDIA_ROOT, of the manifest for an image's derivatives."""
+    directory, stem = derivative_paths(name)
+    return os.path.join(directory, f'{stem}.json')
+
+
+def media_images(directories=None):
+    """
+    Names, relative to MEDIA_ROOT, of the uploaded images that get derivatives.
+
+    Args:
+        directories: Directories under MEDIA_ROOT to walk; by default the
+                     upload_to directories of IMAGE_FIELDS
+    """
+    from django.apps import apps
+
+    if directories is None:
+        directories = sorted({
+            apps.get_model(label)._meta.get_field(field).upload_to.rstrip('/')
+            for label, fields in IMAGE_FIELDS.items() for field in fields
+        })
+    Image.init()
+    extensions = set(Image.EXTENSION)
+    names = []
+    for directory in directories:
+        root = os.path.join(settings.MEDIA_ROOT, directory)
+        for current, subdirectories, files in os.walk(root):
+            subdirectories[:] = [d for d in subdirectories if d != DERIVATIVES_DIR]
+            for filename in sorted(files):
+                if os.path.splitext(filename)[1].lower() in extensions:
+                    names.append(os.path.relpath(os.path.join(current, filename), settings.MEDIA_ROOT))
+    return names
+
+
+def file_hash(path):
+    """SHA-256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _oriented_size(image):
+    # Width and height once the EXIF orientation is applied
+    orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+    return (image.height, image.width) if orientation in (5, 6, 7, 8) else image.size
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def generate_derivatives(source_path, media_root, name, widths, formats):
+    """
+    Write the derivatives and manifest of one image.
+
+    Only uses its arguments, not Django, so it can run in a worker process.
+
+    Args:
+        source_path (str): Absolute path of the original
+        media_root (str): MEDIA_ROOT
+        name (str): Name of the original relative to MEDIA_ROOT
+        widths (list): Target widths in pixels; widths at or above the
+                       original's are replaced by the original width, and
+                       with none only the original width is written
+        formats (list): Format keys of FORMATS, best first
+
+    Returns:
+        dict: The manifest that was written
+    """
+    directory, stem = derivative_paths(name)
+    os.makedirs(os.path.join(media_root, directory), exist_ok=True)
+
+    with Image.open(source_path) as original:
+        source_width, source_height = _oriented_size(original)
+        targets = sorted({min(width, source_width) for width in widths}) or [source_width]
+        # Let JPEGs decode at 1/2, 1/4 or 1/8 scale when that still covers the
+        # largest derivative, which saves most of the decoding time and memory
+        scale = targets[-1] / source_width
+        original.draft('RGB', (math.ceil(original.width * scale), math.ceil(original.height * scale)))
+        original = ImageOps.exif_transpose(original)
+        alpha = _has_alpha(original)
+        image = original.convert('RGBA' if alpha else 'RGB')
+
+    requested_formats = formats
+    formats = [('png' if alpha and fmt in OPAQUE_FORMATS else fmt) for fmt in formats]
+    formats = list(dict.fromkeys(formats))
+
+    variants = {}
+    written = set()
+    for width in targets:
+        height = max(1, round(source_height * width / source_width))
+        # reducing_gap shrinks by whole factors with Image.reduce() first,
+        # then resamples the remaining gap with Lanczos
+        resized = image if image.size == (width, height) else image.resize(
+            (width, height), Image.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            pillow_format, extension, _ = FORMATS[fmt]
+            filename = f'{stem}.{width}w.{extension}'
+            target = os.path.join(media_root, directory, filename)
+            temp_path = f'{target}.{os.getpid()}.tmp'
+            resized.save(temp_path, pillow_format, **SAVE_OPTIONS.get(fmt, {}))
+            os.replace(temp_path, target)
+            written.add(filename)
+            variants.setdefault(fmt, []).append([width, os.path.join(directory, filename)])
+
+    manifest = {
+        'source': name,
+        'source_hash': file_hash(source_path),
+        'width': source_width,
+        'height': source_height,
+        'widths': list(widths),
+        'formats': list(requested_formats),
+        'variants': variants,
+    }
+    manifest_path = os.path.join(media_root, manifest_name(name))
+    temp_path = f'{manifest_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, manifest_path)
+
+    # Remove derivatives of widths or formats that are no longer configured
+    derivative_re = re.compile(rf'^{re.escape(stem)}\.\d+w\.\w+$')
+    for filename in os.listdir(os.path.join(media_root, directory)):
+        if derivative_re.match(filename) and filename not in written:
+            os.remove(os.path.join(media_root, directory, filename))
+    return manifest
+
+
+def derivatives_current(source_path, media_root, name, widths, formats):
+    """
+    True if an image's manifest matches its content and settings, and every
+    derivative it lists exists.
+
+    Only uses its arguments, not Django, so it can run in a worker process.
+    """
+    try:
+        with open(os.path.join(media_root, manifest_name(name))) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    if manifest.get('widths') != list(widths) or manifest.get('formats') != list(formats):
+        return False
+    if any(not os.path.exists(os.path.join(media_root, path))
+           for variants in manifest.get('variants', {}).values() for _, path in variants):
+        return False
+    return manifest.get('source_hash') == file_hash(source_path)
+
+
+def rebuild_image(source_path, media_root, name, widths, formats, force=False):
+    """
+    Regenerate an image's derivatives unless they are current.
+
+    Returns:
+        tuple: (name, whether it was rebuilt, source size in bytes, source pixels)
+    """
+    if not force and derivatives_current(source_path, media_root, name, widths, formats):
+        return name, False, 0, 0
+    manifest = generate_derivatives(source_path, media_root, name, widths, formats)
+    return name, True, os.path.getsize(source_path), manifest['width'] * manifest['height']
+
+
+def manifest_cache_key(name):
+    return f'core:image_derivatives:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def load_manifest(name):
+    """
+    The derivatives manifest of an image, or None if it hasn't been generated.
+
+    Manifests are cached, so rendering a page doesn't read them from disk.
+    """
+    key = manifest_cache_key(name)
+    manifest = cache.get(key)
+    if manifest is None:
+        try:
+            with open(os.path.join(settings.MEDIA_ROOT, manifest_name(name))) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        cache.set(key, manifest, MANIFEST_CACHE_TIMEOUT)
+    return manifest
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
+
+def _failure_cache_key(name, source_path):
+    # Keyed by modification time too, so uploading a new file retries at once
+    mtime = os.path.getmtime(source_path)
+    return f'core:image_derivatives_failed:{hashlib.md5(f"{name}:{mtime}".encode()).hexdigest()}'
+
+
+def _record_failure(name, source_path, error):
+    logger.error("Could not generate derivatives of %s: %s", name, error)
+    try:
+        cache.set(_failure_cache_key(name, source_path), True, FAILURE_RETRY_TIMEOUT)
+    except OSError:
+        pass
+
+
+def _finished(name, source_path, future):
+    with _pending_lock:
+        _pending.discard(name)
+    cache.delete(manifest_cache_key(name))
+    error = future.exception()
+    if error is not None:
+        _record_failure(name, source_path, error)
+
+
+def schedule_derivatives(name):
+    """
+    Generate the derivatives of an image in the background.
+
+    Does nothing if they are already being generated by this process, or if
+    generating them failed in the last FAILURE_RETRY_TIMEOUT seconds (so a
+    broken image isn't retried on every page view). With IMAGE_WORKERS set to
+    0 they are generated right away instead.
+
+    Args:
+        name (str): Name of the original relative to MEDIA_ROOT
+    """
+    source_path = os.path.join(settings.MEDIA_ROOT, name)
+    if not os.path.exists(source_path) or cache.get(_failure_cache_key(name, source_path)):
+        return
+    args = (source_path, str(settings.MEDIA_ROOT), name,
+            list(settings.IMAGE_DERIVATIVE_WIDTHS), supported_formats())
+
+    if not settings.IMAGE_WORKERS:
+        try:
+            generate_derivatives(*args)
+        except (OSError, ValueError) as e:
+            _record_failure(name, source_path, e)
+        cache.delete(manifest_cache_key(name))
+        return
+
+    with _pending_lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    future = _get_executor().submit(generate_derivatives, *args)
+    future.add_done_callback(lambda future: _finished(name, source_path, future))
+
+
+def derivatives_for(image):
+    """
+    The derivatives manifest of an image field's file, scheduling its
+    generation if it doesn't exist or is for other widths or formats.
+
+    Args:
+        image: A FieldFile, e.g. project.image
+
+    Returns:
+        dict: The manifest, or None while the derivatives are being generated
+    """
+    if not image:
+        return None
+    manifest = load_manifest(image.name)
+    if (manifest is None or manifest.get('widths') != list(settings.IMAGE_DERIVATIVE_WIDTHS)
+            or manifest.get('formats') != supported_formats()):
+        schedule_derivatives(image.name)
+        return None
+    return manifest
+
+
+@receiver(post_save, sender='projects.Project')
+@receiver(post_save, sender='core.SiteConfig')
+def generate_image_derivatives(sender, instance, **kwargs):
+    """Start generating derivatives of newly uploaded images when a model is saved."""
+    for field in IMAGE_FIELDS.get(sender._meta.label, ()):
+        derivatives_for(getattr(instance, field))
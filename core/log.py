@@ -0,0 +1,108 @@
+"""
+Logging helpers for MickBlog.
+
+Every module logs through its own logger (``logging.getLogger(__name__)``) and
+the LOGGING setting routes all of them to AsyncStreamHandler, which only puts
+records on an in-memory queue. A background listener thread does the
+formatting and the actual write to stdout, so a request never blocks on
+console I/O.
+
+Output is one JSON object per line by default (LOG_FORMAT=json), which log
+aggregators can parse without custom patterns, or a plain text line
+(LOG_FORMAT=text) for local development.
+
+Debug messages on per-request hot paths are additionally guarded by
+HOT_PATH_DEBUG, a module constant fixed at startup from LOG_HOT_PATH_DEBUG, so
+when it is off the message is never built and the guard costs a single
+constant check:
+
+    if HOT_PATH_DEBUG:
+        logger.debug("Loaded site config %s", config.title)
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as single-line JSON objects.
+
+    Fields passed with ``extra={...}`` are included as top-level keys.
+    """
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class AsyncStreamHandler(QueueHandler):
+    """
+    Log handler that writes to a stream from a background thread.
+
+    Records are queued on the calling thread with only the message arguments
+    merged in; formatting (including tracebacks) and the write happen in a
+    QueueListener thread. The listener is restarted in child processes after
+    a fork, e.g. with ``gunicorn --preload``, and flushed at exit.
+
+    Args:
+        stream: Stream to write to (defaults to sys.stdout)
+        output: 'json' for JsonFormatter or 'text' for a plain text line
+    """
+    def __init__(self, stream=None, output='json'):
+        super().__init__(queue.SimpleQueue())
+        target = logging.StreamHandler(stream or sys.stdout)
+        target.setFormatter(JsonFormatter() if output == 'json' else logging.Formatter(TEXT_FORMAT))
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._restart_listener)
+
+    def _restart_listener(self):
+        # Threads don't survive fork(); start a fresh listener in the child
+        self.listener._thread = None
+        self.listener.start()
+
+    def prepare(self, record):
+        """
+        Prepare a record for the queue without formatting it.
+
+        The message is merged with its arguments now, since the arguments may
+        change after the call returns; everything else is left to the listener.
+        """
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
+
+
+# Guard for debug logging on per-request hot paths, fixed at startup
+HOT_PATH_DEBUG = getattr(settings, 'LOG_HOT_PATH_DEBUG', False)
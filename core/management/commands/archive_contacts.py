@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from contact.models import Contact, ContactArchive
+
+
+class Command(BaseCommand):
+    help = ('Moves old contact messages to the compressed ContactArchive table. Read messages, '
+            'spam and duplicates are archived; unread and unprocessed messages stay')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help='Archive messages older than N days (default: 365)')
+        parser.add_argument('--include-unread', action='store_true',
+                            help='Archive old unread messages too')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Messages moved per transaction (default: 1000)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many messages would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old = Contact.objects.filter(sent_at__lt=cutoff).exclude(status='pending')
+        if not options['include_unread']:
+            old = old.filter(Q(read=True) | Q(status__in=('spam', 'duplicate')))
+
+        if options['dry_run']:
+            self.stdout.write(f'{old.count()} messages older than {options["days"]} days would be archived')
+            return
+
+        moved = archived_bytes = 0
+        batch_size = options['batch_size']
+        while True:
+            # Each batch is copied and deleted in one transaction, so a message
+            # is always in exactly one of the two tables
+            with transaction.atomic():
+                batch = list(old.order_by('id')[:batch_size])
+                if not batch:
+                    break
+                entries = [ContactArchive.from_contact(contact) for contact in batch]
+                ContactArchive.objects.bulk_create(entries, ignore_conflicts=True)
+                Contact.objects.filter(id__in=[contact.id for contact in batch]).delete()
+            moved += len(batch)
+            archived_bytes += sum(len(entry.data) for entry in entries)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {moved} archived')
+
+        if not moved:
+            self.stdout.write('No messages to archive')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} messages ({archived_bytes / 1024:.1f} KB compressed)'
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.asset_pipeline import VENDOR_ASSETS, build_bundles, fetch_vendor_assets, vendor_dir
+
+
+class Command(BaseCommand):
+    help = ('Vendors Bootstrap and Font Awesome into static/vendor/ and builds the tree-shaken '
+            'and critical CSS used when ASSET_MODE=vendor')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source',
+                            help='Copy the vendor files from this directory (laid out like static/vendor/) '
+                                 'instead of downloading them')
+        parser.add_argument('--refresh', action='store_true',
+                            help='Fetch vendor files again even if they are already present')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Vendoring {len(VENDOR_ASSETS)} files into {vendor_dir()}...')
+        try:
+            written = fetch_vendor_assets(options['source'], options['refresh'], self.stdout)
+        except Exception as e:
+            raise CommandError(f'Could not fetch vendor assets: {e}')
+        self.stdout.write(f'{len(written)} files fetched, {len(VENDOR_ASSETS) - len(written)} already present')
+
+        sizes = build_bundles()
+        self.stdout.write(self.style.SUCCESS(
+            f"Built site.min.css ({sizes['site'] / 1024:.1f} KiB, from {sizes['source'] / 1024:.1f} KiB "
+            f"of vendor CSS) and critical.min.css ({sizes['critical'] / 1024:.1f} KiB)"
+        ))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reversion.models import Revision, Version
+
+from core.history import compaction_plan, site_config_versions, store_version_diff
+
+
+class Command(BaseCommand):
+    help = ('Thins old site configuration versions down to daily and weekly checkpoints, '
+            'keeping recent history in full')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=30,
+                            help='Keep every version from the last N days (default: 30)')
+        parser.add_argument('--daily-days', type=int, default=365,
+                            help='Keep one version per day up to N days old, and one per week '
+                                 'before that (default: 365)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Versions deleted per query (default: 500)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many versions would be removed')
+
+    def handle(self, *args, **options):
+        versions = list(site_config_versions().values_list('pk', 'revision__date_created'))
+        keep, delete = compaction_plan(versions, keep_days=options['keep_days'], daily_days=options['daily_days'])
+
+        self.stdout.write(f'{len(versions)} versions: keeping {len(keep)}, removing {len(delete)}')
+        if options['dry_run'] or not delete:
+            return
+
+        deleted = set(delete)
+        # Kept versions whose predecessor goes away need their diff recomputed
+        # against the version that now precedes them (the list is newest first)
+        ordered = [version_id for version_id, _ in versions]
+        stale = [
+            version_id for index, version_id in enumerate(ordered[:-1])
+            if version_id not in deleted and ordered[index + 1] in deleted
+        ]
+
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            revision_ids = []
+            for start in range(0, len(delete), batch_size):
+                batch = Version.objects.filter(pk__in=delete[start:start + batch_size])
+                revision_ids.extend(batch.values_list('revision_id', flat=True))
+                batch.delete()
+            # Revisions that only held the removed versions are now empty;
+            # other empty revisions on the site aren't this command's to remove
+            revision_ids = sorted(set(revision_ids))
+            empty = 0
+            for start in range(0, len(revision_ids), batch_size):
+                empty += Revision.objects.filter(
+                    pk__in=revision_ids[start:start + batch_size], version__isnull=True,
+                ).delete()[1].get('reversion.Revision', 0)
+
+            position = {version_id: index for index, version_id in enumerate(keep)}
+            for version_id in stale:
+                version = Version.objects.get(pk=version_id)
+                index = position[version_id] + 1
+                previous = Version.objects.get(pk=keep[index]) if index < len(keep) else None
+                store_version_diff(version, previous)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {len(delete)} versions and {empty} empty revisions; '
+            f'recomputed {len(stale)} diffs'
+        ))
@@ -1,149 +1,56 @@
-import os
-import yaml
-import re
-from django.core.management.base import BaseCommand
-from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.config_file import (
+    config_file_path, file_drift, parse_code_block, render_site_config, write_if_changed,
+)
 from core.models import SiteConfig
 
 class Command(BaseCommand):
     help = 'Exports site configuration from the database to the site_config.md file'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Report fields that differ between the database and the file without writing it; '
+                                 'exits with status 1 if there are any')
+
     def handle(self, *args, **options):
-        config_file = os.path.join(settings.BASE_DIR, 'site_config.md')
-        
+        config_file = config_file_path()
+
         # Get site configuration
         config = SiteConfig.get()
-        
-        # Create fresh content from scratch
-        site_info = {
-            'title': config.title,
-            'tagline': config.tagline,
-            'brand': config.brand,
-            'footer_text': config.footer_text,
-            'meta_description': config.meta_description,
-        }
-        
-        colors = {
-            'primary_color': config.primary_color,
-            'secondary_color': config.secondary_color,
-        }
-        
-        contact = {
-            'email': config.email,
-            'phone': config.phone,
-            'address': config.address,
-        }
-        
-        social = {
-            'github_url': config.github_url,
-            'linkedin_url': config.linkedin_url,
-            'bluesky_url': config.bluesky_url,
-            'facebook_url': config.facebook_url,
-            'instagram_url': config.instagram_url,
-        }
-        
-        analytics = {
-            'google_analytics_id': config.google_analytics_id,
-        }
-        
-        ai_config = {
-            'anthropic_api_key': config.anthropic_api_key,
-        }
-        
-        # Get the CSS block from existing file if it exists
-        custom_css = ""
+
+        # Read the current file, if there is one
         try:
             with open(config_file, 'r') as f:
-                content = f.read()
-                css_match = re.search(r'## Custom CSS\s*```css\s*(.*?)\s*```', content, re.DOTALL)
-                if css_match:
-                    custom_css = css_match.group(1)
+                current = f.read()
         except FileNotFoundError:
+            current = None
+
+        # Keep CSS that only exists in the file (from before CSS was stored in
+        # the database) rather than exporting an empty block over it
+        custom_css = None
+        if not config.custom_css and current:
+            custom_css = parse_code_block(current, 'Custom CSS', 'css')
+
+        # Rendering depends only on the field values, so an unchanged
+        # configuration produces the same bytes as the existing file
+        new_content = render_site_config(config, custom_css)
+
+        if options['check']:
+            drift = file_drift(new_content, current)
+            if current is None:
+                raise CommandError(f'Config file not found: {config_file}', returncode=1)
+            if drift:
+                for field in drift:
+                    self.stdout.write(self.style.WARNING(f'{field} differs from the database'))
+                raise CommandError(f'{len(drift)} field(s) in {config_file} differ from the database', returncode=1)
+            self.stdout.write(self.style.SUCCESS(f'{config_file} is in sync with the database'))
+            return
+
+        if current is None:
             self.stdout.write(self.style.WARNING(f'Creating new config file: {config_file}'))
-        
-        # Build a new config file from scratch
-        new_content = """# Site Configuration Template
-
-This markdown file allows you to easily customize the content, style, and configuration of your MickBlog site. Edit the sections below and migrate the database to apply changes.
-
-## Site Information
-
-```yaml
-{site_info}
-```
-
-## Colors and Styling
-
-```yaml
-{colors}
-```
-
-## Custom CSS
-
-Add any custom CSS below. This will be applied to the entire site.
-
-```css
-{custom_css}
-```
-
-## About Me
-
-Write your about information in markdown format below.
-
-```markdown
-{about}
-```
-
-## Contact Information
-
-```yaml
-{contact}
-```
-
-## Social Media
-
-```yaml
-{social}
-```
-
-## Google Analytics
-
-```yaml
-{analytics}
-```
-
-## AI Configuration
-
-```yaml
-{ai_config}
-```
-
----
-
-## How to Apply Changes
-
-After updating this file, run the following management command to apply the changes to your site:
-
-```bash
-python manage.py update_site_config
-```
 
-This will parse the markdown file and update the database with the new configuration."""
-        
-        # Format the template with our values
-        new_content = new_content.format(
-            site_info=yaml.dump(site_info, default_flow_style=False),
-            colors=yaml.dump(colors, default_flow_style=False),
-            custom_css=custom_css,
-            about=config.about_text,
-            contact=yaml.dump(contact, default_flow_style=False),
-            social=yaml.dump(social, default_flow_style=False),
-            analytics=yaml.dump(analytics, default_flow_style=False),
-            ai_config=yaml.dump(ai_config, default_flow_style=False)
-        )
-        
-        # Write to file
-        with open(config_file, 'w') as f:
-            f.write(new_content)
-        
-        self.stdout.write(self.style.SUCCESS(f'Site configuration exported to {config_file}'))
\ No newline at end of file
+        # Write to file only if its content changes
+        if write_if_changed(config_file, new_content):
+            self.stdout.write(self.style.SUCCESS(f'Site configuration exported to {config_file}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{config_file} is already up to date'))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from contact.pipeline import digest_due, process_pending, send_digest
+
+
+class Command(BaseCommand):
+    help = ('Scores and deduplicates new contact form messages and emails a digest of them '
+            'every CONTACT_DIGEST_MINUTES')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=10.0,
+                            help='Seconds between checks for new messages (default: 10)')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Messages processed per transaction (default: 100)')
+        parser.add_argument('--once', action='store_true',
+                            help='Process the pending messages and send a due digest, then exit')
+        parser.add_argument('--send-now', action='store_true',
+                            help='Send the digest even if CONTACT_DIGEST_MINUTES have not passed')
+
+    def run_once(self, batch_size, send_now):
+        processed = 0
+        while True:
+            counts = process_pending(batch_size)
+            batch = sum(counts.values())
+            processed += batch
+            if batch < batch_size:
+                break
+        sent = send_digest() if send_now or digest_due() else 0
+        return processed, sent
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed, sent = self.run_once(options['batch_size'], options['send_now'])
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} messages, notified {sent}'))
+            return
+
+        self.stdout.write(f"Processing contact messages every {options['interval']:g}s")
+        send_now = options['send_now']
+        try:
+            while True:
+                # Reconnect if the database went away while sleeping
+                close_old_connections()
+                try:
+                    self.run_once(options['batch_size'], send_now)
+                    send_now = False
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f'Could not process contact messages: {e}'))
+                finally:
+                    close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.icons import ensure_icon_set
+from core.models import SiteConfig
+
+
+class Command(BaseCommand):
+    help = ('Publishes the favicon set of the site configuration to STATIC_ROOT/icons unless it '
+            'already is, e.g. in a new container')
+
+    def handle(self, *args, **options):
+        config = SiteConfig.get()
+        if not config.favicon:
+            self.stdout.write('No favicon uploaded')
+            return
+        if ensure_icon_set(config):
+            self.stdout.write(self.style.SUCCESS('Favicon set published'))
+        else:
+            self.stderr.write('Could not publish the favicon set; see the log for details')
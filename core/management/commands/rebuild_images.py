@@ -0,0 +1,69 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from core.images import manifest_cache_key, media_images, rebuild_image, supported_formats
+
+
+class Command(BaseCommand):
+    help = ('Regenerates the resized copies of uploaded images (projects/ and site/ under MEDIA_ROOT), '
+            'skipping images whose copies are current')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Images processed in parallel (default: one per CPU)')
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild every image, even if its copies are current')
+        parser.add_argument('--dir', action='append', dest='directories',
+                            help='Only this directory under MEDIA_ROOT (can be repeated)')
+
+    def handle(self, *args, **options):
+        names = media_images(options['directories'])
+        widths = list(settings.IMAGE_DERIVATIVE_WIDTHS)
+        formats = supported_formats()
+        self.stdout.write(f"{len(names)} images; widths {', '.join(map(str, widths))}; "
+                          f"formats {', '.join(formats)}")
+        if not names:
+            return
+
+        rebuilt = skipped = failed = 0
+        total_bytes = total_pixels = 0
+        started = time.perf_counter()
+        # Each worker holds one decoded image at a time, so memory is bounded
+        # by the number of workers rather than the number of images
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = {
+                executor.submit(rebuild_image, os.path.join(settings.MEDIA_ROOT, name),
+                                str(settings.MEDIA_ROOT), name, widths, formats, options['force']): name
+                for name in names
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    _, was_rebuilt, size, pixels = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f'{name}: {e}'))
+                    continue
+                if was_rebuilt:
+                    rebuilt += 1
+                    total_bytes += size
+                    total_pixels += pixels
+                    cache.delete(manifest_cache_key(name))
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'  {name}')
+                else:
+                    skipped += 1
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rebuilt} images, {skipped} already current, in {elapsed:.2f}s '
+            f'({rebuilt / elapsed:.1f} images/s, {total_bytes / elapsed / 2**20:.1f} MB/s, '
+            f'{total_pixels / elapsed / 1e6:.1f} Mpx/s of source)'
+        ))
+        if failed:
+            raise CommandError(f'{failed} images could not be processed')
@@ -0,0 +1,154 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.models import Category, Post
+from projects.models import Project, Technology
+from resume.models import Certification, Education, Experience, Skill
+
+# Seeded rows are marked with this prefix so they can be removed again
+PREFIX = 'bench'
+
+WORDS = (
+    "django python blog post project code model view template cache query server "
+    "performance latency request response user editor content markdown section "
+    "deploy docker nginx database index test build release feature change update"
+).split()
+
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def markdown_body(rng, paragraphs):
+    """Build markdown with headings, paragraphs, a list and a code block."""
+    parts = []
+    for index in range(paragraphs):
+        if index % 3 == 0:
+            parts.append(f"## {sentence(rng, 4)[:-1]}")
+        parts.append(' '.join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(3, 6))))
+    parts.append('\n'.join(f"- {sentence(rng, 5)}" for _ in range(4)))
+    parts.append("```python\ndef example():\n    return 42\n```")
+    return '\n\n'.join(parts)
+
+
+class Command(BaseCommand):
+    help = 'Seeds the database with generated posts, categories, projects and resume entries for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=500, help='Number of blog posts (default: 500)')
+        parser.add_argument('--categories', type=int, default=10, help='Number of categories (default: 10)')
+        parser.add_argument('--projects', type=int, default=50, help='Number of projects (default: 50)')
+        parser.add_argument('--resume', type=int, default=20,
+                            help='Number of entries for each resume section (default: 20)')
+        parser.add_argument('--paragraphs', type=int, default=12, help='Paragraphs per post (default: 12)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--clear', action='store_true', help='Only remove previously seeded data')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            self.clear()
+            if options['clear']:
+                self.stdout.write(self.style.SUCCESS('Removed seeded benchmark data'))
+                return
+
+            author, _ = User.objects.get_or_create(
+                username=f'{PREFIX}-author',
+                defaults={'first_name': 'Benchmark', 'last_name': 'Author'},
+            )
+
+            categories = Category.objects.bulk_create([
+                Category(name=f'{PREFIX} category {i}', slug=f'{PREFIX}-category-{i}')
+                for i in range(options['categories'])
+            ])
+
+            # Spread publication dates over the past years, one post every 12 hours
+            now = timezone.now()
+            Post.objects.bulk_create([
+                Post(
+                    title=f'Benchmark post {i}: {sentence(rng, 5)[:-1]}',
+                    slug=f'{PREFIX}-post-{i}',
+                    author=author,
+                    content=markdown_body(rng, options['paragraphs']),
+                    category=rng.choice(categories) if categories else None,
+                    publish=now - timedelta(hours=12 * i),
+                    status='published' if i % 10 else 'draft',
+                )
+                for i in range(options['posts'])
+            ], batch_size=500)
+
+            technologies = Technology.objects.bulk_create([
+                Technology(name=f'{PREFIX} technology {i}', slug=f'{PREFIX}-technology-{i}')
+                for i in range(15)
+            ])
+            projects = Project.objects.bulk_create([
+                Project(
+                    title=f'Benchmark project {i}',
+                    slug=f'{PREFIX}-project-{i}',
+                    description=markdown_body(rng, 4),
+                    status=rng.choice(['in_progress', 'completed', 'archived']),
+                    featured=i < 3,
+                    start_date=date.today() - timedelta(days=30 * i),
+                )
+                for i in range(options['projects'])
+            ])
+            Project.technologies.through.objects.bulk_create([
+                Project.technologies.through(project=project, technology=technology)
+                for project in projects
+                for technology in rng.sample(technologies, 3)
+            ])
+
+            count = options['resume']
+            Education.objects.bulk_create([
+                Education(
+                    institution=f'{PREFIX} university {i}', degree='BSc', field_of_study=sentence(rng, 3)[:-1],
+                    start_date=date(2000 + i % 20, 9, 1), end_date=date(2004 + i % 20, 6, 1),
+                    description=markdown_body(rng, 2), order=i,
+                )
+                for i in range(count)
+            ])
+            Experience.objects.bulk_create([
+                Experience(
+                    company=f'{PREFIX} company {i}', position=sentence(rng, 2)[:-1], location='Remote',
+                    start_date=date(2005 + i % 20, 1, 1), current=i == 0,
+                    description=markdown_body(rng, 3), order=i,
+                )
+                for i in range(count)
+            ])
+            Skill.objects.bulk_create([
+                Skill(
+                    name=f'{PREFIX} skill {i}', category=Skill.CATEGORY_CHOICES[i % len(Skill.CATEGORY_CHOICES)][0],
+                    proficiency=rng.randint(40, 100), order=i,
+                )
+                for i in range(count)
+            ])
+            Certification.objects.bulk_create([
+                Certification(
+                    name=f'{PREFIX} certification {i}', issuer=f'{PREFIX} issuer',
+                    date_obtained=date(2010 + i % 15, 1, 1), order=i,
+                )
+                for i in range(count)
+            ])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['posts']} posts, {options['categories']} categories, "
+            f"{options['projects']} projects and {count} entries per resume section"
+        ))
+
+    def clear(self):
+        """Delete rows created by an earlier run of this command."""
+        Post.objects.filter(slug__startswith=f'{PREFIX}-post-').delete()
+        Category.objects.filter(slug__startswith=f'{PREFIX}-category-').delete()
+        Project.objects.filter(slug__startswith=f'{PREFIX}-project-').delete()
+        Technology.objects.filter(slug__startswith=f'{PREFIX}-technology-').delete()
+        Education.objects.filter(institution__startswith=f'{PREFIX} university').delete()
+        Experience.objects.filter(company__startswith=f'{PREFIX} company').delete()
+        Skill.objects.filter(name__startswith=f'{PREFIX} skill').delete()
+        Certification.objects.filter(name__startswith=f'{PREFIX} certification').delete()
+        User.objects.filter(username=f'{PREFIX}-author').delete()
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from contact.smtp_stub import SMTPStub
+
+
+class Command(BaseCommand):
+    help = ('Runs a local SMTP server that prints the messages it receives instead of delivering them '
+            '(point EMAIL_HOST and EMAIL_PORT at it)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=1025, help='Port to listen on (default: 1025)')
+
+    def show(self, sender, recipients, message):
+        self.stdout.write(self.style.SUCCESS(f"Message from {sender} to {', '.join(recipients)}"))
+        self.stdout.write(message.as_string())
+        self.stdout.write('-' * 40)
+
+    def handle(self, *args, **options):
+        stub = SMTPStub(options['host'], options['port'], on_message=self.show)
+        self.stdout.write(f'SMTP stub listening on {stub.host}:{stub.port}')
+        try:
+            stub.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
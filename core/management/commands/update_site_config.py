@@ -1,8 +1,6 @@
 import os
-import re
-import yaml
-from django.core.management.base import BaseCommand
-from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.config_file import config_file_path, update_from_file
 from core.models import SiteConfig
 
 class Command(BaseCommand):
@@ -11,23 +9,33 @@ class Command(BaseCommand):
     
     This command is a critical component of the site customization system,
     implementing the file-to-database sync direction. It parses the markdown file's
-    YAML and code blocks, then updates the SiteConfig model accordingly.
+    YAML and code blocks (see core.config_file), then updates the SiteConfig
+    model accordingly.
+    
+    Only fields whose values differ from the database are saved, in a single
+    revision; running it again on an unchanged file does nothing.
     
     Usage:
         python manage.py update_site_config
+        python manage.py update_site_config --check
     """
     help = 'Updates site configuration from the site_config.md file'
     
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Report fields that would change without saving them; '
+                                 'exits with status 1 if there are any')
+    
     def handle(self, *args, **options):
         """
         Main command execution method.
         
         Reads the site_config.md file, parses its sections, and updates the
-        SiteConfig model with extracted values. Also generates a custom CSS file
-        from the CSS section.
+        SiteConfig model with the values that changed, including the custom
+        CSS, which is also written to the static CSS file.
         """
         # Get path to configuration file
-        config_file = os.path.join(settings.BASE_DIR, 'site_config.md')
+        config_file = config_file_path()
         
         # Check if file exists
         if not os.path.exists(config_file):
@@ -38,161 +46,24 @@ class Command(BaseCommand):
         with open(config_file, 'r') as f:
             content = f.read()
         
-        # Parse yaml blocks for different configuration sections
-        site_info = self._parse_yaml_block(content, 'Site Information')
-        colors = self._parse_yaml_block(content, 'Colors and Styling')
-        contact = self._parse_yaml_block(content, 'Contact Information')
-        social = self._parse_yaml_block(content, 'Social Media')
-        analytics = self._parse_yaml_block(content, 'Google Analytics')
-        
-        # Parse about content as markdown
-        about_text = self._parse_markdown_block(content, 'About Me')
-        
-        # Parse custom CSS
-        custom_css = self._parse_code_block(content, 'Custom CSS', 'css')
-        
-        # Get or create site config singleton
-        config = SiteConfig.get()
-        
-        # IMPORTANT: Set flag to prevent post_save signal from triggering export
-        # This breaks the potential infinite loop between file and database updates
-        config._skip_signal = True
-        print(f"UPDATE_SITE_CONFIG: Setting _skip_signal=True before saving")
-        
-        # Update fields from parsed data, keeping existing values as fallback
-        if site_info:
-            config.title = site_info.get('title', config.title)
-            config.tagline = site_info.get('tagline', config.tagline)
-            config.brand = site_info.get('brand', config.brand)
-            config.footer_text = site_info.get('footer_text', config.footer_text)
-            config.meta_description = site_info.get('meta_description', config.meta_description)
-        
-        if colors:
-            config.primary_color = colors.get('primary_color', config.primary_color)
-            config.secondary_color = colors.get('secondary_color', config.secondary_color)
-        
-        if about_text:
-            config.about_text = about_text
-        
-        if contact:
-            config.email = contact.get('email', config.email)
-            config.phone = contact.get('phone', config.phone)
-            config.address = contact.get('address', config.address)
-        
-        if social:
-            config.github_url = social.get('github_url', config.github_url)
-            config.linkedin_url = social.get('linkedin_url', config.linkedin_url)
-            config.twitter_url = social.get('twitter_url', config.twitter_url)
-            config.facebook_url = social.get('facebook_url', config.facebook_url)
-            config.instagram_url = social.get('instagram_url', config.instagram_url)
-            # Handle Bluesky separately since it might be a newer addition
-            config.bluesky_url = social.get('bluesky_url', config.bluesky_url)
-        
-        if analytics:
-            config.google_analytics_id = analytics.get('google_analytics_id', config.google_analytics_id)
-            
-        # Parse AI configuration
-        ai_config = self._parse_yaml_block(content, 'AI Configuration')
-        if ai_config:
-            config.anthropic_api_key = ai_config.get('anthropic_api_key', config.anthropic_api_key)
-        
-        # Save config to database
-        config.save()
-        
-        # Create custom CSS file in static directory
-        if custom_css:
-            css_dir = os.path.join(settings.BASE_DIR, 'static', 'css')
-            os.makedirs(css_dir, exist_ok=True)
-            css_file = os.path.join(css_dir, 'custom.css')
-            
-            with open(css_file, 'w') as f:
-                f.write(custom_css)
-            
-            self.stdout.write(self.style.SUCCESS(f'Custom CSS written to {css_file}'))
-        
-        self.stdout.write(self.style.SUCCESS('Site configuration updated successfully'))
-    
-    def _parse_yaml_block(self, content, section_name):
-        """
-        Parse YAML block from markdown file for a specific section.
-        
-        This method extracts and parses YAML content between triple backtick fences
-        following a section header. It handles error reporting for invalid YAML.
-        
-        Args:
-            content (str): Full markdown file content
-            section_name (str): Section header to look for (without ## prefix)
-            
-        Returns:
-            dict: Parsed YAML content as dictionary, or None if section not found or parsing failed
-        """
-        pattern = rf'## {section_name}\s*```yaml\s*(.*?)\s*```'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if match:
-            yaml_content = match.group(1)
-            try:
-                return yaml.safe_load(yaml_content)
-            except yaml.YAMLError as e:
-                self.stdout.write(self.style.ERROR(f'Error parsing YAML in section {section_name}: {e}'))
-        
-        return None
-    
-    def _parse_markdown_block(self, content, section_name):
-        """
-        Parse markdown content block for a specific section.
-        
-        Args:
-            content (str): Full markdown file content
-            section_name (str): Section header to look for (without ## prefix)
-            
-        Returns:
-            str: Extracted markdown content, or None if section not found
-        """
-        # Debug output
-        print(f"Looking for markdown block in section: '{section_name}'")
-        content_snippet = content[content.find(f"## {section_name}"):content.find(f"## {section_name}") + 300]
-        print(f"Section content snippet: {content_snippet[:100]}...")
-        
-        # First try with explicit markdown tag - most specific pattern
-        pattern = rf'## {section_name}[^\#]*?```markdown\s*(.*?)\s*```'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if match:
-            print(f"Found match with markdown tag for section '{section_name}'")
-            return match.group(1)
-        else:
-            print(f"No match with markdown tag for section '{section_name}'")
-        
-        # If not found, try with any code block following the section header
-        pattern = rf'## {section_name}[^\#]*?```(?:markdown)?\s*(.*?)\s*```'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if match:
-            print(f"Found match with generic code block for section '{section_name}'")
-            return match.group(1)
-        else:
-            print(f"No match with generic code block for section '{section_name}'")
-            
-        print(f"WARNING: Could not find markdown block for section '{section_name}'")
-        return None
-    
-    def _parse_code_block(self, content, section_name, language):
-        """
-        Parse code block for a specific language from a section.
+        # Parse the file and save the changed fields
+        changed, errors = update_from_file(content, dry_run=options['check'])
+        for error in errors:
+            self.stdout.write(self.style.ERROR(error))
+        
+        if options['check']:
+            if changed:
+                for field in changed:
+                    self.stdout.write(self.style.WARNING(f'{field} would change'))
+                raise CommandError(f'{len(changed)} field(s) in {config_file} differ from the database', returncode=1)
+            self.stdout.write(self.style.SUCCESS('Database is in sync with the config file'))
+            return
         
-        Args:
-            content (str): Full markdown file content
-            section_name (str): Section header to look for (without ## prefix)
-            language (str): Language identifier in the code fence (e.g., 'css', 'js')
-            
-        Returns:
-            str: Extracted code content, or None if section not found
-        """
-        pattern = rf'## {section_name}\s*```{language}\s*(.*?)\s*```'
-        match = re.search(pattern, content, re.DOTALL)
+        if not changed:
+            self.stdout.write(self.style.SUCCESS('Site configuration is already up to date'))
+            return
         
-        if match:
-            return match.group(1)
+        if 'custom_css' in changed:
+            self.stdout.write(self.style.SUCCESS(f'Custom CSS written to {SiteConfig.get().get_custom_css_path()}'))
         
-        return None
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"Site configuration updated successfully ({', '.join(changed)})"))
@@ -1,57 +1,127 @@
 import os
+import threading
 import time
-import subprocess
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from django.conf import settings
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db import connection
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from core.models import SiteConfig
+from core.config_file import config_file_path, content_hash, update_from_file
+
 
 class ConfigFileHandler(FileSystemEventHandler):
-    def __init__(self, command_path):
-        self.command_path = command_path
-        self.last_modified = time.time()
-        
-    def on_modified(self, event):
-        if event.src_path.endswith('site_config.md'):
-            # Debounce to prevent multiple executions
-            if time.time() - self.last_modified > 1:
-                self.last_modified = time.time()
-                print(f"\n🔄 {event.src_path} has been modified - updating site configuration...")
-                subprocess.call(['python', self.command_path, 'update_site_config'])
-                print("✅ Site configuration updated from file!\n")
+    """
+    Applies site_config.md to the database when the file changes.
+
+    Editors often write a file in several steps (truncate, write, rename), so
+    changes are debounced on the trailing edge: the file is applied once, when
+    no further events have arrived for `debounce` seconds. The file is parsed
+    in this process, and nothing is saved when its content hash matches the
+    last applied version.
+    """
+    def __init__(self, config_file, command, debounce=0.5):
+        self.config_file = os.path.abspath(config_file)
+        self.command = command
+        self.debounce = debounce
+        self.last_hash = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def _is_config_file(self, event):
+        paths = [event.src_path, getattr(event, 'dest_path', '')]
+        return any(path and os.path.abspath(path) == self.config_file for path in paths)
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in ('modified', 'created', 'moved'):
+            return
+        if not self._is_config_file(event):
+            return
+
+        # Restart the debounce timer on every event
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self.apply)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def remember_current(self):
+        """Record the file's current content as already applied."""
+        with open(self.config_file, 'rb') as f:
+            self.last_hash = content_hash(f.read())
+
+    def apply(self):
+        """Parse the file and save any changed fields, unless its content is unchanged."""
+        stdout, style = self.command.stdout, self.command.style
+        try:
+            with open(self.config_file, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Mid-save by an editor; the event for the new file will follow
+            return
+
+        digest = content_hash(data)
+        if digest == self.last_hash:
+            return
+
+        stdout.write(f"\n🔄 {self.config_file} has been modified - updating site configuration...")
+        started = time.perf_counter()
+        try:
+            changed, errors = update_from_file(data.decode('utf-8'))
+        except Exception as e:
+            stdout.write(style.ERROR(f"Could not apply site configuration: {e}"))
+            return
+        finally:
+            # apply() runs on a new timer thread each time, with its own
+            # connection, which CONN_MAX_AGE would otherwise keep open
+            connection.close()
+
+        self.last_hash = digest
+        for error in errors:
+            stdout.write(style.ERROR(error))
+        elapsed = (time.perf_counter() - started) * 1000
+        if changed:
+            stdout.write(style.SUCCESS(f"✅ Updated {', '.join(changed)} in {elapsed:.0f} ms\n"))
+        else:
+            stdout.write("No configuration values changed\n")
+
 
 class Command(BaseCommand):
     help = 'Watches the site_config.md file for changes and auto-updates site configuration'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debounce', type=float, default=0.5,
+                            help='Seconds without further changes before the file is applied (default: 0.5)')
+
     def handle(self, *args, **options):
-        config_file = os.path.join(settings.BASE_DIR, 'site_config.md')
-        
+        config_file = config_file_path()
+
         # Check if file exists
         if not os.path.exists(config_file):
             self.stdout.write(self.style.ERROR(f'Config file not found: {config_file}'))
             return
-        
+
+        # Run the export once at startup to make sure the file is in sync
+        self.stdout.write("Syncing site_config.md with current database values...")
+        call_command('export_site_config', stdout=self.stdout)
+
+        # The exported file matches the database, so don't re-apply it
+        event_handler = ConfigFileHandler(config_file, self, debounce=options['debounce'])
+        event_handler.remember_current()
+
+        # Set up file watching; the directory is watched so that editors which
+        # save by renaming a temporary file over the original are noticed
+        observer = Observer()
+        observer.schedule(event_handler, path=os.path.dirname(config_file), recursive=False)
+        observer.start()
+
         self.stdout.write(self.style.SUCCESS(f'Watching {config_file} for changes...'))
         self.stdout.write(self.style.SUCCESS('Any saved changes will automatically update the site configuration.'))
-        self.stdout.write(self.style.SUCCESS('Changes made in admin will also update the config file.'))
         self.stdout.write(self.style.SUCCESS('Press Ctrl+C to stop watching.'))
-        
-        # Set up file watching
-        event_handler = ConfigFileHandler(os.path.join(settings.BASE_DIR, 'manage.py'))
-        observer = Observer()
-        observer.schedule(event_handler, path=settings.BASE_DIR, recursive=False)
-        observer.start()
-        
-        # Run the export once at startup to make sure the file is in sync
-        print("Syncing site_config.md with current database values...")
-        subprocess.call(['python', os.path.join(settings.BASE_DIR, 'manage.py'), 'export_site_config'])
-        
+
         try:
-            while True:
-                time.sleep(1)
+            while observer.is_alive():
+                observer.join(1)
         except KeyboardInterrupt:
             observer.stop()
-        observer.join()
\ No newline at end of file
+        observer.join()
@@ -0,0 +1,255 @@
+"""
+Opt-in request instrumentation for MickBlog.
+
+When METRICS_ENABLED is set, RequestMetricsMiddleware (core.middleware) times
+every request and breaks the time down into:
+
+- db: number and duration of database queries
+- template: time spent rendering templates
+- markdown: time spent in markdownify
+- ai: time spent waiting for the Anthropic API
+
+Each request reports its breakdown in a Server-Timing header, so it shows up
+in the browser's network panel, and is added to per-view histograms kept in
+process memory. The histograms are shown to staff at /admin/metrics/ and
+exported in the Prometheus text format at /metrics/.
+
+Components overlap: markdown rendered from a template counts towards both
+'template' and 'markdown', and everything counts towards the view's total.
+
+When metrics are disabled the middleware removes itself at startup, timed()
+returns functions unchanged and record_timing() returns immediately, so the
+instrumentation costs nothing on the request path.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from markdownx.utils import markdownify as _markdownify
+
+METRICS_ENABLED = getattr(settings, 'METRICS_ENABLED', False)
+
+# Components measured within a request, in Server-Timing order
+COMPONENTS = ('db', 'template', 'markdown', 'ai')
+
+# Histogram bucket upper bounds in seconds (Prometheus defaults)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Timings of the request being handled in the current thread or task
+_current_request = ContextVar('request_metrics', default=None)
+
+
+class RequestTimings:
+    """Accumulated component timings for a single request."""
+    __slots__ = ('durations', 'queries')
+
+    def __init__(self):
+        self.durations = dict.fromkeys(COMPONENTS, 0.0)
+        self.queries = 0
+
+
+def start_request():
+    """
+    Start collecting timings for the current request.
+
+    Returns:
+        tuple: (timings, token) where token is passed to finish_request()
+    """
+    timings = RequestTimings()
+    return timings, _current_request.set(timings)
+
+
+def finish_request(token):
+    """Stop collecting timings for the request started with start_request()."""
+    _current_request.reset(token)
+
+
+def record_timing(component, seconds):
+    """
+    Add time spent in a component to the current request, if one is being measured.
+
+    Args:
+        component: One of COMPONENTS
+        seconds: Duration in seconds
+    """
+    timings = _current_request.get()
+    if timings is not None:
+        timings.durations[component] += seconds
+
+
+def timed(component):
+    """
+    Decorator that records a function's run time under the given component.
+
+    Returns the function unchanged when metrics are disabled.
+    """
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_timing(component, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def query_timer(execute, sql, params, many, context):
+    """Database execute wrapper that counts and times queries for the current request."""
+    timings = _current_request.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.durations['db'] += time.perf_counter() - started
+        timings.queries += 1
+
+
+# Markdown rendering used throughout the project, timed as 'markdown'
+markdownify = timed('markdown')(_markdownify)
+
+
+def instrument_templates():
+    """Time Django template rendering as the 'template' component."""
+    from django.template.backends.django import Template
+
+    if not getattr(Template.render, '_metrics_timed', False):
+        Template.render = timed('template')(Template.render)
+        Template.render._metrics_timed = True
+
+
+def server_timing_header(total, timings):
+    """
+    Build a Server-Timing header value for a finished request.
+
+    Args:
+        total: Total request time in seconds
+        timings: The request's RequestTimings
+    """
+    entries = [f"app;dur={total * 1000:.1f}"]
+    for component in COMPONENTS:
+        duration = timings.durations[component]
+        if component == 'db':
+            entries.append(f'db;dur={duration * 1000:.1f};desc="{timings.queries} queries"')
+        elif duration:
+            entries.append(f"{component};dur={duration * 1000:.1f}")
+    return ', '.join(entries)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def percentile(self, fraction):
+        """Estimate a percentile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    """
+    Thread-safe per-view histograms of request timings.
+
+    Histograms live in process memory, so each worker process reports its own
+    numbers and they reset when the process restarts.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, total, timings):
+        with self._lock:
+            entry = self._views.get(view)
+            if entry is None:
+                entry = self._views[view] = {
+                    'total': Histogram(),
+                    **{component: Histogram() for component in COMPONENTS},
+                    'queries': 0,
+                }
+            entry['total'].observe(total)
+            for component in COMPONENTS:
+                entry[component].observe(timings.durations[component])
+            entry['queries'] += timings.queries
+
+    def summary(self):
+        """
+        Summarize each view's timings for the dashboard.
+
+        Returns:
+            list: Dictionaries sorted by total time spent, with request count,
+                  mean/p50/p95 total time and mean component times in milliseconds
+        """
+        rows = []
+        with self._lock:
+            for view, entry in self._views.items():
+                count = entry['total'].count
+                rows.append({
+                    'view': view,
+                    'requests': count,
+                    'total_seconds': entry['total'].total,
+                    'mean_ms': entry['total'].total / count * 1000,
+                    'p50_ms': entry['total'].percentile(0.5) * 1000,
+                    'p95_ms': entry['total'].percentile(0.95) * 1000,
+                    'queries': entry['queries'] / count,
+                    **{f"{component}_ms": entry[component].total / count * 1000 for component in COMPONENTS},
+                })
+        return sorted(rows, key=lambda row: row['total_seconds'], reverse=True)
+
+    def prometheus(self):
+        """Render all histograms in the Prometheus text exposition format."""
+        lines = [
+            '# HELP mickblog_request_duration_seconds Request time by view and component.',
+            '# TYPE mickblog_request_duration_seconds histogram',
+        ]
+        query_lines = [
+            '# HELP mickblog_db_queries_total Database queries by view.',
+            '# TYPE mickblog_db_queries_total counter',
+        ]
+        with self._lock:
+            for view, entry in sorted(self._views.items()):
+                label = view.replace('\\', '\\\\').replace('"', '\\"')
+                for component in ('total',) + COMPONENTS:
+                    histogram = entry[component]
+                    labels = f'view="{label}",component="{component}"'
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        cumulative += count
+                        lines.append(f'mickblog_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'mickblog_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f'mickblog_request_duration_seconds_sum{{{labels}}} {histogram.total:.6f}')
+                    lines.append(f'mickblog_request_duration_seconds_count{{{labels}}} {histogram.count}')
+                query_lines.append(f'mickblog_db_queries_total{{view="{label}"}} {entry["queries"]}')
+        return '\n'.join(lines + query_lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
@@ -1,8 +1,20 @@
+from contextlib import ExitStack
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+import logging
+import os
 import time
+from core import metrics
+from core.assets import CSS_HASHED_NAME_RE, CUSTOM_CSS_DIR
+from core.icons import ICON_HASHED_NAME_RE, ICONS_DIR
+from core.log import HOT_PATH_DEBUG
 from core.models import SiteConfig
 
+logger = logging.getLogger(__name__)
+
 class SiteConfigMiddleware(MiddlewareMixin):
     """
     Middleware to inject site configuration into request for every view.
@@ -21,10 +33,11 @@ class SiteConfigMiddleware(MiddlewareMixin):
             # Use get() instead of objects.get(pk=1) to handle first-run scenarios
             # where the SiteConfig object might not exist yet
             request.site_config = SiteConfig.get()
-            print(f"SiteConfigMiddleware: Loaded title = {request.site_config.title}")
+            if HOT_PATH_DEBUG:
+                logger.debug("Loaded site config: title=%s", request.site_config.title)
         except Exception as e:
             # Log error and set empty config for graceful degradation
-            print(f"SiteConfigMiddleware error: {e}")
+            logger.error("Could not load site config: %s", e)
             request.site_config = None
         return None
 
@@ -59,6 +72,89 @@ class DisableBrowserCachingMiddleware(MiddlewareMixin):
                     response.content = content.encode('utf-8')
             except Exception as e:
                 # If content modification fails, log error but still return response
-                print(f"DisableBrowserCachingMiddleware error: {e}")
+                logger.warning("Could not add cache-busting comment: %s", e)
                 
-        return response
\ No newline at end of file
+        return response
+
+class RequestMetricsMiddleware:
+    """
+    Middleware that measures each request when METRICS_ENABLED is set.
+    
+    Records the total time, database query count and time, template and
+    markdown rendering time, and time spent waiting for the Anthropic API
+    (see core.metrics). The breakdown is added to the response as a
+    Server-Timing header and to the per-view histograms shown at /admin/metrics/.
+    
+    Place it first in MIDDLEWARE so the total includes all other middleware.
+    When metrics are disabled it removes itself from the middleware chain at
+    startup, so it adds no overhead.
+    """
+    def __init__(self, get_response):
+        if not metrics.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metrics.instrument_templates()
+    
+    def __call__(self, request):
+        timings, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.query_timer))
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        total = time.perf_counter() - started
+        
+        # Group by URL name; unresolved requests (404s) share one entry
+        resolver_match = getattr(request, 'resolver_match', None)
+        view = resolver_match.view_name if resolver_match else '<unresolved>'
+        metrics.registry.observe(view, total, timings)
+        
+        response['Server-Timing'] = metrics.server_timing_header(total, timings)
+        return response
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, serving the collected static files from gunicorn.
+    
+    Hashed files (see core.storage) get a year-long immutable Cache-Control
+    header and are served from their precompressed .br/.gz copies when the
+    browser accepts them. WhiteNoise lists STATIC_ROOT once at startup, so the
+    custom CSS and favicon set that SiteConfig publishes at runtime (see
+    core.assets and core.icons) are picked up the first time they are requested.
+    """
+    # Directories of runtime-published files, with the pattern of their hashed names
+    PUBLISHED_DIRS = {
+        CUSTOM_CSS_DIR: CSS_HASHED_NAME_RE,
+        ICONS_DIR: ICON_HASHED_NAME_RE,
+    }
+    
+    def __call__(self, request):
+        if not self.autorefresh and request.path_info not in self.files:
+            self.add_published_file(request.path_info)
+        return super().__call__(request)
+    
+    def published_name(self, url):
+        """The path under STATIC_ROOT of a runtime-published file's URL, or None."""
+        if not url.startswith(self.static_prefix):
+            return None
+        directory, _, filename = url[len(self.static_prefix):].partition('/')
+        pattern = self.PUBLISHED_DIRS.get(directory)
+        if pattern is None or not pattern.match(filename):
+            return None
+        return os.path.join(directory, filename)
+    
+    def add_published_file(self, url):
+        name = self.published_name(url)
+        if name is None:
+            return
+        path = os.path.join(settings.STATIC_ROOT, name)
+        if os.path.exists(path):
+            self.add_file_to_dictionary(url, path)
+    
+    def immutable_file_test(self, path, url):
+        if self.published_name(url) is not None:
+            return True
+        return super().immutable_file_test(path, url)
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:42
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_remove_siteconfig_anthropic_api_key_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIConversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Public identifier sent by the editor client', unique=True)),
+                ('editor', models.CharField(choices=[('site_config', 'Site Configuration Editor'), ('blog', 'AI Blog Editor')], help_text='Which AI editor this conversation belongs to', max_length=20)),
+                ('summary', models.TextField(blank=True, help_text='Rolling summary of turns no longer kept verbatim')),
+                ('messages', models.JSONField(blank=True, default=list, help_text='Recent turns as role/content dictionaries')),
+                ('summarized_messages', models.PositiveIntegerField(default=0, help_text='Number of messages folded into the summary')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(help_text='Staff user who owns this conversation', on_delete=django.db.models.deletion.CASCADE, related_name='ai_conversations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'AI Conversation',
+                'ordering': ('-updated',),
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-19 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_aiconversation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIUsageRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('purpose', models.CharField(blank=True, help_text='Which feature made the request', max_length=50)),
+                ('model', models.CharField(help_text='Model that served the request', max_length=100)),
+                ('input_tokens', models.PositiveIntegerField(default=0, help_text='Uncached input tokens')),
+                ('output_tokens', models.PositiveIntegerField(default=0)),
+                ('cache_creation_input_tokens', models.PositiveIntegerField(default=0, help_text='Input tokens written to the prompt cache')),
+                ('cache_read_input_tokens', models.PositiveIntegerField(default=0, help_text='Input tokens read from the prompt cache')),
+                ('latency_ms', models.PositiveIntegerField(default=0, help_text='Wall-clock time of the API request')),
+                ('cache_requested', models.BooleanField(default=False, help_text='Whether cache breakpoints were sent')),
+            ],
+            options={
+                'verbose_name': 'AI Usage Record',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
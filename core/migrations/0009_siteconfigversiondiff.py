@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-19 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_aiusagerecord'),
+        ('reversion', '0002_add_index_on_version_for_content_type_and_db'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteConfigVersionDiff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_version_id', models.IntegerField(blank=True, help_text='Version the changes are relative to (empty for the first one)', null=True)),
+                ('changed_fields', models.JSONField(blank=True, default=list, help_text='Names of the changed fields')),
+                ('changes', models.JSONField(blank=True, default=dict, help_text='Previous and new value preview for each changed field')),
+                ('version', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='siteconfig_diff', to='reversion.version')),
+            ],
+            options={
+                'verbose_name': 'Site Configuration Version Diff',
+            },
+        ),
+    ]
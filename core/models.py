@@ -1,11 +1,21 @@
 import os
+import uuid
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.conf import settings
 from markdownx.models import MarkdownxField
-from markdownx.utils import markdownify
+from core.assets import custom_css_name, custom_css_url, publish_custom_css
+from core.icons import ensure_icon_set, icon_links
+from core.metrics import markdownify
 import reversion
 
 
+# Cache key of the SiteConfig singleton
+SITE_CONFIG_CACHE_KEY = 'core:site_config'
+
+
 @reversion.register()
 class SiteConfig(models.Model):
     """
@@ -109,10 +119,25 @@ class SiteConfig(models.Model):
         
         This method ensures we always have a valid configuration object to work with,
         avoiding the need for null checks throughout the codebase.
+        
+        The configuration is kept in the cache for SITE_CONFIG_CACHE_TIMEOUT
+        seconds, so most requests don't query it. Every save invalidates it.
+        With a timeout of 0 (the default without a shared cache) it is read
+        fresh every time.
         """
-        config, created = cls.objects.get_or_create(pk=1)
+        timeout = settings.SITE_CONFIG_CACHE_TIMEOUT
+        config = cache.get(SITE_CONFIG_CACHE_KEY) if timeout else None
+        if config is None:
+            config, created = cls.objects.get_or_create(pk=1)
+            if timeout:
+                cache.set(SITE_CONFIG_CACHE_KEY, config, timeout)
         return config
     
+    @classmethod
+    def invalidate_cache(cls):
+        """Drop the cached configuration so the next get() reads the database."""
+        cache.delete(SITE_CONFIG_CACHE_KEY)
+    
     @property
     def formatted_about(self):
         """
@@ -123,22 +148,28 @@ class SiteConfig(models.Model):
     
     def get_custom_css_path(self):
         """
-        Returns the path to the custom CSS file.
+        Returns the path to the published (content-hashed) custom CSS file.
+        The file is written by save_custom_css(), not here.
         """
-        return os.path.join(settings.STATIC_ROOT, 'css', 'custom.css')
+        return os.path.join(settings.STATIC_ROOT, custom_css_name(self.custom_css) or 'css/custom.css')
         
     def save_custom_css(self):
         """
-        Save the custom CSS to a file in the static directory.
-        This allows it to be served efficiently by the web server.
+        Publish the custom CSS to a content-hashed file in the static directory.
+        This allows it to be served efficiently, and cached indefinitely, by
+        the web server (see core.assets).
         """
-        if self.custom_css:
-            css_dir = os.path.join(settings.STATIC_ROOT, 'css')
-            os.makedirs(css_dir, exist_ok=True)
-            
-            css_file = os.path.join(css_dir, 'custom.css')
-            with open(css_file, 'w') as f:
-                f.write(self.custom_css)
+        return publish_custom_css(self.custom_css)
+    
+    @property
+    def custom_css_url(self):
+        """URL of the published custom CSS, or an empty string if there is none."""
+        return custom_css_url(self.custom_css)
+    
+    @property
+    def icon_links(self):
+        """URLs of the favicon set generated from the favicon (see core.icons)."""
+        return icon_links(self)
                 
     def to_dict(self):
         """
@@ -183,4 +214,112 @@ class SiteConfig(models.Model):
                 'maintenance_mode': self.maintenance_mode,
                 'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             }
-        }
\ No newline at end of file
+        }
+
+
+@receiver([post_save, post_delete], sender=SiteConfig)
+def invalidate_site_config_cache(sender, **kwargs):
+    """
+    Invalidate the cached configuration whenever it is saved or deleted.
+    
+    A signal is used rather than SiteConfig.save() so that restoring a version
+    with django-reversion, which saves without calling save(), is covered too.
+    """
+    SiteConfig.invalidate_cache()
+
+
+@receiver(post_save, sender=SiteConfig)
+def publish_site_icons(sender, instance, **kwargs):
+    """
+    Generate the favicon set when the configuration is saved; page loads only
+    read it. Nothing is generated if the favicon and the site's name and color
+    are unchanged.
+    """
+    ensure_icon_set(instance)
+
+
+class SiteConfigVersionDiff(models.Model):
+    """
+    Field-level changes made by one stored version of the site configuration.
+    
+    Computed once, when the revision is committed (or the first time the
+    history page needs it), by comparing the version with the previous version
+    of the configuration. Values are stored as short previews, so the history
+    pages never have to deserialize and compare full snapshots.
+    """
+    version = models.OneToOneField('reversion.Version', on_delete=models.CASCADE,
+                                   related_name='siteconfig_diff')
+    previous_version_id = models.IntegerField(null=True, blank=True,
+                                              help_text="Version the changes are relative to (empty for the first one)")
+    changed_fields = models.JSONField(default=list, blank=True, help_text="Names of the changed fields")
+    changes = models.JSONField(default=dict, blank=True, help_text="Previous and new value preview for each changed field")
+    
+    class Meta:
+        verbose_name = "Site Configuration Version Diff"
+    
+    def __str__(self):
+        return f"Changes in version {self.version_id}"
+
+
+class AIConversation(models.Model):
+    """
+    Server-side conversation state for the AI editors.
+    
+    Instead of the browser sending the full chat history on every turn, each
+    conversation is stored here and referenced by its key. Recent turns are kept
+    verbatim in `messages`; older turns are folded into `summary` once the
+    conversation exceeds its token budget, so prompts stay a roughly constant size.
+    """
+    EDITOR_CHOICES = (
+        ('site_config', 'Site Configuration Editor'),
+        ('blog', 'AI Blog Editor'),
+    )
+    
+    key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False,
+                           help_text="Public identifier sent by the editor client")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                             related_name='ai_conversations', help_text="Staff user who owns this conversation")
+    editor = models.CharField(max_length=20, choices=EDITOR_CHOICES, help_text="Which AI editor this conversation belongs to")
+    summary = models.TextField(blank=True, help_text="Rolling summary of turns no longer kept verbatim")
+    messages = models.JSONField(default=list, blank=True, help_text="Recent turns as role/content dictionaries")
+    summarized_messages = models.PositiveIntegerField(default=0, help_text="Number of messages folded into the summary")
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ('-updated',)
+        verbose_name = "AI Conversation"
+    
+    def __str__(self):
+        return f"{self.get_editor_display()} conversation {self.key}"
+
+
+
+class AIUsageRecord(models.Model):
+    """
+    Token usage reported by the Anthropic API for a single request.
+    
+    Cache read and write counts show how much of each prompt was served from the
+    prompt cache, which makes the cost and latency savings of caching measurable.
+    """
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    purpose = models.CharField(max_length=50, blank=True, help_text="Which feature made the request")
+    model = models.CharField(max_length=100, help_text="Model that served the request")
+    input_tokens = models.PositiveIntegerField(default=0, help_text="Uncached input tokens")
+    output_tokens = models.PositiveIntegerField(default=0)
+    cache_creation_input_tokens = models.PositiveIntegerField(default=0, help_text="Input tokens written to the prompt cache")
+    cache_read_input_tokens = models.PositiveIntegerField(default=0, help_text="Input tokens read from the prompt cache")
+    latency_ms = models.PositiveIntegerField(default=0, help_text="Wall-clock time of the API request")
+    cache_requested = models.BooleanField(default=False, help_text="Whether cache breakpoints were sent")
+    
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = "AI Usage Record"
+    
+    def __str__(self):
+        return f"{self.purpose or 'AI request'} at {self.created:%Y-%m-%d %H:%M:%S}"
+    
+    @property
+    def total_input_tokens(self):
+        """All input tokens, whether uncached, written to or read from the cache."""
+        return self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
@@ -43,8 +43,9 @@
             addMessage('Welcome to the AI Editor! I can help you update your site configuration. How would you like to customize your site?', 'system');
         }
         
-        // Chat history for context management
-        let messageHistory = [];
+        // Conversation key for server-side context management; the server keeps
+        // the chat history, so only the new message is sent on each turn
+        let conversationId = null;
         
         // Send message when button is clicked
         if (sendButton) {
@@ -180,12 +181,6 @@
             if (isUserMessage && chatMessages) {
                 addMessage(message, 'user');
                 
-                // Add to message history
-                messageHistory.push({
-                    role: 'user',
-                    content: message
-                });
-                
                 // Clear input field
                 if (userInput) {
                     userInput.value = '';
@@ -203,7 +198,7 @@
                 },
                 body: JSON.stringify({
                     message: message,
-                    history: messageHistory
+                    conversation_id: conversationId
                 })
             })
             .then(response => {
@@ -227,17 +222,16 @@
                     throw new Error(errorMessage);
                 }
                 
+                // Remember the server-side conversation for the next message
+                if (response.conversation_id) {
+                    conversationId = response.conversation_id;
+                }
+                
                 // Handle the natural language response
                 if (response.reply) {
                     // Add AI response to chat
                     addMessage(response.reply, 'assistant');
                     
-                    // Add to message history
-                    messageHistory.push({
-                        role: 'assistant',
-                        content: response.reply
-                    });
-                    
                     // Scroll to bottom of chat
                     if (chatMessages) {
                         chatMessages.scrollTop = chatMessages.scrollHeight;
@@ -0,0 +1,63 @@
+"""
+Template tags for uploaded images.
+
+Usage:
+    {% load responsive_images %}
+    {% responsive_image project.image alt=project.title sizes="(min-width: 768px) 50vw, 100vw" class="card-img-top" %}
+"""
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+
+from core.images import FALLBACK_FORMATS, FORMATS, derivatives_for
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(f"{settings.MEDIA_URL}{name} {width}w" for width, name in variants)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', lazy=True, **attrs):
+    """
+    Render an image field as a <picture> with resized AVIF/WebP/JPEG sources.
+
+    The browser picks the smallest file that fills the slot described by
+    `sizes`. Until the derivatives exist (see core.images), or if there is no
+    JPEG or PNG among them, a plain <img> of the original is rendered.
+
+    Args:
+        image: The image field's file, e.g. project.image
+        alt (str): Alternative text
+        sizes (str): The sizes attribute: how wide the image is displayed
+        lazy (bool): Load the image only when it nears the viewport; turn off
+                     for images above the fold
+        **attrs: Further <img> attributes, such as class
+    """
+    if not image:
+        return ''
+
+    loading = 'lazy' if lazy else 'eager'
+    extra = format_html_join('', ' {}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items()))
+
+    manifest = derivatives_for(image)
+    variants = manifest['variants'] if manifest else {}
+    # The <img> itself needs a format every browser understands
+    fallback = next((fmt for fmt in FALLBACK_FORMATS if variants.get(fmt)), None)
+    if fallback is None:
+        return format_html('<img src="{}" alt="{}" loading="{}" decoding="async"{}>',
+                           image.url, alt, loading, extra)
+
+    formats = [fmt for fmt in FORMATS if fmt != fallback and variants.get(fmt)]
+    fallback_variants = variants[fallback]
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((FORMATS[fmt][2], _srcset(variants[fmt]), sizes) for fmt in formats),
+    )
+    return format_html(
+        '<picture>{}<img src="{}{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" '
+        'loading="{}" decoding="async"{}></picture>',
+        sources, settings.MEDIA_URL, fallback_variants[-1][1], _srcset(fallback_variants), sizes,
+        manifest['width'], manifest['height'], alt, loading, extra,
+    )
@@ -0,0 +1,46 @@
+"""
+Template tags for the site's static assets.
+
+Usage:
+    {% load site_assets %}
+    <style>{% inline_static 'vendor/critical.min.css' %}</style>
+"""
+import logging
+import os
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.utils.safestring import mark_safe
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+# Contents of inlined files, read once per process
+_inlined = {}
+
+
+@register.simple_tag
+def inline_static(path):
+    """
+    Insert the contents of a static file into the page, e.g. critical CSS.
+
+    The file is looked up with the staticfiles finders and then in STATIC_ROOT,
+    and cached in memory outside of DEBUG. A missing file renders nothing, so
+    the page still works with only its linked stylesheets.
+    """
+    content = _inlined.get(path)
+    if content is None:
+        located = finders.find(path)
+        if not located:
+            candidate = os.path.join(settings.STATIC_ROOT, path)
+            located = candidate if os.path.exists(candidate) else None
+        if not located:
+            logger.warning("Static file %s not found for inlining; run build_assets", path)
+            return ''
+        with open(located, 'r', encoding='utf-8') as f:
+            content = mark_safe(f.read())
+        if not settings.DEBUG:
+            _inlined[path] = content
+    return content
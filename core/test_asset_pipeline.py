@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.asset_pipeline import tree_shake, used_tokens
+
+CSS = ('.alert{a:1}.alert-success{b:2}.alert-danger{c:3}.btn{d:4}.btn-primary{e:5}'
+       '@media (min-width:1px){.navbar-expand-lg .navbar-nav{f:6}}')
+
+
+class TreeShakeTests(SimpleTestCase):
+    def tokens(self, template):
+        with tempfile.NamedTemporaryFile('w', suffix='.html', delete=False) as f:
+            f.write(template)
+        self.addCleanup(os.remove, f.name)
+        return used_tokens([f.name])
+
+    def test_rules_for_unused_classes_are_dropped(self):
+        css = tree_shake(CSS, self.tokens('<nav class="navbar-expand-lg"><ul class="navbar-nav"></ul></nav>'
+                                          '<a class="btn">'))
+        self.assertIn('.btn{d:4}', css)
+        self.assertIn('.navbar-expand-lg .navbar-nav{f:6}', css)
+        for selector in ('.alert{', '.alert-success', '.btn-primary'):
+            self.assertNotIn(selector, css)
+
+    def test_classes_completed_by_the_template_keep_every_variant(self):
+        css = tree_shake(CSS, self.tokens('<div class="alert alert-{{ message.tags }}">'
+                                          '<a class="btn btn-{% if primary %}primary{% endif %}">'))
+        for selector in ('.alert{', '.alert-success', '.alert-danger', '.btn-primary'):
+            self.assertIn(selector, css)
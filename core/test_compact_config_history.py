@@ -0,0 +1,35 @@
+from datetime import timedelta
+from io import StringIO
+
+import reversion
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from reversion.models import Revision, Version
+
+from core.models import SiteConfig
+
+
+class CompactConfigHistoryTests(TestCase):
+    def save_version(self, title, days_ago):
+        with reversion.create_revision():
+            config = SiteConfig.get()
+            config.title = title
+            config.save()
+        revision = Revision.objects.latest('pk')
+        Revision.objects.filter(pk=revision.pk).update(date_created=timezone.now() - timedelta(days=days_ago))
+        return revision
+
+    def test_only_revisions_emptied_by_the_command_are_removed(self):
+        # Three versions on the same old day: only the newest is kept
+        old = [self.save_version(f'Title {i}', days_ago=100) for i in range(3)]
+        recent = self.save_version('Current', days_ago=0)
+        unrelated = Revision.objects.create(date_created=timezone.now() - timedelta(days=400))
+
+        output = StringIO()
+        call_command('compact_config_history', stdout=output)
+
+        self.assertIn('Removed 2 versions and 2 empty revisions', output.getvalue())
+        remaining = set(Revision.objects.values_list('pk', flat=True))
+        self.assertEqual(remaining, {old[-1].pk, recent.pk, unrelated.pk})
+        self.assertEqual(Version.objects.get_for_object(SiteConfig.get()).count(), 2)
@@ -0,0 +1,74 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core import icons
+from core.models import SiteConfig
+
+
+def png_upload(name='favicon.png'):
+    output = io.BytesIO()
+    Image.new('RGBA', (64, 64), (200, 30, 30, 255)).save(output, 'PNG')
+    return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+
+class IconSetTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.static_root = os.path.join(directory, 'static')
+        settings = override_settings(STATIC_ROOT=self.static_root, MEDIA_ROOT=os.path.join(directory, 'media'),
+                                     IMAGE_WORKERS=0, IMAGE_DERIVATIVE_WIDTHS=[32])
+        settings.enable()
+        self.addCleanup(settings.disable)
+        icons._links_cache.clear()
+        self.addCleanup(icons._links_cache.clear)
+
+    def save_favicon(self):
+        config = SiteConfig.get()
+        config.favicon = png_upload()
+        config.save()
+        return config
+
+    def test_saving_publishes_the_set_and_its_index(self):
+        config = self.save_favicon()
+        links = icons.icon_links(config)
+        self.assertEqual(set(links), {'ico', 'apple_touch', 'manifest', 'theme_color'})
+        for key in ('ico', 'apple_touch', 'manifest'):
+            name = links[key].rsplit('/', 1)[1]
+            self.assertTrue(os.path.exists(os.path.join(self.static_root, icons.ICONS_DIR, name)))
+
+    def test_page_loads_read_the_index_without_generating(self):
+        config = self.save_favicon()
+        icons._links_cache.clear()
+        with mock.patch.object(icons, 'build_icon_set') as build:
+            self.assertTrue(icons.icon_links(config))
+            self.assertTrue(icons.ensure_icon_set(config))
+        build.assert_not_called()
+
+    def test_unpublished_set_is_not_linked_or_remembered(self):
+        config = self.save_favicon()
+        shutil.rmtree(os.path.join(self.static_root, icons.ICONS_DIR))
+        icons._links_cache.clear()
+        with mock.patch.object(icons, 'build_icon_set') as build:
+            self.assertEqual(icons.icon_links(config), {})
+        build.assert_not_called()
+        self.assertEqual(icons._links_cache, {})
+
+        # Once published (e.g. by the publish_icons command) it is linked
+        self.assertTrue(icons.ensure_icon_set(config))
+        self.assertTrue(icons.icon_links(config))
+
+    def test_unreadable_favicon_is_logged_and_not_linked(self):
+        config = SiteConfig.get()
+        config.favicon = SimpleUploadedFile('favicon.png', b'not an image', content_type='image/png')
+        with self.assertLogs('core.icons', 'ERROR'):
+            config.save()
+        self.assertEqual(icons.icon_links(config), {})
+        self.assertEqual(icons._links_cache, {})
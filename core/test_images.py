@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from core import images
+from core.images import generate_derivatives, manifest_name, supported_formats
+from core.templatetags.responsive_images import responsive_image
+
+
+class ImageTestCase(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_WORKERS=0,
+                                     IMAGE_DERIVATIVE_WIDTHS=[32, 64], IMAGE_DERIVATIVE_FORMATS=['webp', 'jpeg'])
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+
+    def write_image(self, name='projects/robot.jpg', size=(100, 50)):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new('RGB', size, (20, 120, 200)).save(path, 'JPEG')
+        return name, path
+
+    def field_file(self, name):
+        field_file = mock.Mock(url=f'/media/{name}')
+        field_file.name = name
+        return field_file
+
+
+class SupportedFormatsTests(ImageTestCase):
+    def test_fallback_is_always_included(self):
+        self.assertEqual(supported_formats(['webp']), ['webp', 'jpeg'])
+        self.assertEqual(supported_formats(['webp', 'png']), ['webp', 'png'])
+
+    def test_formats_pillow_cant_write_are_dropped(self):
+        with mock.patch.dict(Image.SAVE, clear=False):
+            Image.SAVE.pop('AVIF', None)
+            self.assertEqual(supported_formats(['avif']), ['jpeg'])
+
+
+class GenerateDerivativesTests(ImageTestCase):
+    def test_no_widths_writes_the_original_width(self):
+        name, path = self.write_image()
+        manifest = generate_derivatives(path, self.media_root, name, [], ['jpeg'])
+        self.assertEqual([width for width, _ in manifest['variants']['jpeg']], [100])
+
+
+class ResponsiveImageTests(ImageTestCase):
+    def test_picture_with_sources_and_fallback(self):
+        name, _ = self.write_image()
+        # The first render generates the derivatives and shows the original
+        self.assertTrue(responsive_image(self.field_file(name), alt='Robot').startswith('<img src='))
+        html = responsive_image(self.field_file(name), alt='Robot')
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('robot.64w.jpg', html)
+        self.assertIn('width="100" height="50"', html)
+
+    def test_manifest_without_variants_renders_the_original(self):
+        name, path = self.write_image()
+        manifest = generate_derivatives(path, self.media_root, name, [32, 64], ['webp', 'jpeg'])
+        manifest['variants'] = {}
+        with open(os.path.join(self.media_root, manifest_name(name)), 'w') as f:
+            json.dump(manifest, f)
+        html = responsive_image(self.field_file(name), alt='Robot')
+        self.assertTrue(html.startswith('<img src="/media/projects/robot.jpg"'))
+
+    def test_failed_generation_is_not_retried_on_every_render(self):
+        name, _ = self.write_image()
+        with mock.patch.object(images, 'generate_derivatives', side_effect=OSError('broken')) as generate, \
+                self.assertLogs('core.images', 'ERROR'):
+            for _ in range(3):
+                html = responsive_image(self.field_file(name), alt='Robot')
+        self.assertTrue(html.startswith('<img src='))
+        self.assertEqual(generate.call_count, 1)
+
+        # A new upload under the same name is tried again
+        os.utime(os.path.join(self.media_root, name), (1, 1))
+        responsive_image(self.field_file(name), alt='Robot')
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, manifest_name(name))))
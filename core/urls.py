@@ -7,6 +7,7 @@ app_name = 'core'
 urlpatterns = [
     path('', views.home, name='home'),
     path('about/', views.about, name='about'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
     path('test_json/', test_json_view, name='test-json'),
     path('ai_config/', ai_config_view, name='ai-config'),
     path('apply_changes/', apply_changes_view, name='apply-changes'),
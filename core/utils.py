@@ -4,103 +4,160 @@ Utility functions for the core app.
 This module provides utility functions for managing environment variables,
 particularly for secure handling of API keys without requiring server restarts.
 """
+import logging
 import os
 import re
-import environ
+import threading
+import time
 from django.conf import settings
 
-def reload_env_settings():
+logger = logging.getLogger(__name__)
+
+# Matches the API key line in a .env file, optionally prefixed with "export"
+ENV_API_KEY_RE = re.compile(r'^\s*(?:export\s+)?ANTHROPIC_API_KEY\s*=\s*(.*)$', re.MULTILINE)
+
+# Sentinels for "the .env file has not been checked yet" and "re-read it on the next check"
+_UNCHECKED = object()
+_STALE = object()
+
+
+def read_env_api_key(dotenv_path):
     """
-    Reload environment variables from .env file.
-    
-    This function is useful after updating the .env file to 
-    make the new values available without restarting the server.
+    Read the Anthropic API key from a .env file.
     
-    It implements multiple fallback mechanisms to ensure the API key
-    is always accessible, even in containerized environments where
-    environment variables might not update properly.
+    Args:
+        dotenv_path: Path to the .env file
     
     Returns:
-        bool: True if the API key was successfully loaded, False otherwise
+        str: The API key with surrounding whitespace and quotes removed, or an
+             empty string if the file has no ANTHROPIC_API_KEY line
+    """
+    with open(dotenv_path, 'r') as f:
+        content = f.read()
+    match = ENV_API_KEY_RE.search(content)
+    return match.group(1).strip().strip('"\'') if match else ''
+
+
+class ApiKeyProvider:
+    """
+    In-memory source of the Anthropic API key for this process.
+    
+    The key is resolved once at first use, from settings (which django-environ
+    loaded from the environment or .env at startup). After that, the .env file
+    is only stat()ed, at most once every API_KEY_RELOAD_INTERVAL seconds, and
+    re-read only when its modification time has changed. Requests therefore
+    never parse .env themselves.
+    
+    set_api_key writes .env and updates the provider of the worker handling the
+    request straight away; every other worker process sees the new mtime on
+    its next check and reloads the key.
     """
-    # Initialize environ
-    env = environ.Env()
+    def __init__(self, dotenv_path=None, check_interval=None):
+        self._dotenv_path = dotenv_path
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._key = ''
+        self._mtime = _UNCHECKED
+        self._next_check = 0.0
     
-    # Get the path to the .env file
-    dotenv_path = os.path.join(settings.BASE_DIR, '.env')
+    @property
+    def dotenv_path(self):
+        return self._dotenv_path or os.path.join(settings.BASE_DIR, '.env')
     
-    # Skip if .env file doesn't exist
-    if not os.path.exists(dotenv_path):
-        return False
+    @property
+    def check_interval(self):
+        if self._check_interval is not None:
+            return self._check_interval
+        return getattr(settings, 'API_KEY_RELOAD_INTERVAL', 2.0)
     
-    # Force reload of .env file
-    environ.Env.read_env(dotenv_path, overwrite=True)
+    def _stat_mtime(self):
+        try:
+            return os.stat(self.dotenv_path).st_mtime_ns
+        except OSError:
+            return None
     
-    # Update settings with the new values from environment
-    if 'ANTHROPIC_API_KEY' in os.environ:
-        settings.ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
-        return True
+    def _load(self, mtime):
+        """Resolve the key after a change of the .env file (called with the lock held)."""
+        first_load = self._mtime is _UNCHECKED
+        self._mtime = mtime
+        
+        key = ''
+        if first_load:
+            # At startup, settings already reflect the environment and .env
+            key = getattr(settings, 'ANTHROPIC_API_KEY', '') or os.environ.get('ANTHROPIC_API_KEY', '')
+        if not key and mtime is not None:
+            try:
+                key = read_env_api_key(self.dotenv_path)
+            except OSError as e:
+                logger.warning("Error reading .env file: %s", e)
+        if not key and not first_load:
+            # The key was removed from .env; fall back to the process environment
+            key = os.environ.get('ANTHROPIC_API_KEY', '')
         
-    # If environment variable isn't set, try to read directly from .env file
-    # This is a fallback for Docker environments where env vars might not be properly updated
-    try:
-        with open(dotenv_path, 'r') as f:
-            content = f.read()
-            
-        # Look for API key in the .env file
-        match = re.search(r'ANTHROPIC_API_KEY=([^\n]+)', content)
-        if match:
-            # Get the raw API key and clean it up
-            api_key = match.group(1).strip().strip('"\'')
-            settings.ANTHROPIC_API_KEY = api_key
-            print(f"API key loaded directly from .env file: {api_key[:5]}... (length: {len(api_key)})")
-            return True
-    except Exception as e:
-        print(f"Error reading .env file directly: {str(e)}")
+        if key != self._key:
+            logger.info("Anthropic API key %s (length: %d)", 'loaded' if not self._key else 'reloaded', len(key))
+        self._key = key
+        settings.ANTHROPIC_API_KEY = key
+    
+    def get(self):
+        """Return the current API key, checking .env for changes at most once per interval."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._next_check = now + self.check_interval
+                    mtime = self._stat_mtime()
+                    if mtime != self._mtime:
+                        self._load(mtime)
+        return self._key
+    
+    def set(self, key):
+        """
+        Use a new API key in this process right away.
         
-    return False
+        Call after writing the key to .env; the file's new mtime is recorded so
+        this process doesn't re-read it, while other workers will.
+        """
+        with self._lock:
+            self._key = key
+            self._mtime = self._stat_mtime()
+            self._next_check = time.monotonic() + self.check_interval
+            settings.ANTHROPIC_API_KEY = key
+    
+    def reload(self):
+        """Re-read the .env file now and return the resulting key."""
+        with self._lock:
+            self._next_check = 0.0
+            if self._mtime is not _UNCHECKED:
+                self._mtime = _STALE
+        return self.get()
 
-def get_anthropic_api_key():
+
+api_key_provider = ApiKeyProvider()
+
+
+def reload_env_settings():
     """
-    Get the Anthropic API key, with multiple fallbacks.
+    Reload the API key after the .env file was updated.
     
-    This function implements a robust mechanism to retrieve the API key from
-    multiple possible sources, in the following order:
-    1. Django settings (already loaded in memory)
-    2. Environment variables (os.environ)
-    3. Reload from .env file (in case environment wasn't updated)
-    4. Direct read from .env file as last resort
-    
-    This approach ensures maximum reliability across different deployment
-    scenarios and prevents 500 errors when the API key is changed.
+    Kept for callers that explicitly want a fresh read; the API key provider
+    already picks up .env changes on its own.
     
     Returns:
-        str: The Anthropic API key if found, empty string otherwise
+        bool: True if an API key is available, False otherwise
     """
-    # First check if it's already in settings
-    api_key = getattr(settings, 'ANTHROPIC_API_KEY', '')
+    return bool(api_key_provider.reload())
+
+
+def get_anthropic_api_key():
+    """
+    Get the Anthropic API key.
     
-    # If not in settings, try environment
-    if not api_key:
-        api_key = os.environ.get('ANTHROPIC_API_KEY', '')
-        
-    # If still not found, try to reload from .env file
-    if not api_key:
-        reload_env_settings()
-        api_key = getattr(settings, 'ANTHROPIC_API_KEY', '')
+    The key comes from the in-memory ApiKeyProvider, which loads it once from
+    settings and reloads it only when the .env file changes, so this is cheap
+    enough to call on every request.
     
-    # Finally, try to read directly from .env file as last resort
-    if not api_key:
-        dotenv_path = os.path.join(settings.BASE_DIR, '.env')
-        try:
-            with open(dotenv_path, 'r') as f:
-                content = f.read()
-                
-            match = re.search(r'ANTHROPIC_API_KEY=([^\n]+)', content)
-            if match:
-                api_key = match.group(1).strip().strip('"\'')
-                print(f"API key read from .env directly: {api_key[:5]}... (length: {len(api_key)})")
-        except Exception:
-            pass
-            
-    return api_key
\ No newline at end of file
+    Returns:
+        str: The Anthropic API key if configured, empty string otherwise
+    """
+    return api_key_provider.get()
@@ -1,13 +1,19 @@
 from django.shortcuts import render, redirect
+from django.http import Http404, HttpResponse
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.http import require_POST
 from django.conf import settings
+import hmac
+import logging
 import os
 from blog.models import Post
 from projects.models import Project
+from .metrics import registry as metrics_registry
 from .models import SiteConfig
-from .utils import get_anthropic_api_key
+from .utils import api_key_provider, get_anthropic_api_key
+
+logger = logging.getLogger(__name__)
 
 def home(request):
     """Home page view"""
@@ -42,7 +48,13 @@ def about(request):
 @staff_member_required
 @require_POST
 def set_api_key(request):
-    """Save API key to .env file and update runtime settings"""
+    """
+    Save API key to .env file and update runtime settings.
+    
+    The file is replaced atomically, so other workers never read a partial
+    .env; they pick up the new key when their API key provider notices the
+    changed modification time.
+    """
     api_key = request.POST.get('api_key')
     
     if api_key:
@@ -72,15 +84,17 @@ def set_api_key(request):
         if not updated:
             new_lines.append(f'ANTHROPIC_API_KEY={clean_api_key}\n')
             
-        # Write updated content
-        with open(dotenv_path, 'w') as f:
+        # Write updated content to a temporary file and swap it in
+        temp_path = f'{dotenv_path}.tmp'
+        with open(temp_path, 'w') as f:
             f.writelines(new_lines)
+        os.replace(temp_path, dotenv_path)
             
-        # Update runtime setting
-        settings.ANTHROPIC_API_KEY = clean_api_key
+        # Update the cached key of this worker (and settings.ANTHROPIC_API_KEY)
+        api_key_provider.set(clean_api_key)
         
         # Log information about the saved key
-        print(f"API key saved: {clean_api_key[:5]}... (length: {len(clean_api_key)})")
+        logger.info("API key saved (length: %d)", len(clean_api_key))
         
         # Create masked preview of API key for display
         api_key_preview = f"{api_key[:5]}...{api_key[-5:]}" if len(api_key) > 10 else "[Hidden]"
@@ -106,7 +120,7 @@ def api_key_form(request):
     # Create a masked preview of the API key
     if api_key and len(api_key) > 10:
         api_key_preview = f"{api_key[:5]}...{api_key[-5:]}"
-        print(f"API Key Form: API key available, starts with {api_key[:5]}")
+        logger.debug("API Key Form: API key available")
         
     context = {
         'title': 'API Key Setup',
@@ -114,4 +128,50 @@ def api_key_form(request):
         'api_key_preview': api_key_preview,
     }
     
-    return render(request, 'admin/core/api_key_form.html', context)
\ No newline at end of file
+    return render(request, 'admin/core/api_key_form.html', context)
+
+@staff_member_required
+def metrics_dashboard(request):
+    """
+    Show per-view request timings collected by RequestMetricsMiddleware.
+    
+    Numbers come from the worker process that handles this request; with
+    several workers, each keeps its own histograms.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404("Metrics are disabled. Set METRICS_ENABLED=True to collect them.")
+    
+    if request.method == 'POST' and request.POST.get('reset'):
+        metrics_registry.reset()
+        messages.success(request, "Metrics have been reset.")
+        return redirect('metrics-dashboard')
+    
+    context = {
+        'title': 'Request Metrics',
+        'rows': metrics_registry.summary(),
+    }
+    return render(request, 'admin/core/metrics.html', context)
+
+def prometheus_metrics(request):
+    """
+    Export request metrics in the Prometheus text format.
+    
+    Access is allowed for staff users, or for scrapers sending
+    "Authorization: Bearer <METRICS_TOKEN>" when METRICS_TOKEN is set.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404("Metrics are disabled.")
+    
+    token = settings.METRICS_TOKEN
+    authorized = request.user.is_active and request.user.is_staff
+    if not authorized and token:
+        # Constant-time comparison, so response timing doesn't reveal the token
+        authorized = hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                                         f"Bearer {token}".encode())
+    if not authorized:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    
+    return HttpResponse(
+        metrics_registry.prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
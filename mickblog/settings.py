@@ -25,6 +25,48 @@ env = environ.Env(
     PRIMARY_COLOR=(str, '#007bff'),
     SECONDARY_COLOR=(str, '#6c757d'),
     ANTHROPIC_API_KEY=(str, ''),
+    ANTHROPIC_API_URL=(str, 'https://api.anthropic.com/v1/messages'),
+    API_KEY_RELOAD_INTERVAL=(float, 2.0),
+    AI_PROMPT_CACHING=(bool, True),
+    AI_CONVERSATION_TOKEN_BUDGET=(int, 6000),
+    AI_CONVERSATION_KEEP_MESSAGES=(int, 6),
+    AI_CONVERSATION_CACHE_SIZE=(int, 256),
+    LOG_LEVEL=(str, 'INFO'),
+    LOG_FORMAT=(str, 'json'),
+    LOG_HOT_PATH_DEBUG=(bool, False),
+    METRICS_ENABLED=(bool, False),
+    METRICS_TOKEN=(str, ''),
+    DB_CONN_MAX_AGE=(int, 60),
+    DB_CONN_HEALTH_CHECKS=(bool, True),
+    DB_POOL=(bool, False),
+    DB_POOL_MIN_SIZE=(int, 1),
+    DB_POOL_MAX_SIZE=(int, 4),
+    DB_POOL_TIMEOUT=(float, 10.0),
+    DB_PGBOUNCER=(bool, False),
+    CACHE_URL=(str, 'locmemcache://'),
+    SITE_CONFIG_CACHE_TIMEOUT=(int, None),
+    RESUME_CACHE_TIMEOUT=(int, 60),
+    NUM_PROXIES=(int, 0),
+    CONTACT_RATE_LIMIT_IP=(str, '5/10m'),
+    CONTACT_RATE_LIMIT_GLOBAL=(str, '60/h'),
+    CONTACT_NOTIFY_EMAILS=(list, []),
+    CONTACT_DIGEST_MINUTES=(int, 15),
+    CONTACT_DEDUP_HOURS=(int, 24),
+    CONTACT_SPAM_THRESHOLD=(float, 5.0),
+    EMAIL_BACKEND=(str, 'django.core.mail.backends.console.EmailBackend'),
+    EMAIL_HOST=(str, 'localhost'),
+    EMAIL_PORT=(int, 25),
+    EMAIL_USE_TLS=(bool, False),
+    EMAIL_HOST_USER=(str, ''),
+    EMAIL_HOST_PASSWORD=(str, ''),
+    EMAIL_TIMEOUT=(int, 10),
+    DEFAULT_FROM_EMAIL=(str, 'webmaster@localhost'),
+    STATIC_PRECOMPRESS=(bool, True),
+    STATIC_COMPRESS_WORKERS=(int, 0),
+    ASSET_MODE=(str, 'cdn'),
+    IMAGE_DERIVATIVE_WIDTHS=(list, [320, 640, 960, 1280]),
+    IMAGE_DERIVATIVE_FORMATS=(list, ['avif', 'webp', 'jpeg']),
+    IMAGE_WORKERS=(int, 2),
 )
 
 # Take environment variables from .env file if it exists
@@ -89,7 +131,11 @@ MARKDOWNX_MARKDOWN_EXTENSIONS = [
 ]
 
 MIDDLEWARE = [
+    # Request timing (only active when METRICS_ENABLED is set)
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Hashed, precompressed static files (WhiteNoise; see core.storage)
+    'core.middleware.StaticFilesMiddleware',
     # Custom middlewares - put cache disabling at the very top
     'core.middleware.DisableBrowserCachingMiddleware',
     # SiteConfig middleware to ensure fresh data on every request
@@ -136,9 +182,58 @@ DATABASES = {
         'PASSWORD': env('DB_PASSWORD', default=''),
         'HOST': env('DB_HOST', default=''),
         'PORT': env('DB_PORT', default=''),
+        # Keep each worker's connection open for DB_CONN_MAX_AGE seconds
+        # instead of connecting on every request (0 closes it after each
+        # request), and check it still works before reusing it
+        'CONN_MAX_AGE': env('DB_CONN_MAX_AGE'),
+        'CONN_HEALTH_CHECKS': env('DB_CONN_HEALTH_CHECKS'),
     }
 }
 
+# PostgreSQL connection pool (DB_POOL, needs psycopg 3 with psycopg_pool):
+# each worker process keeps DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections
+# shared by its threads, waiting up to DB_POOL_TIMEOUT seconds for a free one.
+# Pooled connections replace persistent ones, so CONN_MAX_AGE must be 0
+if env('DB_POOL') and DATABASES['default']['ENGINE'].endswith('postgresql'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': env('DB_POOL_MIN_SIZE'),
+        'max_size': env('DB_POOL_MAX_SIZE'),
+        'timeout': env('DB_POOL_TIMEOUT'),
+    }
+
+# Behind PgBouncer in transaction pooling mode (DB_PGBOUNCER), consecutive
+# transactions can run on different server connections, which breaks the
+# server-side cursors used by QuerySet.iterator()
+if env('DB_PGBOUNCER'):
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+
+# Cache
+# The default in-process memory cache is private to each worker; point
+# CACHE_URL at a shared cache (e.g. memcache:// or dbcache://) so that
+# invalidations reach every worker immediately
+CACHES = {
+    'default': env.cache('CACHE_URL'),
+}
+
+# Whether every worker sees the same cache, so an invalidation reaches them all
+SHARED_CACHE = not CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache'))
+
+# Seconds the SiteConfig singleton stays cached. Saves invalidate it in the
+# shared cache, but a per-worker memory cache is only cleared in the process
+# that saved, and other workers would serve the previous configuration until
+# the timeout. So unless set explicitly, the configuration is only cached
+# (for 5 seconds) when CACHE_URL points at a shared cache, and read from the
+# database on every request otherwise
+SITE_CONFIG_CACHE_TIMEOUT = env('SITE_CONFIG_CACHE_TIMEOUT')
+if SITE_CONFIG_CACHE_TIMEOUT is None:
+    SITE_CONFIG_CACHE_TIMEOUT = 5 if SHARED_CACHE else 0
+
+# Seconds the assembled resume page data and the current resume PDF's
+# fingerprint stay cached; the same trade-off as SITE_CONFIG_CACHE_TIMEOUT
+RESUME_CACHE_TIMEOUT = env('RESUME_CACHE_TIMEOUT')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -180,10 +275,39 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
+# Write .gz (and .br, if brotli is installed) copies next to generated static
+# files such as the published custom CSS, for servers using precompressed files
+STATIC_PRECOMPRESS = env('STATIC_PRECOMPRESS')
+
+# collectstatic stores every file under a content-hashed name as well, and
+# compresses new files on STATIC_COMPRESS_WORKERS threads (0 = one per CPU).
+# Files missing from the manifest fall back to their unhashed URL.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.storage.SiteStaticFilesStorage'},
+}
+STATIC_COMPRESS_WORKERS = env('STATIC_COMPRESS_WORKERS')
+WHITENOISE_MANIFEST_STRICT = False
+# Hashed files are cached for a year (immutable); others for an hour in production
+WHITENOISE_MAX_AGE = 0 if DEBUG else 3600
+WHITENOISE_MIMETYPES = {'.webmanifest': 'application/manifest+json'}
+
+# Where base.html loads Bootstrap and Font Awesome from: 'cdn' for the public
+# CDNs, or 'vendor' for the tree-shaken copies built by manage.py build_assets,
+# with the critical CSS inlined and no external requests
+ASSET_MODE = env('ASSET_MODE')
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized copies of uploaded images (see core.images): widths in pixels,
+# formats best first (formats this Pillow build can't write are skipped), and
+# the number of background processes generating them (0 = generate inline)
+IMAGE_DERIVATIVE_WIDTHS = [int(width) for width in env('IMAGE_DERIVATIVE_WIDTHS')]
+IMAGE_DERIVATIVE_FORMATS = env('IMAGE_DERIVATIVE_FORMATS')
+IMAGE_WORKERS = env('IMAGE_WORKERS')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -206,8 +330,92 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 SECURE_BROWSER_XSS_FILTER = True
 X_FRAME_OPTIONS = 'DENY'
 
-# Email settings - using console backend for development
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Number of reverse proxies (nginx) in front of Django. Client addresses are
+# taken from that many trusted X-Forwarded-For entries; 0 ignores the header
+NUM_PROXIES = env('NUM_PROXIES')
+
+# Contact form rate limits (see contact.ratelimit): "<burst>/<period>" per
+# client IP and across all clients; an empty value disables a limit
+CONTACT_RATE_LIMIT_IP = env('CONTACT_RATE_LIMIT_IP')
+CONTACT_RATE_LIMIT_GLOBAL = env('CONTACT_RATE_LIMIT_GLOBAL')
+
+# Contact form pipeline (see contact.pipeline and the process_contacts command)
+# Accepted messages are emailed as one digest every CONTACT_DIGEST_MINUTES to
+# CONTACT_NOTIFY_EMAILS, or to the site's public email if that's empty.
+# Repeats of a message within CONTACT_DEDUP_HOURS are marked as duplicates,
+# and messages scoring CONTACT_SPAM_THRESHOLD or more as spam
+CONTACT_NOTIFY_EMAILS = env('CONTACT_NOTIFY_EMAILS')
+CONTACT_DIGEST_MINUTES = env('CONTACT_DIGEST_MINUTES')
+CONTACT_DEDUP_HOURS = env('CONTACT_DEDUP_HOURS')
+CONTACT_SPAM_THRESHOLD = env('CONTACT_SPAM_THRESHOLD')
+
+# Email settings - the console backend by default, for development; run
+# manage.py smtp_stub and point EMAIL_HOST/EMAIL_PORT at it to test over SMTP
+EMAIL_BACKEND = env('EMAIL_BACKEND')
+EMAIL_HOST = env('EMAIL_HOST')
+EMAIL_PORT = env('EMAIL_PORT')
+EMAIL_USE_TLS = env('EMAIL_USE_TLS')
+EMAIL_HOST_USER = env('EMAIL_HOST_USER')
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
+EMAIL_TIMEOUT = env('EMAIL_TIMEOUT')
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL')
 
 # Anthropic API settings for AI-powered site configuration
 ANTHROPIC_API_KEY = env('ANTHROPIC_API_KEY')
+ANTHROPIC_API_URL = env('ANTHROPIC_API_URL')
+
+# The API key is cached in memory; each worker checks the .env file's
+# modification time at most this often (in seconds) and reloads the key
+# when it has changed
+API_KEY_RELOAD_INTERVAL = env('API_KEY_RELOAD_INTERVAL')
+
+# Mark stable prompt prefixes (instructions, site config, conversation history)
+# as cacheable so the API's prompt caching can reuse them between calls
+AI_PROMPT_CACHING = env('AI_PROMPT_CACHING')
+
+# Server-side AI editor conversations
+# Older turns are summarized once the stored history exceeds the token budget,
+# keeping the most recent messages verbatim
+AI_CONVERSATION_TOKEN_BUDGET = env('AI_CONVERSATION_TOKEN_BUDGET')
+AI_CONVERSATION_KEEP_MESSAGES = env('AI_CONVERSATION_KEEP_MESSAGES')
+AI_CONVERSATION_CACHE_SIZE = env('AI_CONVERSATION_CACHE_SIZE')
+
+# Logging
+# All app loggers write through a queue to a background thread (core.log), as
+# one JSON object per line (LOG_FORMAT=json) or plain text (LOG_FORMAT=text).
+# LOG_HOT_PATH_DEBUG enables debug messages on per-request paths such as the
+# site config middleware; it also needs LOG_LEVEL=DEBUG to show them.
+LOG_LEVEL = env('LOG_LEVEL').upper()
+LOG_HOT_PATH_DEBUG = env('LOG_HOT_PATH_DEBUG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'async_console': {
+            'class': 'core.log.AsyncStreamHandler',
+            'output': env('LOG_FORMAT'),
+        },
+    },
+    'root': {
+        'handlers': ['async_console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        **{
+            app: {
+                'handlers': ['async_console'],
+                'level': LOG_LEVEL,
+                'propagate': False,
+            }
+            for app in ('core', 'blog', 'projects', 'resume', 'contact')
+        },
+    },
+}
+
+# Request metrics
+# When enabled, every response gets a Server-Timing header and per-view
+# histograms are shown at /admin/metrics/ (staff) and exported for Prometheus
+# at /metrics/ (staff, or a bearer token matching METRICS_TOKEN)
+METRICS_ENABLED = env('METRICS_ENABLED')
+METRICS_TOKEN = env('METRICS_TOKEN')
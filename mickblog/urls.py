@@ -8,7 +8,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from core.views import api_key_form, set_api_key
+from core.views import api_key_form, metrics_dashboard, set_api_key
 
 # Admin site customization
 admin.site.site_header = "MickBlog Admin"
@@ -19,6 +19,7 @@ admin.site.index_title = "Welcome to MickBlog Admin Portal"
 admin_patterns = [
     path('admin/api-key-setup/', api_key_form, name='api-key-setup'),
     path('admin/set-api-key/', set_api_key, name='set-api-key'),
+    path('admin/metrics/', metrics_dashboard, name='metrics-dashboard'),
 ]
 
 urlpatterns = admin_patterns + [
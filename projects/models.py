@@ -1,7 +1,7 @@
 from django.db import models
 from django.urls import reverse
 from markdownx.models import MarkdownxField
-from markdownx.utils import markdownify
+from core.metrics import markdownify
 
 
 class Technology(models.Model):
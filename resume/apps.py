@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class ResumeConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'resume'
+    
+    def ready(self):
+        """
+        Import the content and pdf modules on startup to connect the signal
+        receivers that refresh the cached resume and its PDF when it changes.
+        """
+        import resume.content
+        import resume.pdf
@@ -0,0 +1,87 @@
+"""
+The resume page's data, assembled once and cached.
+
+The resume changes rarely but used to cost four queries and a Markdown
+rendering of every description on each view. get_resume() builds a plain
+structure instead (entries as dicts, descriptions already rendered to HTML,
+skills grouped by category) and keeps it in the cache until one of the resume
+models is saved or deleted.
+"""
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.metrics import markdownify
+from .models import Certification, Education, Experience, Skill
+
+RESUME_CACHE_KEY = 'resume:content'
+
+def _with_html(entries):
+    for entry in entries:
+        entry['formatted_description'] = markdownify(entry['description']) if entry['description'] else ''
+    return entries
+
+
+def skill_categories():
+    """
+    Skills grouped by category, in the order of Skill.CATEGORY_CHOICES.
+
+    Returns:
+        list: Dicts with the category 'key', its display 'name' and its 'skills'
+    """
+    labels = dict(Skill.CATEGORY_CHOICES)
+    # Sort by the position of the category in CATEGORY_CHOICES in the query
+    # itself, so grouping is a single pass over one ordered result
+    category_order = Case(
+        *(When(category=key, then=Value(index)) for index, (key, _) in enumerate(Skill.CATEGORY_CHOICES)),
+        default=Value(len(Skill.CATEGORY_CHOICES)),
+        output_field=IntegerField(),
+    )
+    skills = (Skill.objects.order_by(category_order, 'order', 'name')
+              .values('id', 'name', 'category', 'proficiency'))
+    return [
+        {'key': key, 'name': labels.get(key, key), 'skills': list(group)}
+        for key, group in groupby(skills, key=lambda skill: skill['category'])
+    ]
+
+
+def build_resume():
+    """
+    Assemble the resume from the database.
+
+    Returns:
+        dict: 'experiences', 'education' and 'certifications' as lists of
+              field dicts (with 'formatted_description' HTML where they have
+              a description) and 'skill_categories' from skill_categories()
+    """
+    return {
+        'experiences': _with_html(list(Experience.objects.values())),
+        'education': _with_html(list(Education.objects.values())),
+        'skill_categories': skill_categories(),
+        'certifications': list(Certification.objects.values()),
+    }
+
+
+def get_resume():
+    """
+    The resume from build_resume(), cached until a resume model changes
+    (or for RESUME_CACHE_TIMEOUT seconds, for workers with their own cache).
+    """
+    resume = cache.get(RESUME_CACHE_KEY)
+    if resume is None:
+        resume = build_resume()
+        cache.set(RESUME_CACHE_KEY, resume, settings.RESUME_CACHE_TIMEOUT)
+    return resume
+
+
+@receiver([post_save, post_delete], sender=Experience)
+@receiver([post_save, post_delete], sender=Education)
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=Certification)
+def invalidate_resume(sender, **kwargs):
+    """Drop the cached resume whenever one of its entries changes."""
+    cache.delete(RESUME_CACHE_KEY)
@@ -1,6 +1,6 @@
 from django.db import models
 from markdownx.models import MarkdownxField
-from markdownx.utils import markdownify
+from core.metrics import markdownify
 
 
 class Education(models.Model):
@@ -0,0 +1,351 @@
+"""
+PDF export of the resume.
+
+The PDF is drawn with fpdf2, a pure-Python library, so it needs no browser,
+system fonts or network access. It is built from Experience, Education, Skill
+and Certification and the contact details in SiteConfig, and stored as
+MEDIA_ROOT/resume/resume.<fingerprint>.pdf, where the fingerprint is a hash of
+all of that data. A download only has to look up the current fingerprint
+(cached until something changes) and send the file.
+
+When any of those models is saved or deleted, the fingerprint is dropped and
+the PDF is rebuilt on a background thread, a couple of seconds after the last
+change so that editing several entries only rebuilds it once. If a download
+comes first, it builds the PDF itself.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from html import escape
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from fpdf import FPDF
+
+from core.models import SiteConfig
+from .content import get_resume
+from .models import Certification, Education, Experience, Skill
+
+logger = logging.getLogger(__name__)
+
+# Directory under MEDIA_ROOT holding the generated PDFs
+PDF_DIR = 'resume'
+
+# Change when the layout changes, so existing PDFs are rebuilt
+LAYOUT_VERSION = 2
+
+# PDFs to keep, so a download that started before a change can still finish
+PDF_KEEP = 3
+
+# Seconds after the last change before the PDF is rebuilt
+REBUILD_DELAY = 2.0
+
+FINGERPRINT_CACHE_KEY = 'resume:pdf_fingerprint'
+
+PDF_NAME_RE = re.compile(r'^resume\.[0-9a-f]{16}\.pdf$')
+
+# SiteConfig fields shown in the PDF
+SITE_FIELDS = ('title', 'tagline', 'email', 'phone', 'address', 'github_url', 'linkedin_url', 'primary_color')
+
+# The built-in PDF fonts only cover Latin-1; map common typography to it
+TYPOGRAPHY = str.maketrans({
+    '‘': "'", '’': "'", '“': '"', '”': '"',
+    '–': '-', '—': '-', '…': '...', '•': '-', ' ': ' ',
+})
+
+# Markup passed on to fpdf2's write_html; other tags are dropped, keeping
+# their text. In particular <img> would make fpdf2 fetch the image's URL
+PDF_HTML_TAGS = frozenset((
+    'p', 'br', 'b', 'strong', 'i', 'em', 'u', 'a', 'ul', 'ol', 'li', 'blockquote', 'pre', 'code', 'hr',
+))
+
+# Tags whose content is dropped along with them
+PDF_HTML_SKIP = frozenset(('script', 'style'))
+
+_rebuild_timer = None
+_rebuild_lock = threading.Lock()
+
+
+def _text(value):
+    return str(value or '').translate(TYPOGRAPHY).encode('latin-1', 'replace').decode('latin-1')
+
+
+class _PDFHTMLFilter(HTMLParser):
+    """Rebuilds HTML with only PDF_HTML_TAGS, and only the href of links."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in PDF_HTML_SKIP:
+            self.skipping += 1
+        elif not self.skipping and tag in PDF_HTML_TAGS:
+            href = dict(attrs).get('href') if tag == 'a' else None
+            self.parts.append(f'<{tag} href="{escape(href)}">' if href else f'<{tag}>')
+
+    def handle_endtag(self, tag):
+        if tag in PDF_HTML_SKIP:
+            self.skipping = max(self.skipping - 1, 0)
+        elif self.skipping:
+            return
+        elif tag in PDF_HTML_TAGS and tag not in ('br', 'hr'):
+            self.parts.append(f'</{tag}>')
+        elif tag in ('td', 'th'):
+            # Table cells and rows become plain text on separate lines
+            self.parts.append(' ')
+        elif tag == 'tr':
+            self.parts.append('<br>')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(escape(data, quote=False))
+
+
+def pdf_html(description_html):
+    """
+    Reduce a rendered description to the markup the PDF can show.
+
+    Images, tables and anything else fpdf2 can't lay out (or would fetch
+    over the network) are removed; their text, if any, is kept.
+    """
+    parser = _PDFHTMLFilter()
+    parser.feed(description_html)
+    parser.close()
+    return ''.join(parser.parts)
+
+
+def resume_data():
+    """
+    Everything the PDF shows, as plain JSON-friendly values.
+
+    Returns:
+        dict: 'site' fields and the resume page data from get_resume()
+    """
+    site = SiteConfig.get()
+    return {
+        'layout': LAYOUT_VERSION,
+        'site': {field: getattr(site, field) for field in SITE_FIELDS},
+        **get_resume(),
+    }
+
+
+def fingerprint(data):
+    """Hash identifying the PDF built from the given resume data."""
+    encoded = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def pdf_path(key):
+    return os.path.join(settings.MEDIA_ROOT, PDF_DIR, f'resume.{key}.pdf')
+
+
+class ResumePDF(FPDF):
+    """A4 page layout of the resume."""
+
+    def __init__(self, accent):
+        super().__init__(format='A4')
+        self.accent = accent
+        self.set_margins(18, 16, 18)
+        self.set_auto_page_break(True, margin=16)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font('Helvetica', '', 8)
+        self.set_text_color(130, 130, 130)
+        self.cell(0, 6, f'Page {self.page_no()}', align='C')
+
+    def section(self, title):
+        self.ln(4)
+        self.set_font('Helvetica', 'B', 13)
+        self.set_text_color(*self.accent)
+        self.cell(0, 8, _text(title), new_x='LMARGIN', new_y='NEXT')
+        self.set_draw_color(*self.accent)
+        self.line(self.l_margin, self.get_y(), self.w - self.r_margin, self.get_y())
+        self.ln(2)
+        self.set_text_color(0, 0, 0)
+
+    def entry(self, title, dates, subtitle, description_html=''):
+        self.set_font('Helvetica', 'B', 11)
+        self.cell(self.epw * 0.7, 6, _text(title))
+        self.set_font('Helvetica', '', 9)
+        self.set_text_color(100, 100, 100)
+        self.cell(0, 6, _text(dates), align='R', new_x='LMARGIN', new_y='NEXT')
+        self.set_font('Helvetica', 'I', 10)
+        self.cell(0, 5, _text(subtitle), new_x='LMARGIN', new_y='NEXT')
+        self.set_text_color(0, 0, 0)
+        if description_html:
+            self.set_font('Helvetica', '', 10)
+            self.write_html(_text(pdf_html(description_html)))
+        self.ln(2)
+
+
+def _accent(color):
+    match = re.fullmatch(r'#?([0-9a-fA-F]{6})', (color or '').strip())
+    value = match.group(1) if match else '007bff'
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _period(start, end, fmt='%b %Y', current=False):
+    start_text = start.strftime(fmt) if start else ''
+    end_text = 'Present' if current or not end else end.strftime(fmt)
+    return f'{start_text} - {end_text}'
+
+
+def render_pdf(data):
+    """
+    Draw the resume.
+
+    Args:
+        data (dict): As returned by resume_data()
+
+    Returns:
+        bytes: The PDF document
+    """
+    site = data['site']
+    pdf = ResumePDF(_accent(site['primary_color']))
+    pdf.set_title(_text(f"{site['title']} - Resume"))
+    pdf.set_creator(_text(site['title']))
+    pdf.add_page()
+
+    pdf.set_font('Helvetica', 'B', 22)
+    pdf.cell(0, 11, _text(site['title']), new_x='LMARGIN', new_y='NEXT')
+    if site['tagline']:
+        pdf.set_font('Helvetica', '', 11)
+        pdf.set_text_color(90, 90, 90)
+        pdf.multi_cell(0, 5, _text(site['tagline']), new_x='LMARGIN', new_y='NEXT')
+    contact = [site[field] for field in ('email', 'phone', 'github_url', 'linkedin_url') if site[field]]
+    if contact:
+        pdf.set_font('Helvetica', '', 9)
+        pdf.set_text_color(90, 90, 90)
+        pdf.multi_cell(0, 5, _text('  |  '.join(contact)), new_x='LMARGIN', new_y='NEXT')
+    pdf.set_text_color(0, 0, 0)
+
+    if data['experiences']:
+        pdf.section('Work Experience')
+        for exp in data['experiences']:
+            company = f"{exp['company']} - {exp['location']}" if exp['location'] else exp['company']
+            pdf.entry(exp['position'], _period(exp['start_date'], exp['end_date'], current=exp['current']),
+                      company, exp['formatted_description'])
+
+    if data['education']:
+        pdf.section('Education')
+        for edu in data['education']:
+            pdf.entry(edu['institution'], _period(edu['start_date'], edu['end_date'], fmt='%Y'),
+                      f"{edu['degree']} in {edu['field_of_study']}", edu['formatted_description'])
+
+    if data['skill_categories']:
+        pdf.section('Skills')
+        for category in data['skill_categories']:
+            pdf.set_font('Helvetica', 'B', 10)
+            pdf.cell(45, 6, _text(category['name']))
+            pdf.set_font('Helvetica', '', 10)
+            pdf.multi_cell(0, 6, _text(', '.join(skill['name'] for skill in category['skills'])),
+                           new_x='LMARGIN', new_y='NEXT')
+
+    if data['certifications']:
+        pdf.section('Certifications')
+        for cert in data['certifications']:
+            issued = f"Issued {cert['date_obtained'].strftime('%B %Y')}"
+            if cert['expiration_date']:
+                issued += f", expires {cert['expiration_date'].strftime('%B %Y')}"
+            subtitle = cert['issuer']
+            if cert['credential_id']:
+                subtitle += f" (credential {cert['credential_id']})"
+            pdf.entry(cert['name'], issued, subtitle)
+
+    return bytes(pdf.output())
+
+
+def _prune(directory, current):
+    names = sorted(
+        (name for name in os.listdir(directory) if PDF_NAME_RE.match(name) and name != current),
+        key=lambda name: os.path.getmtime(os.path.join(directory, name)),
+        reverse=True,
+    )
+    for name in names[PDF_KEEP - 1:]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def build_resume_pdf(data=None):
+    """
+    Make sure the PDF for the current resume data exists.
+
+    Args:
+        data (dict): Resume data, if already loaded
+
+    Returns:
+        str: Path of the PDF
+    """
+    data = data or resume_data()
+    key = fingerprint(data)
+    path = pdf_path(key)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        content = render_pdf(data)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+        _prune(os.path.dirname(path), os.path.basename(path))
+        logger.info("Built resume PDF %s (%d bytes)", os.path.basename(path), len(content))
+    cache.set(FINGERPRINT_CACHE_KEY, key, settings.RESUME_CACHE_TIMEOUT)
+    return path
+
+
+def current_resume_pdf():
+    """
+    Path of the PDF for the current resume data, building it if needed.
+
+    Only the cached fingerprint is checked when nothing has changed, so this
+    doesn't query the database.
+    """
+    key = cache.get(FINGERPRINT_CACHE_KEY)
+    if key is not None and os.path.exists(pdf_path(key)):
+        return pdf_path(key)
+    return build_resume_pdf()
+
+
+def _rebuild():
+    try:
+        build_resume_pdf()
+    except Exception:
+        logger.exception("Could not rebuild the resume PDF")
+    finally:
+        # Each timer runs on a new thread with its own connection, which
+        # CONN_MAX_AGE would otherwise keep open after the thread ends
+        connection.close()
+
+
+def schedule_rebuild():
+    """Rebuild the PDF in the background once changes stop for REBUILD_DELAY seconds."""
+    global _rebuild_timer
+    with _rebuild_lock:
+        if _rebuild_timer is not None:
+            _rebuild_timer.cancel()
+        _rebuild_timer = threading.Timer(REBUILD_DELAY, _rebuild)
+        _rebuild_timer.daemon = True
+        _rebuild_timer.start()
+
+
+@receiver([post_save, post_delete], sender=Experience)
+@receiver([post_save, post_delete], sender=Education)
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=Certification)
+@receiver(post_save, sender=SiteConfig)
+def resume_changed(sender, **kwargs):
+    """Drop the current fingerprint and rebuild the PDF once the change is committed."""
+    cache.delete(FINGERPRINT_CACHE_KEY)
+    transaction.on_commit(schedule_rebuild)
+
@@ -0,0 +1,48 @@
+import socket
+from datetime import date
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from resume.pdf import pdf_html, render_pdf
+
+DESCRIPTION = (
+    '<p>Led the <strong>platform</strong> team &amp; shipped '
+    '<a href="https://example.com/?a=1&amp;b=2" title="Example">the product</a>.</p>'
+    '<p><img src="https://example.com/diagram.png" alt="Diagram"></p>'
+    '<ul><li><span style="color: red">Cut costs</span></li></ul>'
+)
+
+
+class PDFHTMLTests(SimpleTestCase):
+    def test_keeps_supported_markup_and_drops_the_rest(self):
+        self.assertEqual(
+            pdf_html(DESCRIPTION),
+            '<p>Led the <strong>platform</strong> team &amp; shipped '
+            '<a href="https://example.com/?a=1&amp;b=2">the product</a>.</p>'
+            '<p></p><ul><li>Cut costs</li></ul>',
+        )
+
+    def test_drops_scripts_and_flattens_tables(self):
+        self.assertEqual(
+            pdf_html('<script>alert(1)</script><table><tr><th>A</th><td>1 &lt; 2</td></tr></table>'),
+            'A 1 &lt; 2 <br>',
+        )
+
+
+class RenderPDFTests(SimpleTestCase):
+    def test_images_in_descriptions_are_not_fetched(self):
+        data = {
+            'site': {'title': 'Jane Doe', 'tagline': '', 'email': 'jane@example.com', 'phone': '',
+                     'address': '', 'github_url': '', 'linkedin_url': '', 'primary_color': '#007bff'},
+            'experiences': [{
+                'position': 'Engineer', 'company': 'Acme', 'location': '', 'current': True,
+                'start_date': date(2020, 1, 1), 'end_date': None, 'formatted_description': DESCRIPTION,
+            }],
+            'education': [],
+            'skill_categories': [],
+            'certifications': [],
+        }
+        with mock.patch.object(socket, 'create_connection', side_effect=AssertionError('network access')):
+            content = render_pdf(data)
+        self.assertTrue(content.startswith(b'%PDF'))
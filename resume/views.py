@@ -1,28 +1,23 @@
 from django.shortcuts import render
-from django.http import HttpResponse
-from .models import Education, Experience, Skill, Certification
+from django.http import FileResponse, HttpResponse
+from django.utils.text import slugify
+from .content import get_resume
+from .pdf import current_resume_pdf
 from core.models import SiteConfig
-from django.template.loader import render_to_string
-from django.conf import settings
-import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 def resume(request):
-    """View for the resume page"""
-    # Get site configuration
-    site = SiteConfig.get()
-    
-    # Get all resume components
-    education = Education.objects.all()
-    experiences = Experience.objects.all()
-    skills = Skill.objects.all()
-    certifications = Certification.objects.all()
+    """
+    View for the resume page
     
+    The entries, rendered descriptions and skill groups come from the cache
+    (see resume.content), so a typical view runs no queries.
+    """
     context = {
-        'site': site,
-        'education': education,
-        'experiences': experiences,
-        'skills': skills,
-        'certifications': certifications,
+        'site': SiteConfig.get(),
+        **get_resume(),
     }
     
     return render(request, 'resume/resume.html', context)
@@ -30,16 +25,16 @@ def resume(request):
 def download_resume(request):
     """
     View for downloading the resume as PDF
-    This is a placeholder - in a real implementation, 
-    you would use a library like WeasyPrint to convert HTML to PDF
-    """
-    # For demonstration purposes, we'll just return a text response
-    # In a production app, you would generate a PDF and return it
     
-    response = HttpResponse(
-        "This would be a PDF download of the resume in a real implementation.",
-        content_type="text/plain"
-    )
-    response['Content-Disposition'] = 'attachment; filename="resume.txt"'
+    The PDF is generated ahead of time whenever the resume changes (see
+    resume.pdf), so this normally just sends an existing file.
+    """
+    try:
+        path = current_resume_pdf()
+    except Exception as e:
+        logger.error("Could not build the resume PDF: %s", e)
+        return HttpResponse("The resume PDF is not available right now.", status=503, content_type="text/plain")
     
-    return response
\ No newline at end of file
+    site = SiteConfig.get()
+    filename = f"{slugify(site.title) or 'resume'}-resume.pdf"
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
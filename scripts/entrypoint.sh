@@ -21,10 +21,29 @@ fi
 echo "Updating site configuration..."
 python manage.py update_site_config
 
+# The vendored front-end assets are built into the image. Build them only if
+# they're missing (e.g. the project directory is mounted over /app), and fall
+# back to the CDNs rather than failing to start if that isn't possible
+if [ "$ASSET_MODE" = "vendor" ] && [ ! -f static/vendor/site.min.css ]; then
+    echo "Building vendored assets..."
+    if ! python manage.py build_assets; then
+        echo "Could not build vendored assets; loading Bootstrap and Font Awesome from the CDNs"
+        export ASSET_MODE=cdn
+    fi
+fi
+
 # Collect static files
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+# Publish the favicon set, which pages only link once it exists
+echo "Publishing favicon set..."
+python manage.py publish_icons
+
+# Check new contact messages and send notification digests in the background
+echo "Starting contact message processing..."
+python manage.py process_contacts &
+
 # Start Gunicorn server with 3 workers
 echo "Starting Gunicorn server..."
 gunicorn mickblog.wsgi:application --bind 0.0.0.0:8000 --workers 3 --reload
\ No newline at end of file